@@ -0,0 +1,133 @@
+import asyncio
+import json
+import logging
+from typing import Optional
+
+from browser_use import ActionResult, Tools
+from browser_use.browser.session import BrowserSession
+from pydantic import BaseModel
+
+from fornecedores import Fornecedor
+
+logger = logging.getLogger(__name__)
+
+# Espera na própria página: documento carregado e então o seletor de resultados
+# (se houver) ou um intervalo sem nós inseridos/removidos nem novos recursos de rede.
+# Atributos não contam: carrosséis e animações os mudam o tempo todo. Um seletor
+# configurado que não aparece (site mudou) cai na estabilidade, com janela maior.
+# O seletor também casa com a página que está sendo deixada (clique ou Enter cuja
+# navegação ainda não trocou o documento): no mesmo documento de `origemAnterior`
+# (performance.timeOrigin de antes da ação) só conta um elemento inserido depois.
+_READY_JS = """
+(async (seletor, timeoutMs, quietMs, origemAnterior) => {
+  const inicio = performance.now();
+  const decorrido = () => performance.now() - inicio;
+  const dormir = (ms) => new Promise((r) => setTimeout(r, ms));
+  const fim = (pronto, motivo) => ({pronto, motivo, ms: Math.round(decorrido()), origem: performance.timeOrigin});
+  const documentoNovo = origemAnterior === null || performance.timeOrigin !== origemAnterior;
+  const casa = (n) => n.nodeType === 1 && (n.matches(seletor) || n.querySelector(seletor) !== null);
+
+  while (document.readyState !== "complete" && decorrido() < timeoutMs) await dormir(50);
+  if (seletor && documentoNovo && document.querySelector(seletor)) return fim(true, "seletor");
+
+  const janelaMs = seletor ? 4 * quietMs : quietMs;
+  let ultimaMudanca = performance.now();
+  let inserido = false;
+  const observer = new MutationObserver((mudancas) => {
+    ultimaMudanca = performance.now();
+    if (seletor && !inserido) inserido = mudancas.some((m) => Array.from(m.addedNodes).some(casa));
+  });
+  observer.observe(document.documentElement, {subtree: true, childList: true});
+  let recursos = performance.getEntriesByType("resource").length;
+  try {
+    while (decorrido() < timeoutMs) {
+      if (inserido || (seletor && documentoNovo && document.querySelector(seletor))) return fim(true, "seletor");
+      const atual = performance.getEntriesByType("resource").length;
+      if (atual !== recursos) { recursos = atual; ultimaMudanca = performance.now(); }
+      if (performance.now() - ultimaMudanca >= janelaMs) {
+        return fim(true, seletor && documentoNovo ? "estável sem seletor" : "estável");
+      }
+      await dormir(100);
+    }
+  } finally {
+    observer.disconnect();
+  }
+  return fim(false, seletor ? "seletor ausente" : "timeout");
+})(%s, %d, %d, %s)
+"""
+
+# performance.timeOrigin do último documento visto em cada sessão (BrowserSession.id)
+_documentos = {}
+
+
+class AguardarPagina(BaseModel):
+    seletor: Optional[str] = None
+
+
+def ready_expression(seletor: str = None, timeout: float = 15.0, quiet: float = 0.5, origem: float = None):
+    """
+    Expressão JS que resolve com {'pronto', 'motivo', 'ms', 'origem'} quando a página fica pronta.
+
+    `origem` é o performance.timeOrigin do documento aberto antes da última
+    ação; nele o seletor só conta se um elemento que casa for inserido.
+    """
+    return _READY_JS % (json.dumps(seletor), int(timeout * 1000), int(quiet * 1000), json.dumps(origem))
+
+
+async def _evaluate(browser_session: BrowserSession, expression: str, timeout: float):
+    cdp_session = await browser_session.get_or_create_cdp_session()
+    result = await asyncio.wait_for(
+        cdp_session.cdp_client.send.Runtime.evaluate(
+            params={"expression": expression, "awaitPromise": True, "returnByValue": True},
+            session_id=cdp_session.session_id,
+        ),
+        timeout=timeout,
+    )
+    return result.get("result", {}).get("value")
+
+
+async def mark_document(browser_session: BrowserSession):
+    """Registra o documento atual da aba, antes de ações que podem navegar (ex.: no início de cada passo)."""
+    try:
+        _documentos[browser_session.id] = await _evaluate(browser_session, "performance.timeOrigin", 5)
+    except Exception as e:
+        # Navegação em andamento: o próximo documento é novo de qualquer forma
+        logger.debug(f"Documento atual não registrado: {e}")
+
+
+async def wait_page_ready(browser_session: BrowserSession, seletor: str = None,
+                          timeout: float = 15.0, quiet: float = 0.5):
+    """Espera a aba atual ficar pronta e retorna {'pronto', 'motivo', 'ms', 'origem'}."""
+    expression = ready_expression(seletor, timeout, quiet, _documentos.get(browser_session.id))
+    for tentativa in range(2):
+        try:
+            status = await _evaluate(browser_session, expression, timeout + 5)
+            if not status:
+                return {"pronto": False, "motivo": "sem resposta", "ms": 0}
+            _documentos[browser_session.id] = status.get("origem")
+            return status
+        except Exception as e:
+            # Uma navegação durante a espera destrói o contexto JS; tenta de novo na página nova
+            logger.debug(f"Espera de página interrompida (tentativa {tentativa + 1}): {e}")
+    return {"pronto": False, "motivo": "erro ao avaliar a página", "ms": 0}
+
+
+def build_tools(fornecedor: Fornecedor):
+    """Cria as ações extras do Agent configuradas para o fornecedor."""
+    tools = Tools()
+
+    @tools.action(
+        "Aguarda a página atual terminar de carregar (resultados visíveis e DOM estável). "
+        "Use depois de pesquisar ou abrir um produto, em vez de esperar um tempo fixo.",
+        param_model=AguardarPagina,
+    )
+    async def aguardar_pagina_pronta(params: AguardarPagina, browser_session: BrowserSession):
+        status = await wait_page_ready(
+            browser_session,
+            seletor=params.seletor or fornecedor.seletor_resultados,
+            timeout=fornecedor.timeout_pronto,
+        )
+        logger.debug(f"Página de {fornecedor.nome} pronta? {status}")
+        return ActionResult(extracted_content=f"Página pronta: {status}")
+
+    return tools
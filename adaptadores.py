@@ -0,0 +1,146 @@
+import asyncio
+import html
+import logging
+import re
+import urllib.request
+from urllib.parse import parse_qs, quote, urljoin, urlsplit
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+_ANCHOR_RE = re.compile(r"<a\b([^>]*)>(.*?)</a>", re.S | re.I)
+_HREF_RE = re.compile(r"""href\s*=\s*["']([^"']+)["']""", re.I)
+_TITLE_RE = re.compile(r"""title\s*=\s*["']([^"']+)["']""", re.I)
+_TAG_RE = re.compile(r"<[^>]+>")
+_BRL_PRICE_RE = re.compile(r"R\$\s*(\d{1,3}(?:\.\d{3})*,\d{2}|\d+,\d{2})")
+
+
+def _clean_text(fragment: str):
+    return " ".join(html.unescape(_TAG_RE.sub(" ", fragment)).split())
+
+
+def matches_code(texto: str, codigo: str):
+    """Verifica se o código aparece como termo exato (não como parte de outro código)."""
+    # "6205" não casa com "6205-2RS" nem "16205", mas casa com "Rolamento 6205 SKF"
+    padrao = r"(?<![A-Z0-9])(?<![A-Z0-9][-/.])" + re.escape(codigo.strip().upper()) + r"(?![A-Z0-9]|[-/.][A-Z0-9])"
+    return re.search(padrao, texto.upper()) is not None
+
+
+def _link_shape(url: str):
+    """Formato do link: diretório do caminho e nomes dos parâmetros (/loja/produto/6205 ~ /loja/produto/6305)."""
+    partes = urlsplit(url)
+    return partes.path.rsplit("/", 1)[0], tuple(sorted(parse_qs(partes.query)))
+
+
+class SupplierAdapter:
+    """
+    Busca direta em um fornecedor via HTTP + parsing de HTML, sem navegador nem LLM.
+
+    `search` retorna o produto no mesmo formato do agente, ou None quando não há
+    correspondência exata do código com preço; nesse caso o chamador recorre ao Agent.
+    """
+
+    fornecedor = None
+    timeout = 10
+
+    def fetch(self, url: str):
+        req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            charset = resp.headers.get_content_charset() or "utf-8"
+            return resp.read().decode(charset, errors="replace")
+
+    def parse(self, page: str, base_url: str, codigo: str, marca: str = None):
+        raise NotImplementedError
+
+    async def search(self, search_url: str, codigo: str, marca: str = None):
+        """Busca `codigo` usando o template de URL de busca do fornecedor ({codigo})."""
+        url = search_url.format(codigo=quote(codigo, safe=""))
+        page = await asyncio.to_thread(self.fetch, url)
+        return self.parse(page, url, codigo, marca)
+
+
+class ListingAdapter(SupplierAdapter):
+    """
+    Adaptador para páginas de busca em lista: cada produto é um link com o nome
+    seguido do preço em reais. Usa o primeiro preço após o link do produto.
+    """
+
+    price_re = _BRL_PRICE_RE
+    currency = "R$"
+    unavailable_words = ("esgotado", "indisponível", "indisponivel", "sob consulta")
+
+    def parse(self, page: str, base_url: str, codigo: str, marca: str = None):
+        links = []
+        for match in _ANCHOR_RE.finditer(page):
+            attrs, inner = match.group(1), match.group(2)
+            href = _HREF_RE.search(attrs)
+            if not href:
+                continue
+            title = _TITLE_RE.search(attrs)
+            nome = _clean_text(title.group(1) if title else inner)
+            links.append((match, nome, urljoin(base_url, html.unescape(href.group(1)))))
+
+        anchors = [(i, nome, url) for i, (_, nome, url) in enumerate(links) if nome and matches_code(nome, codigo)]
+        # Links de outros produtos da lista: mesmo formato de URL de um link do
+        # código pedido, ou com o código como parte de outro (6205-2RS, 16205)
+        formatos = {_link_shape(url) for _, _, url in anchors}
+        produtos = [
+            (match, url) for match, nome, url in links
+            if _link_shape(url) in formatos or codigo.strip().upper() in nome.upper()
+        ]
+
+        candidatos = []
+        vistos = set()
+        for i, nome, url in anchors:
+            if url in vistos:
+                continue
+            match = links[i][0]
+            # O bloco do produto vai até o próximo link de outro produto, qualquer que seja o código
+            fim = next(
+                (outro.start() for outro, outra_url in produtos if outro.start() > match.start() and outra_url != url),
+                match.end() + 3000,
+            )
+            bloco = page[match.end():fim]
+            preco = self.price_re.search(bloco)
+            if not preco:
+                continue
+            vistos.add(url)
+            texto_bloco = _clean_text(bloco).lower()
+            candidatos.append({
+                "full_product_name": nome,
+                "part_number": codigo,
+                "price": f"{self.currency} {preco.group(1)}",
+                "stock_status": "" if not any(w in texto_bloco for w in self.unavailable_words) else "indisponível",
+                "direct_url": url,
+                "specifications": {},
+                "fornecedor": self.fornecedor,
+            })
+
+        candidatos = [c for c in candidatos if c["stock_status"] != "indisponível"]
+        if not candidatos:
+            return None
+        # Prioriza o produto com a marca pedida
+        if marca:
+            for candidato in candidatos:
+                if marca.strip().upper() in candidato["full_product_name"].upper():
+                    return candidato
+        return candidatos[0]
+
+
+class AbecomAdapter(ListingAdapter):
+    fornecedor = "Abecom"
+
+
+ADAPTADORES = {
+    adapter.fornecedor: adapter
+    for adapter in (AbecomAdapter(),)
+}
+
+
+def get_adapter(fornecedor: str):
+    """Retorna o adaptador HTTP do fornecedor, ou None se ele só puder ser lido pelo Agent."""
+    return ADAPTADORES.get(fornecedor)
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from cache_produtos import normalize_key
+
+logger = logging.getLogger(__name__)
+
+
+def parse_windows(texto: str):
+    """
+    Janelas de horário no formato "01:00-06:00,12:30-13:30" (hora local).
+
+    Uma janela que termina antes de começar atravessa a meia-noite (22:00-05:00).
+    Texto vazio retorna [] (sem restrição de horário); formato inválido levanta ValueError.
+    """
+    janelas = []
+    for parte in (texto or "").split(","):
+        parte = parte.strip()
+        if not parte:
+            continue
+        try:
+            inicio, fim = (
+                int(h) * 60 + int(m)
+                for h, m in (hora.strip().split(":") for hora in parte.split("-"))
+            )
+        except ValueError:
+            raise ValueError(f"Janela de horário inválida: '{parte}' (esperado HH:MM-HH:MM)")
+        janelas.append((inicio, fim))
+    return janelas
+
+
+def in_windows(janelas, agora: float = None):
+    """True se o horário local está em alguma janela (ou se não há janelas)."""
+    if not janelas:
+        return True
+    hora = time.localtime(agora)
+    minuto = hora.tm_hour * 60 + hora.tm_min
+    return any(
+        inicio <= minuto < fim if inicio <= fim else (minuto >= inicio or minuto < fim)
+        for inicio, fim in janelas
+    )
+
+
+class DemandTracker:
+    """
+    Frequência de pedidos por (codigo, marca), com decaimento exponencial.
+
+    Cada pedido soma 1 à pontuação, que cai pela metade a cada `meia_vida`
+    segundos. A ordem é guardada como log2(pontuação) + t / meia_vida, que não
+    muda com o tempo, então `due` ordena direto no SQLite. O arquivo também
+    guarda quando cada produto foi aquecido e qual processo lidera o aquecimento.
+    """
+
+    def __init__(self, path: str, meia_vida: float = 3 * 24 * 3600):
+        self.path = path
+        self.meia_vida = meia_vida
+        self._lock = threading.Lock()
+
+        diretorio = os.path.dirname(os.path.abspath(path))
+        os.makedirs(diretorio, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS demanda (
+                chave_codigo TEXT NOT NULL,
+                chave_marca TEXT NOT NULL,
+                codigo TEXT NOT NULL,
+                marca TEXT,
+                pontuacao REAL NOT NULL,
+                prioridade REAL NOT NULL,
+                atualizado_em REAL NOT NULL,
+                aquecido_em REAL,
+                PRIMARY KEY (chave_codigo, chave_marca)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_demanda_prioridade ON demanda (prioridade)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS lider (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                dono TEXT NOT NULL,
+                expira_em REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _decay(self, pontuacao: float, desde: float, agora: float):
+        return pontuacao * 2 ** (-(agora - desde) / self.meia_vida)
+
+    def record(self, codigo: str, marca: str = None):
+        """Conta um pedido do produto."""
+        chave = normalize_key(codigo, marca)
+        agora = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pontuacao, atualizado_em FROM demanda WHERE chave_codigo = ? AND chave_marca = ?",
+                chave,
+            ).fetchone()
+            pontuacao = (self._decay(*row, agora) if row else 0.0) + 1
+            self._conn.execute(
+                """
+                INSERT INTO demanda (chave_codigo, chave_marca, codigo, marca, pontuacao, prioridade, atualizado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (chave_codigo, chave_marca) DO UPDATE SET
+                    pontuacao = excluded.pontuacao, prioridade = excluded.prioridade,
+                    atualizado_em = excluded.atualizado_em
+                """,
+                (*chave, codigo, marca, pontuacao, math.log2(pontuacao) + agora / self.meia_vida, agora),
+            )
+            self._conn.commit()
+
+    def due(self, limite: int, min_pontuacao: float, renovar_apos: float):
+        """
+        Os `limite` produtos mais pedidos, com pontuação atual >= `min_pontuacao`,
+        que não foram aquecidos nos últimos `renovar_apos` segundos.
+
+        Retorna [(codigo, marca, pontuacao)] do mais para o menos pedido.
+        """
+        agora = time.time()
+        with self._lock:
+            ranking = self._conn.execute(
+                """
+                SELECT codigo, marca, pontuacao, atualizado_em, aquecido_em FROM demanda
+                WHERE prioridade >= ? ORDER BY prioridade DESC LIMIT ?
+                """,
+                (math.log2(min_pontuacao) + agora / self.meia_vida, limite),
+            ).fetchall()
+        return [
+            (codigo, marca, round(self._decay(pontuacao, atualizado_em, agora), 2))
+            for codigo, marca, pontuacao, atualizado_em, aquecido_em in ranking
+            if aquecido_em is None or agora - aquecido_em >= renovar_apos
+        ]
+
+    def mark_warmed(self, codigo: str, marca: str = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE demanda SET aquecido_em = ? WHERE chave_codigo = ? AND chave_marca = ?",
+                (time.time(), *normalize_key(codigo, marca)),
+            )
+            self._conn.commit()
+
+    def lead(self, dono: str, duracao: float):
+        """Assume (ou renova) a liderança do aquecimento por `duracao` segundos; False se outro processo lidera."""
+        agora = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO lider (id, dono, expira_em) VALUES (1, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET dono = excluded.dono, expira_em = excluded.expira_em
+                WHERE lider.dono = excluded.dono OR lider.expira_em < ?
+                """,
+                (dono, agora + duracao, agora),
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+
+class CacheWarmer:
+    """
+    Renova em segundo plano o cache dos produtos mais pedidos antes que ele expire.
+
+    A cada `intervalo` segundos, dentro das `janelas` de horário, pega os
+    `limite` produtos mais pedidos (DemandTracker.due) e chama `refresh(codigo,
+    marca)` para os que estão sem cache ou com cache de idade >= `renovar_apos`
+    (`idade(codigo, marca)`, None sem entrada), no máximo `concorrencia` por vez.
+    Enquanto `ocupado()` for verdadeiro (pedidos interativos esperando agente),
+    novos aquecimentos esperam o próximo ciclo. Com vários processos usando o
+    mesmo arquivo de demanda, só o líder (DemandTracker.lead) aquece.
+    """
+
+    def __init__(self, demanda: DemandTracker, refresh, idade, renovar_apos: float, janelas=(),
+                 concorrencia: int = 2, limite: int = 200, min_pontuacao: float = 2.0,
+                 intervalo: float = 300, ocupado=None):
+        self.demanda = demanda
+        self.refresh = refresh
+        self.idade = idade
+        self.renovar_apos = renovar_apos
+        self.janelas = janelas
+        self.concorrencia = concorrencia
+        self.limite = limite
+        self.min_pontuacao = min_pontuacao
+        self.intervalo = intervalo
+        self.ocupado = ocupado or (lambda: False)
+        self.dono = f"{socket.gethostname()}:{os.getpid()}"
+
+    def _pode_aquecer(self):
+        return in_windows(self.janelas) and not self.ocupado() and self.demanda.lead(self.dono, 2 * self.intervalo)
+
+    async def _warm(self, codigo: str, marca: str, semaforo: asyncio.Semaphore):
+        async with semaforo:
+            if not self._pode_aquecer():
+                return False
+            idade = self.idade(codigo, marca)
+            if idade is not None and idade < self.renovar_apos:
+                # Renovado por um pedido interativo; volta a ser verificado no próximo ciclo
+                return True
+            logger.info(f"Aquecendo cache de {codigo} (marca={marca})")
+            try:
+                await self.refresh(codigo, marca)
+            except Exception as e:
+                logger.warning(f"Falha ao aquecer {codigo}: {str(e)}")
+            self.demanda.mark_warmed(codigo, marca)
+            return True
+
+    async def run_once(self):
+        """Um ciclo de aquecimento; retorna quantos produtos foram verificados."""
+        if not self._pode_aquecer():
+            return 0
+        candidatos = self.demanda.due(self.limite, self.min_pontuacao, self.renovar_apos)
+        if not candidatos:
+            return 0
+        logger.info(f"Aquecimento: {len(candidatos)} produtos populares a verificar")
+        semaforo = asyncio.Semaphore(self.concorrencia)
+        verificados = await asyncio.gather(*(
+            self._warm(codigo, marca, semaforo) for codigo, marca, _ in candidatos
+        ))
+        return sum(verificados)
+
+    async def run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Erro no aquecimento do cache: {str(e)}")
+            await asyncio.sleep(self.intervalo)
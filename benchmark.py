@@ -0,0 +1,438 @@
+"""
+Benchmark offline de search_product e search_multiple_products.
+
+Sobe um servidor HTTP local com versões fixture das páginas de busca e de produto
+de cada fornecedor (benchmark_fixtures/), aponta o registro de fornecedores para
+ele e troca o gpt-4o por um LLM roteirizado, de modo que nada acessa a rede.
+Playbooks e ordenação adaptativa ficam desligados para que as repetições meçam
+sempre o mesmo caminho. Requer apenas o Chromium local usado pelo serviço.
+
+Uso:
+    python benchmark.py --lotes 1,5,20 --repeticoes 3
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_fixtures")
+
+_PRICE_RE = re.compile(r"(R\$|\$|£|€)\s?(\d[\d.,]*\d)")
+_ASSET_BYTES = b"\0" * 50_000
+
+
+def load_catalogo():
+    with open(os.path.join(FIXTURES_DIR, "catalogo.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _template(nome):
+    with open(os.path.join(FIXTURES_DIR, nome), encoding="utf-8") as f:
+        return f.read()
+
+
+class FixtureServer:
+    """Servidor HTTP local que imita as páginas de busca e produto dos fornecedores."""
+
+    def __init__(self, catalogo, atraso: float = 0.0):
+        self.catalogo = catalogo
+        self.atraso = atraso
+        self.fornecedores = {f["slug"]: f for f in catalogo["fornecedores"]}
+        self.busca_html = _template("busca.html")
+        self.produto_html = _template("produto.html")
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.port = self._server.server_address[1]
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="fixtures", daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+
+    def render_busca(self, fornecedor, termo):
+        itens = []
+        for codigo, produto in self.catalogo["produtos"].items():
+            preco = produto["precos"].get(fornecedor["slug"])
+            # Como nos sites reais, a busca devolve também códigos que contêm o termo
+            if preco is None or termo.upper() not in codigo.upper():
+                continue
+            itens.append(
+                f'<div class="produto"><a href="/{fornecedor["slug"]}/produto/{quote(codigo, safe="")}" '
+                f'title="Rolamento {codigo} {produto["marca"]}">Rolamento {codigo} {produto["marca"]}</a>'
+                f'<span class="preco">{fornecedor["moeda"]} {preco}</span></div>'
+            )
+        resultados = "\n".join(itens) or '<p class="vazio">Nenhum produto encontrado</p>'
+        return self._fill(self.busca_html, fornecedor=fornecedor["nome"], slug=fornecedor["slug"],
+                          codigo=termo, resultados=resultados)
+
+    def render_produto(self, fornecedor, codigo):
+        produto = self.catalogo["produtos"].get(codigo)
+        if produto is None or fornecedor["slug"] not in produto["precos"]:
+            return None
+        return self._fill(self.produto_html, fornecedor=fornecedor["nome"], codigo=codigo,
+                          marca=produto["marca"], moeda=fornecedor["moeda"],
+                          preco=produto["precos"][fornecedor["slug"]])
+
+    @staticmethod
+    def _fill(template, **valores):
+        for chave, valor in valores.items():
+            template = template.replace("{" + chave + "}", valor)
+        return template
+
+    def _handler_class(self):
+        fixtures = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type="text/html; charset=utf-8"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if fixtures.atraso:
+                    time.sleep(fixtures.atraso)
+                url = urlsplit(self.path)
+                partes = [unquote(p) for p in url.path.strip("/").split("/")]
+                if partes[0] == "static":
+                    return self._send(200, _ASSET_BYTES, "application/octet-stream")
+
+                fornecedor = fixtures.fornecedores.get(partes[0])
+                if fornecedor is None:
+                    return self._send(404, b"not found")
+                if len(partes) == 1:
+                    return self._send(200, fixtures.render_busca(fornecedor, "").encode())
+                if partes[1] == "busca":
+                    termo = parse_qs(url.query).get("q", [""])[0]
+                    return self._send(200, fixtures.render_busca(fornecedor, termo).encode())
+                if partes[1] == "produto" and len(partes) > 2:
+                    html = fixtures.render_produto(fornecedor, "/".join(partes[2:]))
+                    if html is not None:
+                        return self._send(200, html.encode())
+                return self._send(404, b"not found")
+
+        return Handler
+
+
+def write_registro(catalogo, base_url, path):
+    """Grava um registro de fornecedores (formato de fornecedores.py) apontando para as fixtures."""
+    registro = [
+        {
+            "nome": f["nome"],
+            "url_inicial": f"{base_url}/{f['slug']}",
+            "url_busca": f"{base_url}/{f['slug']}/busca?q={{codigo}}",
+            "prioridade": i + 1,
+            "seletor_resultados": ".produto, .vazio, .preco",
+        }
+        for i, f in enumerate(catalogo["fornecedores"])
+    ]
+    with open(path, "w", encoding="utf-8") as fp:
+        json.dump(registro, fp, ensure_ascii=False)
+
+
+def _message_text(message):
+    content = getattr(message, "content", "")
+    if isinstance(content, str):
+        return content
+    return "\n".join(getattr(part, "text", "") for part in content or [])
+
+
+class ScriptedLLM:
+    """
+    Substituto do gpt-4o para o benchmark.
+
+    Cada Agent tem seu próprio modelo de saída (AgentOutput), então o passo de
+    cada agente é contado por esse tipo: no primeiro passo navega para a URL de
+    busca da tarefa; no seguinte finaliza com o preço lido da página, ou com
+    produto null se a página não mostrar o código com preço. A extração de uma
+    chamada do replay de playbooks (RespostaProduto) lê o preço do mesmo jeito.
+    """
+
+    model = "benchmark-scripted"
+    _verified_api_keys = True
+
+    def __init__(self, latencia: float = 0.0):
+        self.latencia = latencia
+        self.chamadas = 0
+        self._passos = weakref.WeakKeyDictionary()
+
+    @property
+    def provider(self):
+        return "benchmark"
+
+    @property
+    def name(self):
+        return self.model
+
+    @property
+    def model_name(self):
+        return self.model
+
+    async def ainvoke(self, messages, output_format=None):
+        from browser_use.llm.views import ChatInvokeCompletion
+
+        self.chamadas += 1
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+
+        textos = [_message_text(m) for m in messages]
+        completion = self._complete(textos, output_format)
+        tokens = sum(len(t) for t in textos) // 4
+        return ChatInvokeCompletion(completion=completion, usage=self._usage(tokens))
+
+    @staticmethod
+    def _usage(prompt_tokens):
+        try:
+            from browser_use.llm.views import ChatInvokeUsage
+
+            return ChatInvokeUsage(
+                prompt_tokens=prompt_tokens,
+                prompt_cached_tokens=None,
+                prompt_cache_creation_tokens=None,
+                prompt_image_tokens=None,
+                completion_tokens=50,
+                total_tokens=prompt_tokens + 50,
+            )
+        except Exception:
+            return None
+
+    def _complete(self, textos, output_format):
+        if output_format is None:
+            return "ok"
+        if "produto" in getattr(output_format, "model_fields", {}):
+            tarefa = "\n".join(textos)
+            codigo = re.search(r"código exatamente (\S+)", tarefa)
+            fornecedor = re.search(r'fornecedor: "([^"]+)"', tarefa)
+            return output_format.model_validate({"produto": self._find_produto(
+                tarefa.split("\n\n", 1)[-1].splitlines(), codigo.group(1) if codigo else "", fornecedor.group(1) if fornecedor else ""
+            )})
+        if "action" not in getattr(output_format, "model_fields", {}):
+            # Chamadas auxiliares (ex.: avaliação final): devolve o modelo com valores padrão
+            return output_format.model_construct()
+
+        passo = self._passos.get(output_format, 0)
+        self._passos[output_format] = passo + 1
+
+        tarefa = "\n".join(textos)
+        codigo = re.search(r"Pesquise o produto (\S+)", tarefa)
+        url = re.search(r"Abra (\S+)", tarefa)
+        fornecedor = re.search(r'fornecedor: "([^"]+)"', tarefa)
+        codigo = codigo.group(1) if codigo else ""
+
+        if passo == 0 and url:
+            return self._action(output_format, [
+                {"navigate": {"url": url.group(1), "new_tab": False}},
+                {"go_to_url": {"url": url.group(1), "new_tab": False}},
+                {"go_to_url": {"url": url.group(1)}},
+            ])
+
+        linhas = (textos[-1] if textos else "").splitlines()
+        data = {"produto": self._find_produto(linhas, codigo, fornecedor.group(1) if fornecedor else "")}
+        return self._action(output_format, [
+            {"done": {"success": True, "data": data}},
+            {"done": {"success": True, "text": json.dumps(data, ensure_ascii=False)}},
+            {"done": {"text": json.dumps(data, ensure_ascii=False)}},
+        ])
+
+    @staticmethod
+    def _find_produto(linhas, codigo, fornecedor):
+        codigo_re = re.compile(r"(?<![\w-])" + re.escape(codigo) + r"(?![\w-])")
+        for i, linha in enumerate(linhas):
+            if not codigo or not codigo_re.search(linha):
+                continue
+            # O preço costuma vir no mesmo elemento ou logo abaixo do nome do produto
+            preco = _PRICE_RE.search("\n".join(linhas[i:i + 4]))
+            if preco:
+                return {
+                    "full_product_name": f"Rolamento {codigo}",
+                    "part_number": codigo,
+                    "price": f"{preco.group(1)} {preco.group(2)}",
+                    "stock_status": "Em estoque",
+                    "fornecedor": fornecedor,
+                }
+        return None
+
+    @staticmethod
+    def _action(output_format, candidatos):
+        # O nome/formato das ações muda entre versões do browser-use: usa o primeiro que valida
+        erro = None
+        for acao in candidatos:
+            try:
+                return output_format.model_validate({
+                    "thinking": "",
+                    "evaluation_previous_goal": "",
+                    "memory": "",
+                    "next_goal": "",
+                    "action": [acao],
+                })
+            except Exception as e:
+                erro = e
+        raise RuntimeError(f"Nenhuma ação roteirizada é válida para {output_format.__name__}: {erro}")
+
+
+class RssSampler:
+    """Amostra o RSS do processo e dos navegadores filhos em segundo plano."""
+
+    def __init__(self, intervalo: float = 0.2):
+        self.intervalo = intervalo
+        self.pico_mb = 0.0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        from concorrencia import process_tree_rss_mb
+
+        def amostrar():
+            while not self._stop.is_set():
+                self.pico_mb = max(self.pico_mb, process_tree_rss_mb() or 0.0)
+                self._stop.wait(self.intervalo)
+
+        self._thread = threading.Thread(target=amostrar, name="rss", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p / 100
+    i = int(k)
+    if i + 1 >= len(ordenados):
+        return ordenados[-1]
+    return ordenados[i] + (ordenados[i + 1] - ordenados[i]) * (k - i)
+
+
+def resumo(nome, latencias, duracao, produtos, pico_rss, launches, encontrados):
+    return {
+        "cenario": nome,
+        "amostras": len(latencias),
+        "p50_s": round(percentil(latencias, 50), 3),
+        "p90_s": round(percentil(latencias, 90), 3),
+        "p99_s": round(percentil(latencias, 99), 3),
+        "media_s": round(statistics.mean(latencias), 3) if latencias else 0.0,
+        "throughput_produtos_s": round(produtos / duracao, 3) if duracao else 0.0,
+        "pico_rss_mb": round(pico_rss, 1),
+        "navegadores_iniciados": launches,
+        "precos_encontrados": encontrados,
+    }
+
+
+async def run_benchmark(servico, catalogo, lotes, repeticoes):
+    pool = await servico.get_browser_pool()
+    codigos = list(catalogo["produtos"])
+    relatorio = []
+
+    # search_product: cada código isoladamente
+    launches_antes = pool.launches
+    latencias, encontrados = [], 0
+    with RssSampler() as rss:
+        inicio = time.monotonic()
+        for _ in range(repeticoes):
+            for codigo in codigos:
+                t0 = time.monotonic()
+                result = await servico.search_product(codigo, catalogo["produtos"][codigo]["marca"], fresh=True)
+                latencias.append(time.monotonic() - t0)
+                encontrados += bool(result.get("produto"))
+        duracao = time.monotonic() - inicio
+    relatorio.append(resumo("search_product", latencias, duracao, len(latencias),
+                            rss.pico_mb, pool.launches - launches_antes, encontrados))
+
+    # search_multiple_products: lotes de tamanhos configuráveis, sem cache
+    for tamanho in lotes:
+        produtos = [
+            {"codigo": codigos[i % len(codigos)], "marca": catalogo["produtos"][codigos[i % len(codigos)]]["marca"],
+             "quantidade": 1}
+            for i in range(tamanho)
+        ]
+        launches_antes = pool.launches
+        latencias, encontrados = [], 0
+        with RssSampler() as rss:
+            inicio = time.monotonic()
+            for _ in range(repeticoes):
+                t0 = time.monotonic()
+                results = await servico.search_multiple_products(produtos, fresh=True)
+                latencias.append(time.monotonic() - t0)
+                encontrados += sum(bool(r.get("produto")) for r in results["resultados"])
+            duracao = time.monotonic() - inicio
+        relatorio.append(resumo(f"search_multiple_products[{tamanho}]", latencias, duracao,
+                                tamanho * repeticoes, rss.pico_mb, pool.launches - launches_antes, encontrados))
+
+    await pool.close()
+    return relatorio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline das buscas de produtos")
+    parser.add_argument("--lotes", default="1,5,20", help="Tamanhos de lote de /produtos, separados por vírgula")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--latencia-llm", type=float, default=0.0, help="Latência simulada por chamada ao LLM (s)")
+    parser.add_argument("--atraso-pagina", type=float, default=0.0, help="Atraso do servidor de fixtures por página (s)")
+    parser.add_argument("--json", help="Grava o relatório em JSON neste arquivo")
+    args = parser.parse_args(argv)
+
+    catalogo = load_catalogo()
+    fixtures = FixtureServer(catalogo, atraso=args.atraso_pagina)
+    fixtures.start()
+
+    # Configura o serviço antes de importá-lo: registro local e bancos temporários
+    tmp = tempfile.mkdtemp(prefix="rpm_benchmark_")
+    registro = os.path.join(tmp, "fornecedores.json")
+    write_registro(catalogo, fixtures.base_url, registro)
+    os.environ["FORNECEDORES_FILE"] = registro
+    os.environ.setdefault("CACHE_DB_PATH", os.path.join(tmp, "cache.sqlite3"))
+    os.environ.setdefault("JOBS_DB_PATH", os.path.join(tmp, "jobs.sqlite3"))
+    os.environ.setdefault("TASK_QUEUE_DB_PATH", os.path.join(tmp, "fila.sqlite3"))
+    os.environ.setdefault("SUPPLIER_STATS_DB_PATH", os.path.join(tmp, "fornecedor_stats.sqlite3"))
+    os.environ.setdefault("DEMAND_DB_PATH", os.path.join(tmp, "demanda.sqlite3"))
+    os.environ.setdefault("CATALOG_DB_PATH", os.path.join(tmp, "catalogo.sqlite3"))
+    os.environ.setdefault("PLAYBOOKS_DIR", os.path.join(tmp, "playbooks"))
+    # Playbooks gravados e o histórico de acertos persistem entre repetições e
+    # mudariam o caminho medido (replay, ondas); todas as repetições usam o agente
+    os.environ["PLAYBOOKS_ENABLED"] = "0"
+    os.environ["ADAPTIVE_ORDERING_ENABLED"] = "0"
+
+    import browser_use_rpm_do_brasil as servico
+    from metricas import InstrumentedLLM
+
+    logging.getLogger().setLevel(logging.WARNING)
+    llm = ScriptedLLM(latencia=args.latencia_llm)
+    servico.llm = InstrumentedLLM(llm)
+
+    lotes = [int(x) for x in args.lotes.split(",") if x.strip()]
+    try:
+        relatorio = asyncio.run(run_benchmark(servico, catalogo, lotes, args.repeticoes))
+    finally:
+        fixtures.stop()
+
+    for linha in relatorio:
+        print(json.dumps(linha, ensure_ascii=False))
+    print(json.dumps({"chamadas_llm": llm.chamadas}), file=sys.stderr)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"relatorio": relatorio, "chamadas_llm": llm.chamadas}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Tipos de recurso do CDP (Network.ResourceType) bloqueados por padrão
+TIPOS_BLOQUEADOS_PADRAO = ("Image", "Media", "Font")
+
+# Analytics, anúncios e widgets de chat: não ajudam a ler preço nem especificações
+DOMINIOS_BLOQUEADOS_PADRAO = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "facebook.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "criteo.com",
+    "bing.com",
+    "linkedin.com",
+    "tiktok.com",
+    "intercom.io",
+    "zdassets.com",
+    "zopim.com",
+    "tawk.to",
+    "livechatinc.com",
+    "hubspot.com",
+    "youtube.com",
+    "vimeo.com",
+)
+
+# Tamanho médio aproximado por tipo, usado para estimar os bytes economizados:
+# requisições bloqueadas nunca são baixadas, então o tamanho real é desconhecido
+TAMANHO_ESTIMADO = {
+    "Image": 40_000,
+    "Media": 500_000,
+    "Font": 35_000,
+    "Script": 60_000,
+    "Stylesheet": 25_000,
+}
+TAMANHO_ESTIMADO_OUTROS = 10_000
+
+
+def _env_list(name: str, default):
+    value = os.getenv(name)
+    if value is None:
+        return tuple(default)
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+def _host_matches(host: str, dominios):
+    return any(host == d or host.endswith("." + d) for d in dominios)
+
+
+class ResourceBlocker:
+    """
+    Bloqueia tipos de recurso e domínios de terceiros nas abas de um BrowserSession.
+
+    Usa o domínio Fetch do CDP: só as requisições que casam com os padrões são
+    pausadas, e então falham com BlockedByClient, a não ser que o host esteja em
+    `dominios_permitidos`. `attach` deve ser chamado a cada passo do agente para
+    cobrir abas novas; `detach` desliga a interceptação ao devolver o navegador.
+    """
+
+    def __init__(self, tipos_bloqueados=TIPOS_BLOQUEADOS_PADRAO,
+                 dominios_bloqueados=DOMINIOS_BLOQUEADOS_PADRAO, dominios_permitidos=()):
+        self.tipos_bloqueados = tuple(tipos_bloqueados)
+        self.dominios_bloqueados = tuple(dominios_bloqueados)
+        self.dominios_permitidos = tuple(dominios_permitidos)
+        self.bloqueadas = Counter()
+        self._browser_session = None
+        self._sessions = {}
+        self._pending = set()
+
+    @classmethod
+    def for_fornecedor(cls, fornecedor):
+        """Bloqueador com os padrões do serviço menos as exceções do fornecedor."""
+        tipos = _env_list("BLOCK_RESOURCE_TYPES", TIPOS_BLOQUEADOS_PADRAO)
+        dominios = _env_list("BLOCK_DOMAINS", DOMINIOS_BLOQUEADOS_PADRAO)
+        return cls(
+            tipos_bloqueados=[t for t in tipos if t not in fornecedor.tipos_permitidos],
+            dominios_bloqueados=dominios,
+            dominios_permitidos=fornecedor.dominios_permitidos,
+        )
+
+    def _patterns(self):
+        patterns = [{"urlPattern": "*", "resourceType": tipo, "requestStage": "Request"} for tipo in self.tipos_bloqueados]
+        for dominio in self.dominios_bloqueados:
+            patterns.append({"urlPattern": f"*://{dominio}/*", "requestStage": "Request"})
+            patterns.append({"urlPattern": f"*://*.{dominio}/*", "requestStage": "Request"})
+        return patterns
+
+    async def attach(self, browser_session):
+        """Ativa o bloqueio na aba atual do navegador (idempotente por aba)."""
+        if not self.tipos_bloqueados and not self.dominios_bloqueados:
+            return
+        if self._browser_session is not browser_session:
+            self._browser_session = browser_session
+            browser_session.cdp_client.register.Fetch.requestPaused(self._on_request_paused)
+
+        try:
+            cdp_session = await browser_session.get_or_create_cdp_session()
+            if cdp_session.target_id in self._sessions:
+                return
+            await cdp_session.cdp_client.send.Fetch.enable(
+                params={"patterns": self._patterns()}, session_id=cdp_session.session_id
+            )
+            self._sessions[cdp_session.target_id] = cdp_session.session_id
+        except Exception as e:
+            logger.warning(f"Não foi possível ativar o bloqueio de recursos: {e}")
+
+    def _on_request_paused(self, event, session_id=None):
+        task = asyncio.ensure_future(self._handle(event, session_id))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _handle(self, event, session_id):
+        send = self._browser_session.cdp_client.send
+        request_id = event["requestId"]
+        host = urlsplit(event["request"]["url"]).hostname or ""
+        try:
+            if _host_matches(host, self.dominios_permitidos):
+                await send.Fetch.continueRequest(params={"requestId": request_id}, session_id=session_id)
+                return
+            await send.Fetch.failRequest(
+                params={"requestId": request_id, "errorReason": "BlockedByClient"}, session_id=session_id
+            )
+            self.bloqueadas[event.get("resourceType", "Other")] += 1
+        except Exception as e:
+            logger.debug(f"Falha ao tratar requisição interceptada: {e}")
+
+    def blocks(self, url: str, resource_type: str):
+        """
+        Decide (e contabiliza) o bloqueio de uma requisição fora do CDP.
+
+        Usado no replay de playbooks pelo Playwright, que nomeia os tipos em
+        minúsculas ("image", "font"); a comparação ignora maiúsculas.
+        """
+        host = urlsplit(url).hostname or ""
+        if _host_matches(host, self.dominios_permitidos):
+            return False
+        tipo = next((t for t in self.tipos_bloqueados if t.lower() == resource_type.lower()), None)
+        if tipo is None and not _host_matches(host, self.dominios_bloqueados):
+            return False
+        self.bloqueadas[tipo or resource_type.capitalize()] += 1
+        return True
+
+    async def detach(self):
+        """Desliga a interceptação nas abas em que foi ativada."""
+        if self._browser_session is None:
+            return
+        for session_id in self._sessions.values():
+            try:
+                await self._browser_session.cdp_client.send.Fetch.disable(session_id=session_id)
+            except Exception:
+                # Aba já fechada
+                pass
+        self._sessions.clear()
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    def stats(self):
+        """Requisições bloqueadas por tipo e estimativa de bytes não baixados."""
+        return {
+            "requisicoes_bloqueadas": sum(self.bloqueadas.values()),
+            "por_tipo": dict(self.bloqueadas),
+            "bytes_economizados_estimados": sum(
+                TAMANHO_ESTIMADO.get(tipo, TAMANHO_ESTIMADO_OUTROS) * n for tipo, n in self.bloqueadas.items()
+            ),
+        }
+
+
+def merge_stats(stats_list):
+    """Soma as estatísticas de bloqueio de vários agentes de uma mesma busca."""
+    total = {"requisicoes_bloqueadas": 0, "por_tipo": Counter(), "bytes_economizados_estimados": 0}
+    for stats in stats_list:
+        total["requisicoes_bloqueadas"] += stats["requisicoes_bloqueadas"]
+        total["por_tipo"].update(stats["por_tipo"])
+        total["bytes_economizados_estimados"] += stats["bytes_economizados_estimados"]
+    total["por_tipo"] = dict(total["por_tipo"])
+    return total
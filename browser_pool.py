@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from browser_use.browser.events import CloseTabEvent, NavigateToUrlEvent, SwitchTabEvent
+from browser_use.browser.profile import BrowserProfile
+from browser_use.browser.session import BrowserSession
+
+import metricas
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserPool:
+    """
+    Pool de navegadores Chromium pré-iniciados, compartilhado entre requisições.
+
+    Cada busca pega um navegador emprestado com `lease()` e o devolve ao final,
+    com uma única aba em about:blank. Navegadores que não respondem ao health
+    check ou não voltam a esse estado são descartados e substituídos.
+    """
+
+    def __init__(self, browser_profile: BrowserProfile, size: int = 4, health_timeout: float = 5.0):
+        if size < 1:
+            raise ValueError(f"Tamanho do pool deve ser >= 1. Recebido: {size}")
+        # keep_alive impede que o Agent encerre o navegador ao terminar a tarefa
+        self.browser_profile = browser_profile.model_copy(update={"keep_alive": True})
+        self.size = size
+        self.health_timeout = health_timeout
+        self.launches = 0
+        self._idle = asyncio.Queue()
+        self._sessions = set()
+        self._pending_launches = 0
+        self._closed = False
+
+    async def start(self):
+        """Pré-inicia todos os navegadores do pool."""
+        inicio = time.monotonic()
+        sessions = await asyncio.gather(
+            *[self._launch() for _ in range(self.size - len(self._sessions))],
+            return_exceptions=True,
+        )
+        for session in sessions:
+            if isinstance(session, Exception):
+                logger.error(f"Falha ao iniciar navegador do pool: {session}")
+            else:
+                self._idle.put_nowait(session)
+        logger.info(
+            f"Pool de navegadores pronto: {self._idle.qsize()}/{self.size} "
+            f"em {time.monotonic() - inicio:.1f}s"
+        )
+
+    async def _launch(self):
+        self._pending_launches += 1
+        try:
+            inicio = time.monotonic()
+            session = BrowserSession(browser_profile=self.browser_profile)
+            await session.start()
+            metricas.BROWSER_LAUNCH_DURATION.observe(time.monotonic() - inicio)
+            self.launches += 1
+            self._sessions.add(session)
+            logger.debug(f"Navegador iniciado em {time.monotonic() - inicio:.1f}s")
+            return session
+        finally:
+            self._pending_launches -= 1
+
+    async def _discard(self, session):
+        self._sessions.discard(session)
+        try:
+            await session.kill()
+        except Exception as e:
+            logger.warning(f"Erro ao encerrar navegador: {e}")
+
+    async def is_healthy(self, session) -> bool:
+        """Verifica se o navegador ainda responde via CDP."""
+        try:
+            await asyncio.wait_for(
+                session.cdp_client.send.Browser.getVersion(), timeout=self.health_timeout
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"Navegador do pool não respondeu ao health check: {e}")
+            return False
+
+    async def _acquire(self):
+        while True:
+            if self._idle.empty() and len(self._sessions) + self._pending_launches < self.size:
+                launch = asyncio.ensure_future(self._launch())
+                try:
+                    session = await asyncio.shield(launch)
+                except asyncio.CancelledError:
+                    # Quem pediu desistiu: o navegador recém-iniciado vai para o pool
+                    launch.add_done_callback(self._keep_launched)
+                    raise
+            else:
+                session = await self._idle.get()
+                if session is None:
+                    # Aviso de vaga liberada (_keep_launched): refaz a conta e inicia um navegador
+                    continue
+
+            if await self.is_healthy(session):
+                return session
+
+            # Navegador travado ou encerrado: substitui por um novo
+            await self._discard(session)
+
+    def _keep_launched(self, launch):
+        if launch.cancelled() or launch.exception() is not None:
+            if not launch.cancelled():
+                logger.error(f"Falha ao repor navegador do pool: {launch.exception()}")
+            # Acorda quem espera em _idle.get() para tentar iniciar outro navegador
+            self._idle.put_nowait(None)
+        elif self._closed:
+            asyncio.ensure_future(self._discard(launch.result()))
+        else:
+            self._idle.put_nowait(launch.result())
+
+    def _replace(self):
+        # Quem já espera em _idle.get() não refaz a conta de vagas: o descartado precisa ser reposto
+        launch = asyncio.ensure_future(self._launch())
+        launch.add_done_callback(self._keep_launched)
+
+    async def _reset_tabs(self, session):
+        tabs = await session.get_tabs()
+        for tab in tabs[1:]:
+            await session.event_bus.dispatch(CloseTabEvent(target_id=tab.target_id))
+        # Sem abas, SwitchTabEvent sem target_id cria uma nova
+        await session.event_bus.dispatch(SwitchTabEvent(target_id=tabs[0].target_id if tabs else None))
+        navegacao = session.event_bus.dispatch(NavigateToUrlEvent(url="about:blank"))
+        await navegacao
+        await navegacao.event_result(raise_if_any=True, raise_if_none=False)
+
+    async def _reset(self, session) -> bool:
+        """Fecha as abas extras e leva a restante para about:blank; False se o navegador não responder."""
+        try:
+            await asyncio.wait_for(self._reset_tabs(session), timeout=2 * self.health_timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"Falha ao limpar as abas do navegador devolvido: {e}")
+            return False
+
+    async def _release(self, session):
+        # A próxima busca não herda abas nem a página (e seus scripts) da anterior
+        if not self._closed and await self.is_healthy(session) and await self._reset(session):
+            self._idle.put_nowait(session)
+        else:
+            await self._discard(session)
+            if not self._closed:
+                self._replace()
+
+    @asynccontextmanager
+    async def lease(self):
+        """Empresta um navegador do pool durante o bloco `async with`."""
+        if self._closed:
+            raise RuntimeError("Pool de navegadores encerrado")
+
+        session = await self._acquire()
+        try:
+            yield session
+        finally:
+            # shield garante a devolução mesmo se a busca for cancelada
+            await asyncio.shield(self._release(session))
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "running": len(self._sessions),
+            "launches": self.launches,
+        }
+
+    async def close(self):
+        """Encerra todos os navegadores do pool."""
+        self._closed = True
+        await asyncio.gather(
+            *[self._discard(session) for session in list(self._sessions)],
+            return_exceptions=True,
+        )
@@ -10,6 +10,28 @@ import os
 import glob
 import subprocess
 import shutil
+import threading
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from functools import lru_cache
+import queue
+
+from acoes_navegador import build_tools, mark_document
+from adaptadores import get_adapter
+from aquecimento import CacheWarmer, DemandTracker, parse_windows
+from bloqueio_recursos import ResourceBlocker, merge_stats
+from browser_pool import BrowserPool
+from cache_produtos import MissCache, ProductCache, normalize_key
+from catalogo import ProductCatalog
+from concorrencia import SEGUNDO_PLANO, AdmissionScheduler, SingleFlight
+from estatisticas import SupplierStats
+from fila_tarefas import FINALIZADOS, TaskQueue
+from fornecedores import Fornecedor, build_prompt, load_fornecedores
+from jobs import JobStore, RUNNING, DONE, FAILED
+import metricas
+from modelos import RespostaProduto, parse_produto
+from orcamento import BudgetedLLM, Orcamento, TokenBudgetExceeded
+from playbooks import PlaybookError, PlaybookStore, extract_produto, record_playbook, replay_playbook, stop_playwright
 
 # Configurar logging para depuração
 logging.basicConfig(level=logging.DEBUG)
@@ -17,8 +39,38 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+def playwright_chromium_path():
+    """Caminho do Chromium segundo o registro do Playwright (browsers.json), sem iniciar o driver."""
+    try:
+        import playwright
+    except ImportError:
+        return None
+
+    browsers_json = os.path.join(os.path.dirname(playwright.__file__), "driver", "package", "browsers.json")
+    try:
+        with open(browsers_json) as f:
+            browsers = json.load(f)["browsers"]
+    except (OSError, ValueError, KeyError) as e:
+        logger.debug(f"Registro do Playwright indisponível: {e}")
+        return None
+
+    browsers_path = os.getenv("PLAYWRIGHT_BROWSERS_PATH") or os.path.expanduser("~/.cache/ms-playwright")
+    for browser in browsers:
+        if browser.get("name") != "chromium":
+            continue
+        for subdir in ("chrome-linux", "chrome-linux64"):
+            path = os.path.join(browsers_path, f"chromium-{browser['revision']}", subdir, "chrome")
+            if os.access(path, os.X_OK):
+                return path
+    return None
+
 def find_chrome_path():
     """Detecta o caminho do Chrome/Chromium automaticamente."""
+    # 0. Registro do Playwright: barato e exato quando o Chromium foi instalado por ele
+    path = playwright_chromium_path()
+    if path:
+        return path
+
     # 1. Tenta glob patterns conhecidos
     candidates = [
         os.path.expanduser("~/.cache/ms-playwright/chromium-*/chrome-linux/chrome"),
@@ -58,263 +110,601 @@ def find_chrome_path():
 
     return None
 
+def _read_chrome_path_cache(cache_file):
+    try:
+        with open(cache_file) as f:
+            cached = json.load(f)
+        # Só vale se o binário ainda existe e não foi substituído (ex.: upgrade do Playwright)
+        if os.access(cached["path"], os.X_OK) and os.path.getmtime(cached["path"]) == cached["mtime"]:
+            return cached["path"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+def _write_chrome_path_cache(cache_file, path):
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+        with open(cache_file, "w") as f:
+            json.dump({"path": path, "mtime": os.path.getmtime(path)}, f)
+    except OSError as e:
+        logger.warning(f"Não foi possível gravar o cache do caminho do Chrome: {e}")
+
+@lru_cache(maxsize=None)
+def get_chrome_path():
+    """
+    Resolve o caminho do Chrome uma única vez, na primeira busca.
+
+    Ordem: variável CHROME_PATH, arquivo de cache (validado por existência e
+    mtime) e, por fim, a detecção completa de find_chrome_path, cujo resultado
+    é gravado no cache para as próximas inicializações.
+    """
+    inicio = time.monotonic()
+    origem = "env"
+    path = os.getenv("CHROME_PATH")
+    if path and not os.access(path, os.X_OK):
+        logger.warning(f"CHROME_PATH={path} não é um executável, ignorando")
+        path = None
+
+    cache_file = os.getenv("CHROME_PATH_CACHE", "data/chrome_path.json")
+    if not path:
+        origem = "cache"
+        path = _read_chrome_path_cache(cache_file)
+
+    if not path:
+        origem = "detecção"
+        path = find_chrome_path()
+        if path:
+            _write_chrome_path_cache(cache_file, path)
+
+    logger.info(f"Chrome path detectado: {path} (origem: {origem}, {time.monotonic() - inicio:.3f}s)")
+    return path
+
+@lru_cache(maxsize=None)
+def get_browser_profile():
+    return BrowserProfile(
+        executable_path=get_chrome_path(),
+        headless=True,
+        disable_security=True,
+        args=["--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu"],
+    )
+
 app = Flask(__name__)
-llm = ChatOpenAI(model="gpt-4o")
+llm = metricas.InstrumentedLLM(ChatOpenAI(model="gpt-4o"))
 
-chrome_path = find_chrome_path()
-logger.info(f"Chrome path detectado: {chrome_path}")
+product_cache = ProductCache(
+    path=os.getenv("CACHE_DB_PATH", "data/cache_produtos.sqlite3"),
+    ttl=int(os.getenv("CACHE_TTL_SECONDS", str(6 * 3600))),
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "5000")),
+)
 
-browser_profile = BrowserProfile(
-    executable_path=chrome_path,
-    headless=True,
-    disable_security=True,
-    args=["--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu"],
+job_store = JobStore(
+    path=os.getenv("JOBS_DB_PATH", "data/jobs.sqlite3"),
+    ttl=int(os.getenv("JOBS_TTL_SECONDS", str(7 * 24 * 3600))),
+)
+miss_cache = MissCache(
+    path=os.getenv("CACHE_DB_PATH", "data/cache_produtos.sqlite3"),
+    ttl=int(os.getenv("NEGATIVE_CACHE_TTL_SECONDS", "3600")),
+)
+playbook_store = PlaybookStore(
+    diretorio=os.getenv("PLAYBOOKS_DIR", "data/playbooks"),
+    max_falhas=int(os.getenv("PLAYBOOK_MAX_FAILURES", "3")),
+)
+task_queue = TaskQueue(
+    path=os.getenv("TASK_QUEUE_DB_PATH", "data/fila.sqlite3"),
+    visibility_timeout=float(os.getenv("QUEUE_VISIBILITY_TIMEOUT", "600")),
+    max_tentativas=int(os.getenv("QUEUE_MAX_ATTEMPTS", "3")),
+)
+catalog = ProductCatalog(
+    path=os.getenv("CATALOG_DB_PATH", "data/catalogo.sqlite3"),
+    max_age=int(os.getenv("CATALOG_MAX_AGE_SECONDS", str(30 * 24 * 3600))),
+)
+demand_tracker = DemandTracker(
+    path=os.getenv("DEMAND_DB_PATH", "data/demanda.sqlite3"),
+    meia_vida=float(os.getenv("DEMAND_HALF_LIFE_SECONDS", str(3 * 24 * 3600))),
+)
+supplier_stats = SupplierStats(
+    path=os.getenv("SUPPLIER_STATS_DB_PATH", "data/fornecedor_stats.sqlite3"),
+    min_tentativas=int(os.getenv("SUPPLIER_STATS_MIN_ATTEMPTS", "5")),
+    min_taxa=float(os.getenv("SUPPLIER_STATS_MIN_HIT_RATE", "0.1")),
 )
 
-async def search_product(codigo: str, marca: str = None):
+_browser_pool = None
+_browser_pool_lock = asyncio.Lock()
+
+async def get_browser_pool():
+    """Retorna o pool de navegadores do servidor, iniciando-o na primeira chamada."""
+    global _browser_pool
+    async with _browser_pool_lock:
+        if _browser_pool is None:
+            pool = BrowserPool(
+                get_browser_profile(),
+                size=int(os.getenv("BROWSER_POOL_SIZE", "4")),
+                health_timeout=float(os.getenv("BROWSER_HEALTH_TIMEOUT", "5")),
+            )
+            await pool.start()
+            _browser_pool = pool
+    return _browser_pool
+
+def _optional_float(name):
+    value = os.getenv(name)
+    return float(value) if value else None
+
+# Limita quantos agentes (navegador + LLM) rodam ao mesmo tempo; o restante espera em fila FIFO
+agent_scheduler = AdmissionScheduler(
+    max_concurrent=int(os.getenv("MAX_CONCURRENT_AGENTS", os.getenv("BROWSER_POOL_SIZE", "4"))),
+    min_available_mb=_optional_float("MIN_AVAILABLE_MEMORY_MB"),
+    max_rss_mb=_optional_float("MAX_RSS_MB"),
+)
+agent_scheduler.on_change = metricas.observe_scheduler
+
+# Buscas concorrentes do mesmo (codigo, marca) compartilham uma única execução
+inflight_searches = SingleFlight()
+
+# Event loop de longa duração: mantém navegadores e outros recursos async vivos entre requisições
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_event_loop():
+    """Retorna o event loop do servidor, iniciando sua thread na primeira chamada."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-loop", daemon=True).start()
+    return _loop
+
+def run_async(coro):
+    """Executa a corotina no event loop do servidor e aguarda o resultado."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+def is_truthy(value):
+    """Interpreta flags de query string como ?fresh=1 / ?fresh=true."""
+    return str(value or "").strip().lower() in ("1", "true", "yes", "sim")
+
+# Registro de fornecedores (fornecedores.py), em ordem de prioridade. O primeiro com preço válido vence.
+FORNECEDORES = load_fornecedores()
+
+# Orçamento de tokens do prompt de cada agente (ver fornecedores.build_prompt)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "300"))
+
+# Fornecedores com adaptador HTTP (adaptadores.py) são lidos sem navegador quando possível
+SUPPLIER_ADAPTERS_ENABLED = is_truthy(os.getenv("SUPPLIER_ADAPTERS_ENABLED", "1"))
+
+# Bloqueio de imagens, fontes, mídia e domínios de terceiros nas páginas dos fornecedores
+RESOURCE_BLOCKING_ENABLED = is_truthy(os.getenv("RESOURCE_BLOCKING_ENABLED", "1"))
+
+# Replay dos passos gravados de buscas anteriores (playbooks.py) antes de usar o Agent
+PLAYBOOKS_ENABLED = is_truthy(os.getenv("PLAYBOOKS_ENABLED", "1"))
+
+# Limites padrão de cada busca; podem ser reduzidos/ampliados por requisição
+# (?max_steps=, ?timeout=, ?max_tokens=). Prazo e tokens valem para a busca inteira.
+AGENT_MAX_STEPS = int(os.getenv("AGENT_MAX_STEPS", "30"))
+SEARCH_TIMEOUT_SECONDS = _optional_float("SEARCH_TIMEOUT_SECONDS")
+SEARCH_MAX_TOKENS = int(os.getenv("SEARCH_MAX_TOKENS")) if os.getenv("SEARCH_MAX_TOKENS") else None
+
+# Lotes de /produtos por fornecedor (?modo=fornecedor): um navegador por fornecedor
+# percorre os códigos ainda sem preço. SUPPLIER_MAJOR_SESSIONS navegadores por fornecedor.
+BATCH_SUPPLIER_MAJOR = os.getenv("BATCH_MODE", "produto").strip().lower() == "fornecedor"
+SUPPLIER_MAJOR_SESSIONS = int(os.getenv("SUPPLIER_MAJOR_SESSIONS", "1"))
+
+# Aquecimento do cache: renova os produtos mais pedidos WARMING_LEAD_SECONDS antes
+# de expirarem, só nas janelas WARMING_WINDOWS ("01:00-06:00,12:00-13:00"; vazio = sempre)
+CACHE_WARMING_ENABLED = is_truthy(os.getenv("CACHE_WARMING_ENABLED", "0"))
+WARMING_WINDOWS = parse_windows(os.getenv("WARMING_WINDOWS", ""))
+WARMING_LEAD_SECONDS = float(os.getenv("WARMING_LEAD_SECONDS", "1800"))
+
+# Modo enxuto do agente (?lean=1): sem screenshots, com menos atributos do DOM,
+# DOM serializado truncado em LEAN_MAX_DOM_CHARS caracteres (padrão do browser-use:
+# 40000) e menos histórico no contexto de cada passo
+LEAN_AGENT_MODE = is_truthy(os.getenv("LEAN_AGENT_MODE", "0"))
+LEAN_INCLUDE_ATTRIBUTES = ["title", "type", "name", "role", "aria-label", "placeholder", "value"]
+LEAN_MAX_DOM_CHARS = int(os.getenv("LEAN_MAX_DOM_CHARS", "15000"))
+LEAN_MAX_HISTORY_ITEMS = int(os.getenv("LEAN_MAX_HISTORY_ITEMS", "8"))
+
+# Com a fila ligada, a API só enfileira as buscas; processos worker.py as executam
+SEARCH_QUEUE_ENABLED = is_truthy(os.getenv("SEARCH_QUEUE_ENABLED", "0"))
+QUEUE_POLL_INTERVAL = float(os.getenv("QUEUE_POLL_INTERVAL", "0.5"))
+QUEUE_WAIT_TIMEOUT = float(os.getenv("QUEUE_WAIT_TIMEOUT", "1800"))
+
+# Ordem dos fornecedores aprendida com o histórico de acertos (estatisticas.py)
+ADAPTIVE_ORDERING_ENABLED = is_truthy(os.getenv("ADAPTIVE_ORDERING_ENABLED", "1"))
+
+# Valores de preço que não contam como preço válido
+PRECOS_INVALIDOS = ("indisponível", "indisponivel", "sob consulta", "consulte", "unavailable", "call for price", "n/a")
+
+def dump_history(history):
+    """Serializa o AgentHistoryList como JSON (usado apenas quando ?history=1)."""
     try:
-        logger.debug(f"search_product recebeu: codigo={codigo}, marca={marca}")
-        
-        if not codigo:
-            raise ValueError(f"Código é obrigatório. Recebido: codigo='{codigo}'")
-            
-        # Se marca não for fornecida, usamos uma instrução genérica
-        marca_text = f"Marca: {marca}" if marca else "Marca: não especificada"
-        
+        return json.loads(json.dumps(history.model_dump(), default=str))
+    except Exception as e:
+        logger.warning(f"Não foi possível serializar o histórico do agente: {str(e)}")
+        return str(history)
+
+def has_valid_price(produto):
+    """Indica se o produto tem um preço válido (não vazio, não 'sob consulta' etc.)."""
+    if not isinstance(produto, dict):
+        return False
+    price = str(produto.get("price") or "").strip()
+    if not price or price.lower() in PRECOS_INVALIDOS:
+        return False
+    return any(c.isdigit() for c in price)
+
+async def search_supplier_http(fornecedor: Fornecedor, codigo: str, marca: str = None):
+    """Tenta o adaptador HTTP do fornecedor; retorna None se não houver ou se não achar preço."""
+    adapter = get_adapter(fornecedor.nome) if SUPPLIER_ADAPTERS_ENABLED else None
+    if adapter is None or not fornecedor.url_busca:
+        return None
+    try:
+        produto = parse_produto(await adapter.search(fornecedor.url_busca, codigo, marca))
+    except Exception as e:
+        logger.warning(f"Adaptador HTTP de {fornecedor.nome} falhou para {codigo}: {str(e)}")
+        return None
+    if not has_valid_price(produto):
+        logger.debug(f"Adaptador HTTP de {fornecedor.nome} sem preço para {codigo}, usando o Agent")
+        return None
+    return {
+        "fornecedor": fornecedor.nome,
+        "produto": produto,
+        "origem": "http",
+    }
+
+async def search_supplier_playbook(passos, browser_session, fornecedor: Fornecedor, codigo: str,
+                                   marca: str = None, blocker: ResourceBlocker = None, extraction_llm=None):
+    """
+    Reproduz o playbook do fornecedor e extrai o produto com uma chamada ao LLM.
+
+    Retorna None se o replay falhar ou terminar numa página sem o código: um
+    playbook desatualizado (layout novo) também não acha o código, então isso
+    não é ausência confirmada; o chamador usa o Agent e a tentativa conta como
+    falha do playbook.
+    """
+    try:
+        pagina = await replay_playbook(
+            passos, browser_session, codigo, timeout=fornecedor.timeout_pronto, blocker=blocker
+        )
+    except PlaybookError as e:
+        logger.info(f"Replay do playbook de {fornecedor.nome} falhou para {codigo}, usando o Agent: {str(e)}")
+        playbook_store.record(fornecedor.nome, ok=False)
+        return None
+    if pagina is None:
+        logger.info(f"Replay do playbook de {fornecedor.nome} terminou sem {codigo} na página, usando o Agent")
+        playbook_store.record(fornecedor.nome, ok=False)
+        return None
+    playbook_store.record(fornecedor.nome, ok=True)
+
+    texto, url = pagina
+    produto = await extract_produto(extraction_llm or llm, texto, url, fornecedor.nome, codigo, marca)
+    if produto is not None and not produto["fornecedor"]:
+        produto["fornecedor"] = fornecedor.nome
+    supplier_result = {
+        "fornecedor": fornecedor.nome,
+        "produto": produto,
+        "origem": "playbook",
+    }
+    if blocker:
+        supplier_result["recursos"] = blocker.stats()
+    return supplier_result
+
+def agent_options(lean: bool):
+    """Parâmetros extras do Agent para o modo enxuto (sem visão, DOM e histórico reduzidos)."""
+    if not lean:
+        return {}
+    return {
+        "use_vision": False,
+        "include_attributes": LEAN_INCLUDE_ATTRIBUTES,
+        "max_clickable_elements_length": LEAN_MAX_DOM_CHARS,
+        "max_history_items": LEAN_MAX_HISTORY_ITEMS,
+    }
+
+@asynccontextmanager
+async def supplier_session(browser_session=None):
+    """Usa a sessão recebida ou arrenda um navegador do pool com uma vaga no agendador de agentes."""
+    if browser_session is not None:
+        yield browser_session
+        return
+    pool = await get_browser_pool()
+    async with agent_scheduler.slot(), pool.lease() as leased:
+        yield leased
+
+async def search_supplier(fornecedor: Fornecedor, codigo: str, marca: str = None, include_history: bool = False,
+                          orcamento: Orcamento = None, lean: bool = False, browser_session=None):
+    """
+    Busca o produto em um fornecedor: adaptador HTTP quando existir, senão o
+    playbook gravado do fornecedor e, se não houver ou falhar, um Agent restrito a ele.
+
+    O agente respeita os passos e os tokens de `orcamento`; se parar por eles
+    antes de concluir, o resultado traz 'truncated' ('max_steps' ou 'token_budget').
+    'uso_llm' traz as chamadas ao LLM e o tamanho do prompt de cada passo.
+    Se o agente parar por erro (LLM, navegador), o resultado traz 'falha' com o
+    último erro: não é ausência do produto no fornecedor.
+    Com browser_session, usa esse navegador em vez de arrendar um do pool.
+    Todo produto extraído, com ou sem preço, é gravado no catálogo local (/catalog).
+    """
+    inicio = time.monotonic()
+    origem, resultado = "agente", "erro"
+    try:
+        supplier_result = await _search_supplier(
+            fornecedor, codigo, marca, include_history, orcamento or Orcamento(), lean, browser_session
+        )
+        origem = supplier_result["origem"]
+        if supplier_result["produto"]:
+            catalog.add(fornecedor.nome, codigo, marca, supplier_result["produto"])
+        if has_valid_price(supplier_result["produto"]):
+            resultado = "preco"
+            metricas.PRICE_FOUND.labels(fornecedor.nome, origem).inc()
+        elif "falha" in supplier_result:
+            resultado = "erro"
+        else:
+            resultado = "sem_preco"
+        return supplier_result
+    except asyncio.CancelledError:
+        resultado = "cancelado"
+        raise
+    finally:
+        metricas.SUPPLIER_DURATION.labels(fornecedor.nome, origem, resultado).observe(time.monotonic() - inicio)
+
+async def _search_supplier(fornecedor: Fornecedor, codigo: str, marca: str, include_history: bool,
+                           orcamento: Orcamento, lean: bool, browser_session=None):
+    logger.debug(f"search_supplier: fornecedor={fornecedor.nome}, codigo={codigo}")
+    http_result = await search_supplier_http(fornecedor, codigo, marca)
+    if http_result is not None:
+        return http_result
+
+    blocker = ResourceBlocker.for_fornecedor(fornecedor) if RESOURCE_BLOCKING_ENABLED else None
+    agent_llm = BudgetedLLM(llm, orcamento)
+    max_steps = orcamento.max_steps or AGENT_MAX_STEPS
+
+    async def on_step_start(agent):
+        # Tokens da busca esgotados (inclusive por outros fornecedores): encerra o agente
+        if orcamento.tokens_esgotados():
+            agent.stop()
+        # A cada passo, garante o bloqueio também em abas abertas pelo agente
+        if blocker:
+            await blocker.attach(agent.browser_session)
+        # aguardar_pagina_pronta só aceita o seletor num documento aberto depois deste ponto
+        await mark_document(agent.browser_session)
+
+    passos = playbook_store.get(fornecedor.nome) if PLAYBOOKS_ENABLED else None
+
+    async with supplier_session(browser_session) as browser_session:
+        if passos:
+            playbook_result = await search_supplier_playbook(
+                passos, browser_session, fornecedor, codigo, marca, blocker, extraction_llm=agent_llm
+            )
+            if playbook_result is not None:
+                playbook_result["uso_llm"] = agent_llm.usage()
+                return playbook_result
+
         agent = Agent(
-            browser_profile=browser_profile,
-            task=f"""# INSTRUÇÕES PARA A EXECUÇÃO DA PESQUISA AUTOMATIZADA
-
-## 1. Objetivo:
-Este script realiza pesquisas em múltiplos sites de fornecedores, buscando produtos com base no código e marca informados, seguindo uma ordem específica até encontrar um preço válido ou esgotar os fornecedores.
-
-Produto: {codigo}
-Marca: {marca}
-
-## 2. Fluxo de Execução:
-
-### Lista de Fornecedores (em ordem de prioridade):
-1. Motion: https://www.motion.com/
-2. Abecom: https://www.loja.abecom.com.br/loja/busca.php?loja=835310&palavra_busca=SL1818%2F210
-3. Quality: https://www.qualitybearingsonline.com/
-4. Misumi: https://us.misumi-ec.com/
-5. Rhia: https://shop.rhia.de/de/
-6. Samflex Estrela: https://rodavigo.net/pt
-7. Misumi UK: https://uk.misumi-ec.com/
-
-### Passos:
-
-Motion:
-1. Acesse o site do fornecedor atual (começando pelo primeiro da lista).
-2. Localize o campo de pesquisa e insira {codigo}.
-3. Execute a pesquisa pressionando "Enter" ou acionando o botão de busca.
-4. Aguarde o carregamento completo da página (mínimo 10 segundos).
-5. Verifique os resultados da busca:
-   - Priorize produtos com a marca mais próxima de {marca}.
-   - pegue somente o produto com o codigo {codigo} exato.
-   - observação: Não fugir do nome (codigo) especificado, mesmo que o produto não tenha a marca especificada.
-6. Entre na página do produto selecionado e extraia todas as informações disponíveis.
-7. Verifique o preço:
-   - Se o preço for encontrado e for um valor válido (diferente de "", "indisponível", "sob consulta" ou similar), finalize a pesquisa e retorne os dados.
-   - Se o preço não for encontrado ou for inválido (como "", "indisponível", "sob consulta"), passe para o próximo fornecedor da lista e repita os passos.
-8. Continue até encontrar um preço válido ou esgotar todos os fornecedores.
-
-abecom:
-1. Acesse o site do fornecedor atual (começando com essa URL https://www.loja.abecom.com.br/loja/busca.php?loja=835310&palavra_busca=SL1818%2F210).
-2. Localize o campo de pesquisa e insira {codigo}.
-3. Execute a pesquisa pressionando "Enter" ou acionando o botão de busca.
-4. Aguarde o carregamento completo da página (mínimo 10 segundos).
-5. Verifique os resultados da busca:
-   - Priorize produtos com a marca mais próxima de {marca}.
-   - pegue somente o produto com o codigo {codigo} exato.
-   - observação: Não fugir do nome (codigo) especificado, mesmo que o produto não tenha a marca especificada.
-6. Entre na página do produto selecionado e extraia todas as informações disponíveis.
-6. Entre na página do produto selecionado e extraia todas as informações disponíveis.
-7. Verifique o preço:
-   - Se o preço for encontrado e for um valor válido (diferente de "", "indisponível", "sob consulta" ou similar), finalize a pesquisa e retorne os dados.
-   - Se o preço não for encontrado ou for inválido (como "", "indisponível", "sob consulta"), passe para o próximo fornecedor da lista e repita os passos.
-8. Continue até encontrar um preço válido ou esgotar todos os fornecedores.
-
-Quality:
-1. Acesse o site do fornecedor atual (começando pelo primeiro da lista).
-2. Localize o campo de pesquisa e insira {codigo}.
-3. Execute a pesquisa pressionando "Enter" ou acionando o botão de busca.
-4. Aguarde o carregamento completo da página (mínimo 10 segundos).
-5. Verifique os resultados da busca:
-   - Priorize produtos com a marca mais próxima de {marca}.
-   - pegue somente o produto com o codigo {codigo} exato.
-   - observação: Não fugir do nome (codigo) especificado, mesmo que o produto não tenha a marca especificada.
-6. Entre na página do produto selecionado e extraia todas as informações disponíveis.
-6. Entre na página do produto selecionado e extraia todas as informações disponíveis.
-7. Verifique o preço:
-   - Se o preço for encontrado e for um valor válido (diferente de "", "indisponível", "sob consulta" ou similar), finalize a pesquisa e retorne os dados.
-   - Se o preço não for encontrado ou for inválido (como "", "indisponível", "sob consulta"), passe para o próximo fornecedor da lista e repita os passos.
-8. Continue até encontrar um preço válido ou esgotar todos os fornecedores.
-
-Misumi:
-1. Acesse o site do fornecedor atual (começando pelo primeiro da lista).
-2. Localize o campo de pesquisa e insira {codigo}.
-3. Execute a pesquisa pressionando "Enter" ou acionando o botão de busca.
-4. Aguarde o carregamento completo da página (mínimo 10 segundos).
-5. Verifique os resultados da busca:
-   - Priorize produtos com a marca mais próxima de {marca}.
-   - pegue somente o produto com o codigo {codigo} exato.
-   - observação: Não fugir do nome (codigo) especificado, mesmo que o produto não tenha a marca especificada.
-6. Entre na página do produto selecionado e extraia todas as informações disponíveis.
-6. Entre na página do produto selecionado e extraia todas as informações disponíveis.
-7. Verifique o preço:
-   - Se o preço for encontrado e for um valor válido (diferente de "", "indisponível", "sob consulta" ou similar), finalize a pesquisa e retorne os dados.
-   - Se o preço não for encontrado ou for inválido (como "", "indisponível", "sob consulta"), passe para o próximo fornecedor da lista e repita os passos.
-8. Continue até encontrar um preço válido ou esgotar todos os fornecedores.
-
-
-Rhia:
-1. Acesse o site do fornecedor atual (começando pelo primeiro da lista).
-2. Localize o campo de pesquisa e insira {codigo}.
-3. Execute a pesquisa pressionando "Enter" ou acionando o botão de busca.
-4. Aguarde o carregamento completo da página (mínimo 10 segundos).
-5. Verifique os resultados da busca:
-   - Priorize produtos com a marca mais próxima de {marca}.
-   - pegue somente o produto com o codigo {codigo} exato.
-   - observação: Não fugir do nome (codigo) especificado, mesmo que o produto não tenha a marca especificada.
-6. Entre na página do produto selecionado e extraia todas as informações disponíveis.
-6. Entre na página do produto selecionado e extraia todas as informações disponíveis.
-7. Verifique o preço:
-   - Se o preço for encontrado e for um valor válido (diferente de "", "indisponível", "sob consulta" ou similar), finalize a pesquisa e retorne os dados.
-   - Se o preço não for encontrado ou for inválido (como "", "indisponível", "sob consulta"), passe para o próximo fornecedor da lista e repita os passos.
-8. Continue até encontrar um preço válido ou esgotar todos os fornecedores.
-
-Samflex Estrela:
-1. Acesse o site do fornecedor atual (começando pelo primeiro da lista).
-2. Localize o campo de pesquisa e insira {codigo}.
-3. Execute a pesquisa pressionando "Enter" ou acionando o botão de busca.
-4. Aguarde o carregamento completo da página (mínimo 10 segundos).
-5. Verifique os resultados da busca:
-   - Priorize produtos com a marca mais próxima de {marca}.
-   - pegue somente o produto com o codigo {codigo} exato.
-   - observação: Não fugir do nome (codigo) especificado, mesmo que o produto não tenha a marca especificada.
-6. Entre na página do produto selecionado e extraia todas as informações disponíveis.
-6. Entre na página do produto selecionado e extraia todas as informações disponíveis.
-7. Verifique o preço:
-   - Se o preço for encontrado e for um valor válido (diferente de "", "indisponível", "sob consulta" ou similar), finalize a pesquisa e retorne os dados.
-   - Se o preço não for encontrado ou for inválido (como "", "indisponível", "sob consulta"), passe para o próximo fornecedor da lista e repita os passos.
-8. Continue até encontrar um preço válido ou esgotar todos os fornecedores.
-
-Misumi UK:
-1. Acesse o site do fornecedor atual (começando com essa URL https://www.loja.abecom.com.br/loja/busca.php?loja=835310&palavra_busca=SL1818%2F210).
-2. Localize o campo de pesquisa e insira {codigo}.
-3. Execute a pesquisa pressionando "Enter" ou acionando o botão de busca.
-4. Aguarde o carregamento completo da página (mínimo 10 segundos).
-5. Verifique os resultados da busca:
-   - Priorize produtos com a marca mais próxima de {marca}.
-   - pegue somente o produto com o codigo {codigo} exato.
-   - observação: Não fugir do nome (codigo) especificado, mesmo que o produto não tenha a marca especificada.
-6. Entre na página do produto selecionado e extraia todas as informações disponíveis.
-6. Entre na página do produto selecionado e extraia todas as informações disponíveis.
-7. Verifique o preço:
-   - Se o preço for encontrado e for um valor válido (diferente de "", "indisponível", "sob consulta" ou similar), finalize a pesquisa e retorne os dados.
-   - Se o preço não for encontrado ou for inválido (como "", "indisponível", "sob consulta"), passe para o próximo fornecedor da lista e repita os passos.
-8. Continue até encontrar um preço válido ou esgotar todos os fornecedores.
-## 3. Dados a Serem Extraídos:
-
-- Nome completo do produto
-- Código/Part Number
-- Preço (obrigatório, deve ser um valor numérico ou formatado como moeda)
-- Status de estoque/disponibilidade
-- URL direta do produto
-- Especificações técnicas:
-  - Bore Type
-  - Bore Diameter
-  - Outside Diameter
-  - Overall Width
-  - Closure Type
-  - Snap Ring Included
-  - Bearing Material
-  - Cage Material
-  - Cage Type
-  - Description
-  - Element Material
-  - Fillet Radius
-  - Finish Coating
-  - Inner Ring Width
-  - Internal Clearance
-  - Manufacturer Catalog Number
-  - Manufacturer UPC Number
-  - Max RPM
-  - Operating Temperature Range
-  - Precision Rating
-  - Radial Dynamic Load Capacity
-  - Radial Static Load Capacity
-  - Seal Type
-  - Series
-  - Weight
-  - Product Type
-
-## 4. Formato da Saída:
-
-Retornar JSON válido no seguinte formato:
-
-{{
-    "produto": {{
-        "full_product_name": "",
-        "part_number": "",
-        "price": "",  // Deve ser um valor válido (ex.: "123.45", "$123.45", "€123,45")
-        "stock_status": "",
-        "direct_url": "",
-        "specifications": {{
-            "bore_type": "",
-            "bore_diameter": "",
-            "outside_diameter": "",
-            "overall_width": "",
-            "closure_type": "",
-            "snap_ring_included": "",
-            "bearing_material": "",
-            "cage_material": "",
-            "cage_type": "",
-            "description": "",
-            "element_material": "",
-            "fillet_radius": "",
-            "finish_coating": "",
-            "inner_ring_width": "",
-            "internal_clearance": "",
-            "manufacturer_catalog_number": "",
-            "manufacturer_upc_number": "",
-            "max_rpm": "",
-            "operating_temperature_range": "",
-            "precision_rating": "",
-            "radial_dynamic_load_capacity": "",
-            "radial_static_load_capacity": "",
-            "seal_type": "",
-            "series": "",
-            "weight": "",
-            "product_type": ""
-        }},
-        "fornecedor": ""
-    }}
-}}
-
-## 5. Regras e Observações:
-
-- Aguardar carregamento completo da página (10 segundos mínimo).
-- Se um campo não for encontrado, usar "", exceto para o preço, que é obrigatório.
-- Retornar apenas 1 produto mais relevante por fornecedor.
-- JSON deve estar devidamente formatado e validado.
-- Priorizar correspondência exata de marca e código.
-- Adicionar o campo "fornecedor" no JSON com o nome do site onde o produto foi encontrado.
-- Parar a pesquisa SOMENTE quando um preço válido for encontrado em um fornecedor.
-- Se o preço não for válido (ex.: "", "indisponível", "sob consulta"), continuar para o próximo fornecedor.
-- Se não encontrou nenhum produto com o codigo exato e com um valor valido, retorne um json dizendo: "procuto com o codigo {codigo} não encontrado em nenhum site"
-""",
-            llm=llm,
+            browser_session=browser_session,
+            task=build_prompt(fornecedor, codigo, marca, token_budget=PROMPT_TOKEN_BUDGET),
+            llm=agent_llm,
+            tools=build_tools(fornecedor),
+            output_model_schema=RespostaProduto,
+            **agent_options(lean),
         )
-        result = await agent.run()
-        
-        # Return the raw result as string without JSON parsing
+        try:
+            history = await agent.run(max_steps=max_steps, on_step_start=on_step_start)
+        finally:
+            if blocker:
+                await asyncio.shield(blocker.detach())
+
+    metricas.AGENT_STEPS.labels(fornecedor.nome).observe(history.number_of_steps())
+
+    # Valida a resposta final no schema de produto em vez de devolver o histórico inteiro
+    produto = parse_produto(history.final_result())
+    if produto is not None and not produto["fornecedor"]:
+        produto["fornecedor"] = fornecedor.nome
+
+    # A próxima busca neste fornecedor repete os passos sem o Agent
+    if PLAYBOOKS_ENABLED and has_valid_price(produto):
+        novos_passos = record_playbook(history, codigo)
+        if novos_passos:
+            playbook_store.save(fornecedor.nome, novos_passos)
+
+    supplier_result = {
+        "fornecedor": fornecedor.nome,
+        "produto": produto,
+        "origem": "agente",
+    }
+    supplier_result["uso_llm"] = agent_llm.usage()
+    if not history.is_done():
+        if orcamento.tokens_esgotados():
+            supplier_result["truncated"] = "token_budget"
+        elif history.number_of_steps() >= max_steps:
+            supplier_result["truncated"] = "max_steps"
+        else:
+            # Erro do LLM, navegador que caiu, max_failures: não diz nada sobre o fornecedor
+            supplier_result["falha"] = next(
+                (erro for erro in reversed(history.errors()) if erro), "agente encerrado sem concluir"
+            )
+            logger.warning(f"Agente de {fornecedor.nome} falhou para {codigo}: {supplier_result['falha']}")
+    if blocker:
+        supplier_result["recursos"] = blocker.stats()
+    if include_history:
+        supplier_result["history"] = dump_history(history)
+    return supplier_result
+
+def price_result(codigo: str, marca: str, fornecedor: Fornecedor, supplier_result):
+    """Resultado de search_product para o preço encontrado em `fornecedor`."""
+    return {
+        "produto": supplier_result["produto"],
+        "fornecedor": fornecedor.nome,
+        "origem": supplier_result["origem"],
+        "codigo": codigo,
+        "marca": marca if marca else ""
+    }
+
+def not_found_result(codigo: str, marca: str = None, truncado: str = None, concluidos=()):
+    """Resultado sem preço; com `truncado`, inclui os resultados parciais dos fornecedores concluídos."""
+    if not truncado:
         return {
-            "raw_result": str(result),
+            "produto": None,
+            "mensagem": f"procuto com o codigo {codigo} não encontrado em nenhum site",
             "codigo": codigo,
             "marca": marca if marca else ""
         }
+    return {
+        "produto": None,
+        "mensagem": f"busca do produto {codigo} interrompida antes de encontrar preço",
+        "codigo": codigo,
+        "marca": marca if marca else "",
+        "truncated": truncado,
+        "resultados_parciais": [
+            {"fornecedor": fornecedor.nome, "produto": r["produto"], "origem": r["origem"]}
+            for fornecedor, r in concluidos
+        ],
+    }
+
+def record_supplier_outcome(fornecedor: Fornecedor, codigo: str, marca: str, supplier_result):
+    """
+    Alimenta o histórico de acertos e o cache negativo com uma busca concluída por completo.
+
+    Só é ausência (cache negativo, erro no histórico) quando a busca terminou e
+    não trouxe o código exato ou trouxe preço inválido; agentes que falharam
+    ('falha') ou foram interrompidos ('truncated') não contam.
+    """
+    if "truncated" in supplier_result or "falha" in supplier_result:
+        return
+    acerto = has_valid_price(supplier_result["produto"])
+    supplier_stats.record(fornecedor.nome, codigo, marca, acerto)
+    if acerto:
+        miss_cache.discard(codigo, fornecedor.nome)
+    else:
+        miss_cache.add(codigo, fornecedor.nome)
+
+async def search_product(codigo: str, marca: str = None, include_history: bool = False, fresh: bool = False,
+                         max_steps: int = None, timeout: float = None, max_tokens: int = None, lean: bool = None):
+    """
+    Pesquisa o produto nos fornecedores em paralelo (um Agent por fornecedor).
+
+    Com ADAPTIVE_ORDERING_ENABLED, os fornecedores são divididos em ondas pelo
+    histórico de acertos da marca e série do código (SupplierStats.plan): a onda
+    seguinte só começa se a anterior não encontrar preço. Dentro de uma onda, o
+    resultado é o do primeiro fornecedor com preço válido; assim que ele é
+    conhecido, as buscas dos seguintes são canceladas. 'fornecedores_consultados'
+    lista os fornecedores em que a busca chegou a começar.
+
+    Fornecedores que não tinham o código, ou o tinham sem preço, ficam no cache
+    negativo (MissCache) e são pulados até a entrada expirar; eles aparecem em
+    'fornecedores_ignorados'. Com fresh=True o cache negativo é ignorado.
+    Com include_history=True, os históricos dos agentes consultados são
+    devolvidos em 'history', por fornecedor. 'recursos_bloqueados' soma o que
+    o bloqueio de recursos evitou baixar nos agentes que terminaram.
+
+    max_steps (por agente), timeout (segundos) e max_tokens (somando todos os
+    agentes) limitam a busca; sem eles valem AGENT_MAX_STEPS,
+    SEARCH_TIMEOUT_SECONDS e SEARCH_MAX_TOKENS. Se a busca é interrompida por um
+    limite antes de achar preço na ordem normal, a resposta traz 'truncated'
+    ('deadline', 'token_budget' ou 'max_steps'), o melhor preço já encontrado
+    por qualquer fornecedor, se houver, e os demais em 'resultados_parciais'.
+
+    lean=True (padrão: LEAN_AGENT_MODE) roda os agentes sem screenshots e com
+    contexto reduzido (agent_options). 'uso_llm' traz, por fornecedor, as
+    chamadas ao LLM e o tamanho do prompt de cada passo.
+    """
+    tasks = []
+    historico = {}
+    recursos = []
+    uso_llm = {}
+    try:
+        logger.debug(f"search_product recebeu: codigo={codigo}, marca={marca}")
+        
+        if not codigo:
+            raise ValueError(f"Código é obrigatório. Recebido: codigo='{codigo}'")
+
+        lean = LEAN_AGENT_MODE if lean is None else lean
+        orcamento = Orcamento(
+            max_steps=max_steps or AGENT_MAX_STEPS,
+            timeout=timeout or SEARCH_TIMEOUT_SECONDS,
+            max_tokens=max_tokens or SEARCH_MAX_TOKENS,
+        )
+
+        ausentes = set() if fresh else miss_cache.get(codigo)
+        fornecedores = [f for f in FORNECEDORES if f.nome not in ausentes]
+        if ADAPTIVE_ORDERING_ENABLED and fornecedores:
+            ondas = supplier_stats.plan(fornecedores, codigo, marca)
+        else:
+            ondas = [fornecedores] if fornecedores else []
+
+        result = None
+        truncado = None
+        for onda in ondas:
+            if orcamento.restante() == 0:
+                truncado = "deadline"
+            elif orcamento.tokens_esgotados():
+                truncado = "token_budget"
+            if truncado in ("deadline", "token_budget"):
+                break
+
+            onda_tasks = [
+                (fornecedor, asyncio.create_task(
+                    search_supplier(fornecedor, codigo, marca, include_history, orcamento, lean)
+                ))
+                for fornecedor in onda
+            ]
+            tasks.extend(onda_tasks)
+
+            # Aguarda na ordem da onda: o primeiro preço válido decide o resultado
+            for fornecedor, task in onda_tasks:
+                done, _ = await asyncio.wait({task}, timeout=orcamento.restante())
+                if not done:
+                    truncado = "deadline"
+                    break
+                try:
+                    supplier_result = task.result()
+                except TokenBudgetExceeded:
+                    truncado = truncado or "token_budget"
+                    continue
+                except Exception as e:
+                    logger.warning(f"Falha ao buscar {codigo} em {fornecedor.nome}: {str(e)}")
+                    continue
+
+                if "history" in supplier_result:
+                    historico[fornecedor.nome] = supplier_result["history"]
+                if "recursos" in supplier_result:
+                    recursos.append(supplier_result["recursos"])
+                if "uso_llm" in supplier_result:
+                    uso_llm[fornecedor.nome] = supplier_result["uso_llm"]
+                truncado = truncado or supplier_result.get("truncated")
+
+                if has_valid_price(supplier_result["produto"]):
+                    logger.info(f"Preço de {codigo} encontrado em {fornecedor.nome}")
+                    result = price_result(codigo, marca, fornecedor, supplier_result)
+                    break
+            if result is not None or truncado == "deadline":
+                break
+
+        if result is None and truncado:
+            # Interrompida por um limite: usa o que os fornecedores já devolveram
+            logger.info(f"Busca de {codigo} interrompida ({truncado})")
+            concluidos = [
+                (fornecedor, task.result()) for fornecedor, task in tasks
+                if task.done() and not task.cancelled() and task.exception() is None
+            ]
+            result = not_found_result(codigo, marca, truncado, concluidos)
+            for fornecedor, supplier_result in concluidos:
+                if has_valid_price(supplier_result["produto"]):
+                    result = {
+                        **price_result(codigo, marca, fornecedor, supplier_result),
+                        "truncated": truncado,
+                        "resultados_parciais": result["resultados_parciais"],
+                    }
+                    break
+
+        if result is None:
+            result = not_found_result(codigo, marca)
+
+        result["fornecedores_consultados"] = [fornecedor.nome for fornecedor, _ in tasks]
+        if ausentes:
+            result["fornecedores_ignorados"] = [f.nome for f in FORNECEDORES if f.nome in ausentes]
+        if recursos:
+            result["recursos_bloqueados"] = merge_stats(recursos)
+        if uso_llm:
+            result["uso_llm"] = uso_llm
+        if include_history:
+            result["history"] = historico
+        return result
         
     except Exception as e:
         logger.error(f"Erro em search_product: {str(e)}")
@@ -323,69 +713,616 @@ Retornar JSON válido no seguinte formato:
             "codigo": codigo,
             "marca": marca if marca else ""
         }
+    finally:
+        # Cancela os fornecedores que ainda estão rodando; os que terminaram por
+        # completo entram no histórico e, sem preço, no cache negativo
+        for fornecedor, task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled() and task.exception() is None:
+                record_supplier_outcome(fornecedor, codigo, marca, task.result())
+        if tasks:
+            await asyncio.gather(*(task for _, task in tasks), return_exceptions=True)
+
+async def search_product_queued(codigo: str, marca: str = None, include_history: bool = False, fresh: bool = False,
+                                max_steps: int = None, timeout: float = None, max_tokens: int = None,
+                                lean: bool = None):
+    """
+    Enfileira search_product para os workers (worker.py) e aguarda o resultado.
+
+    Com timeout, a espera (fila + busca) dura no máximo um pouco mais que ele, o
+    bastante para o worker devolver o resultado parcial da busca interrompida.
+    """
+    task_id = task_queue.submit(codigo, marca, {
+        "include_history": include_history,
+        "fresh": fresh,
+        "max_steps": max_steps,
+        "timeout": timeout,
+        "max_tokens": max_tokens,
+        "lean": lean,
+    })
+    espera = min(QUEUE_WAIT_TIMEOUT, timeout + 10) if timeout else QUEUE_WAIT_TIMEOUT
+    limite = time.monotonic() + espera
+    try:
+        while time.monotonic() < limite:
+            tarefa = task_queue.get(task_id)
+            if tarefa is None:
+                # Removida da fila (TTL) ou id desconhecido: não há resultado a esperar
+                logger.error(f"Tarefa {task_id} da busca de {codigo} não está mais na fila")
+                return {
+                    "error": f"Tarefa da busca do produto {codigo} não encontrada na fila",
+                    "codigo": codigo,
+                    "marca": marca if marca else ""
+                }
+            status, resultado = tarefa
+            if status in FINALIZADOS:
+                return resultado
+            await asyncio.sleep(QUEUE_POLL_INTERVAL)
+    except asyncio.CancelledError:
+        task_queue.cancel(task_id)
+        raise
+
+    task_queue.cancel(task_id)
+    if timeout:
+        return {
+            "produto": None,
+            "mensagem": f"busca do produto {codigo} interrompida antes de encontrar preço",
+            "codigo": codigo,
+            "marca": marca if marca else "",
+            "truncated": "deadline",
+            "resultados_parciais": [],
+        }
+    logger.error(f"Nenhum worker concluiu a busca de {codigo} em {espera:.0f}s")
+    return {
+        "error": f"Tempo esgotado aguardando os workers para o produto {codigo}",
+        "codigo": codigo,
+        "marca": marca if marca else ""
+    }
+
+async def get_product(codigo: str, marca: str = None, fresh: bool = False, include_history: bool = False,
+                      max_steps: int = None, timeout: float = None, max_tokens: int = None, lean: bool = None):
+    """
+    Consulta o cache antes de executar search_product.
+
+    Com fresh=True o cache (inclusive o negativo) é ignorado na leitura, mas o
+    novo resultado é gravado. Com SEARCH_QUEUE_ENABLED, a busca em si roda em
+    um processo worker.py, via fila_tarefas.TaskQueue.
+
+    O campo 'cache' da resposta indica 'hit', 'miss' ou 'bypass', e 'coalesced'
+    indica que o resultado veio de uma busca idêntica já em andamento. O histórico
+    dos agentes não é guardado em cache, então só vem em respostas 'miss'/'bypass'.
+    Os limites max_steps, timeout e max_tokens e o modo lean são repassados a search_product;
+    resultados interrompidos ('truncated') não são gravados no cache.
+    """
+    inicio = time.monotonic()
+    demand_tracker.record(codigo, marca)
+    if not fresh:
+        cached = product_cache.get(codigo, marca)
+        if cached is not None:
+            logger.info(f"Cache hit: codigo={codigo}, marca={marca}")
+            cached["cache"] = "hit"
+            metricas.CACHE_REQUESTS.labels("hit").inc()
+            metricas.SEARCH_DURATION.labels("hit").observe(time.monotonic() - inicio)
+            return cached
+
+    result, shared = await inflight_searches.do(
+        (*normalize_key(codigo, marca), include_history, fresh, max_steps, timeout, max_tokens, lean),
+        lambda: (search_product_queued if SEARCH_QUEUE_ENABLED else search_product)(
+            codigo, marca, include_history=include_history, fresh=fresh,
+            max_steps=max_steps, timeout=timeout, max_tokens=max_tokens, lean=lean,
+        ),
+    )
+    # Cada chamador recebe sua própria cópia do resultado compartilhado
+    result = dict(result)
+    if not shared and "error" not in result and "truncated" not in result and result.get("produto"):
+        product_cache.set(codigo, marca, {k: v for k, v in result.items() if k != "history"})
+    result["cache"] = "bypass" if fresh else "miss"
+    result["coalesced"] = shared
+    metricas.CACHE_REQUESTS.labels(result["cache"]).inc()
+    metricas.SEARCH_DURATION.labels(result["cache"]).observe(time.monotonic() - inicio)
+    return result
+
+async def warm_product(codigo: str, marca: str = None):
+    """
+    Renova a entrada de cache de um produto popular (CacheWarmer) sem contar
+    como pedido. Coalesce com um get_product idêntico que esteja em andamento.
+    Os agentes da busca são de segundo plano no agendador: esperam atrás dos
+    pedidos interativos.
+    """
+    token = SEGUNDO_PLANO.set(True)
+    try:
+        result, shared = await inflight_searches.do(
+            (*normalize_key(codigo, marca), False, False, None, None, None, None),
+            lambda: (search_product_queued if SEARCH_QUEUE_ENABLED else search_product)(codigo, marca),
+        )
+    finally:
+        SEGUNDO_PLANO.reset(token)
+    if not shared and "error" not in result and "truncated" not in result and result.get("produto"):
+        product_cache.set(codigo, marca, {k: v for k, v in result.items() if k != "history"})
+    return result
+
+cache_warmer = CacheWarmer(
+    demand_tracker,
+    refresh=warm_product,
+    idade=product_cache.age,
+    renovar_apos=max(0.0, product_cache.ttl - WARMING_LEAD_SECONDS),
+    janelas=WARMING_WINDOWS,
+    concorrencia=int(os.getenv("WARMING_CONCURRENCY", "2")),
+    limite=int(os.getenv("WARMING_TOP_N", "200")),
+    min_pontuacao=float(os.getenv("WARMING_MIN_REQUESTS", "2")),
+    intervalo=float(os.getenv("WARMING_INTERVAL_SECONDS", "300")),
+    # Pedidos interativos esperando vaga de agente têm prioridade; os agentes do
+    # próprio aquecimento, na fila de segundo plano, não contam
+    ocupado=lambda: agent_scheduler.stats()["fila"] > agent_scheduler.stats()["fila_segundo_plano"],
+)
+
+def validate_produtos(produtos):
+    """Valida a lista de produtos de /produtos, levantando ValueError se inválida."""
+    if not produtos:
+        raise ValueError("Lista de produtos vazia")
+
+    for i, produto in enumerate(produtos):
+        # Improved validation
+        if not isinstance(produto, dict) or not produto.get('codigo'):
+            raise ValueError(f"Produto {i+1}: código é obrigatório. Recebido: {produto}")
+
+def format_result(produto, result):
+    """Formata o resultado de um produto do lote incluindo a quantidade."""
+    return {
+        **result,
+        "codigo": produto.get('codigo'),
+        "marca": produto.get('marca', ""),
+        "quantidade": produto.get('quantidade', 1),
+    }
+
+async def search_multiple_by_supplier(produtos, fresh: bool = False, on_result=None, include_history: bool = False,
+                                      max_steps: int = None, timeout: float = None, max_tokens: int = None,
+                                      lean: bool = None):
+    """
+    Busca um lote fornecedor por fornecedor, em vez de produto por produto.
+
+    Cada fornecedor, na ordem de FORNECEDORES, tem SUPPLIER_MAJOR_SESSIONS
+    navegadores que percorrem em sequência os códigos ainda sem preço: página
+    inicial, cookies e sessão do site ficam carregados de um código para o outro.
+    A vaga no agendador e o navegador são devolvidos sempre que a fila do
+    fornecedor esvazia, nunca retidos à espera do fornecedor anterior. O que um fornecedor não precifica
+    segue para o próximo, que já começa a trabalhar enquanto o anterior continua
+    o lote. Os fornecedores não são reordenados pelo histórico de acertos.
+
+    Códigos repetidos no lote são buscados uma vez. Cache, cache negativo,
+    limites (por código) e os campos de cada resultado seguem get_product e
+    search_product; buscas idênticas de outras requisições não são coalescidas.
+    Argumentos e retorno como em search_multiple_products.
+    """
+    validate_produtos(produtos)
+
+    fila = agent_scheduler.stats()
+    logger.info(f"Lote de {len(produtos)} produtos recebido (por fornecedor). Agendador: {fila}")
+
+    lean = LEAN_AGENT_MODE if lean is None else lean
+    inicio = time.monotonic()
+    resultados = [None] * len(produtos)
+
+    def deliver(i, result):
+        formatted = format_result(produtos[i], result)
+        resultados[i] = formatted
+        if on_result:
+            on_result(i, formatted)
+
+    pendentes = {}
+    for i, produto in enumerate(produtos):
+        codigo = produto.get('codigo')
+        marca = produto.get('marca')
+        demand_tracker.record(codigo, marca)
+        chave = normalize_key(codigo, marca)
+        if chave in pendentes:
+            pendentes[chave]["indices"].append(i)
+            continue
+        cached = None if fresh else product_cache.get(codigo, marca)
+        if cached is not None:
+            logger.info(f"Cache hit: codigo={codigo}, marca={marca}")
+            cached["cache"] = "hit"
+            metricas.CACHE_REQUESTS.labels("hit").inc()
+            metricas.SEARCH_DURATION.labels("hit").observe(time.monotonic() - inicio)
+            deliver(i, cached)
+            continue
+        pendentes[chave] = {
+            "codigo": codigo,
+            "marca": marca,
+            "indices": [i],
+            "orcamento": Orcamento(
+                max_steps=max_steps or AGENT_MAX_STEPS,
+                timeout=timeout or SEARCH_TIMEOUT_SECONDS,
+                max_tokens=max_tokens or SEARCH_MAX_TOKENS,
+            ),
+            "ausentes": set() if fresh else miss_cache.get(codigo),
+            "consultados": [],
+            "concluidos": [],
+            "historico": {},
+            "recursos": [],
+            "uso_llm": {},
+            "truncado": None,
+        }
+
+    def finish(item, result=None):
+        codigo, marca = item["codigo"], item["marca"]
+        if result is None:
+            result = not_found_result(codigo, marca, item["truncado"], item["concluidos"])
+        result["fornecedores_consultados"] = item["consultados"]
+        if item["ausentes"]:
+            result["fornecedores_ignorados"] = [f.nome for f in FORNECEDORES if f.nome in item["ausentes"]]
+        if item["recursos"]:
+            result["recursos_bloqueados"] = merge_stats(item["recursos"])
+        if item["uso_llm"]:
+            result["uso_llm"] = item["uso_llm"]
+        if include_history:
+            result["history"] = item["historico"]
+
+        if "truncated" not in result and result.get("produto"):
+            product_cache.set(codigo, marca, {k: v for k, v in result.items() if k != "history"})
+        result["cache"] = "bypass" if fresh else "miss"
+        result["coalesced"] = False
+        metricas.CACHE_REQUESTS.labels(result["cache"]).inc()
+        metricas.SEARCH_DURATION.labels(result["cache"]).observe(time.monotonic() - inicio)
+        for i in item["indices"]:
+            deliver(i, dict(result))
+
+    filas = [asyncio.Queue() for _ in FORNECEDORES]
+
+    def forward(posicao, item):
+        if posicao + 1 < len(filas):
+            filas[posicao + 1].put_nowait(item)
+        else:
+            finish(item)
+
+    async def search_item(fornecedor, item, browser_session):
+        """Busca um código no fornecedor; retorna o resultado com preço ou None para seguir adiante."""
+        codigo, marca, orcamento = item["codigo"], item["marca"], item["orcamento"]
+        item["consultados"].append(fornecedor.nome)
+        task = asyncio.create_task(
+            search_supplier(fornecedor, codigo, marca, include_history, orcamento, lean, browser_session)
+        )
+        done, _ = await asyncio.wait({task}, timeout=orcamento.restante())
+        if not done:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            item["truncado"] = "deadline"
+            return None
+        try:
+            supplier_result = task.result()
+        except TokenBudgetExceeded:
+            item["truncado"] = item["truncado"] or "token_budget"
+            return None
+
+        record_supplier_outcome(fornecedor, codigo, marca, supplier_result)
+        item["concluidos"].append((fornecedor, supplier_result))
+        if "history" in supplier_result:
+            item["historico"][fornecedor.nome] = supplier_result["history"]
+        if "recursos" in supplier_result:
+            item["recursos"].append(supplier_result["recursos"])
+        if "uso_llm" in supplier_result:
+            item["uso_llm"][fornecedor.nome] = supplier_result["uso_llm"]
+        item["truncado"] = item["truncado"] or supplier_result.get("truncated")
+
+        if has_valid_price(supplier_result["produto"]):
+            logger.info(f"Preço de {codigo} encontrado em {fornecedor.nome}")
+            return price_result(codigo, marca, fornecedor, supplier_result)
+        return None
+
+    async def process(posicao, fornecedor, item, stack, browser_session):
+        """Busca um código no fornecedor e o encerra ou repassa; retorna a sessão (arrendada se preciso)."""
+        orcamento = item["orcamento"]
+        if fornecedor.nome in item["ausentes"]:
+            forward(posicao, item)
+            return browser_session
+        if orcamento.restante() == 0:
+            item["truncado"] = "deadline"
+        elif orcamento.tokens_esgotados():
+            item["truncado"] = "token_budget"
+        if item["truncado"] in ("deadline", "token_budget"):
+            finish(item)
+            return browser_session
+
+        result = None
+        try:
+            if browser_session is None:
+                browser_session = await stack.enter_async_context(supplier_session())
+            result = await search_item(fornecedor, item, browser_session)
+        except Exception as e:
+            logger.warning(f"Falha ao buscar {item['codigo']} em {fornecedor.nome}: {str(e)}")
+
+        if result is not None:
+            finish(item, result)
+        elif item["truncado"] == "deadline":
+            finish(item)
+        else:
+            forward(posicao, item)
+        return browser_session
+
+    async def lane(posicao, fornecedor):
+        fila_fornecedor = filas[posicao]
+        while True:
+            # Espera por códigos sem vaga nem navegador: segurá-los aqui, à espera do
+            # fornecedor anterior, pode esgotar as vagas de que ele precisa
+            item = await fila_fornecedor.get()
+            if item is None:
+                return
+            async with AsyncExitStack() as stack:
+                browser_session = None
+                while True:
+                    browser_session = await process(posicao, fornecedor, item, stack, browser_session)
+                    # Mantém vaga e navegador só enquanto há códigos prontos na fila
+                    if fila_fornecedor.empty():
+                        break
+                    item = fila_fornecedor.get_nowait()
+                    if item is None:
+                        return
 
-async def search_multiple_products(produtos):
+    async def stage(posicao, fornecedor):
+        await asyncio.gather(*(lane(posicao, fornecedor) for _ in range(SUPPLIER_MAJOR_SESSIONS)))
+        # Os códigos restantes já foram repassados; libera os navegadores do próximo fornecedor
+        if posicao + 1 < len(filas):
+            for _ in range(SUPPLIER_MAJOR_SESSIONS):
+                filas[posicao + 1].put_nowait(None)
+
+    if not filas:
+        for item in pendentes.values():
+            finish(item)
+        return {"resultados": resultados, "fila": fila}
+
+    for item in pendentes.values():
+        filas[0].put_nowait(item)
+    for _ in range(SUPPLIER_MAJOR_SESSIONS):
+        filas[0].put_nowait(None)
+
+    estagios = [asyncio.create_task(stage(posicao, f)) for posicao, f in enumerate(FORNECEDORES)]
+    try:
+        await asyncio.gather(*estagios)
+    finally:
+        for task in estagios:
+            task.cancel()
+        await asyncio.gather(*estagios, return_exceptions=True)
+
+    return {"resultados": resultados, "fila": fila}
+
+async def search_multiple_products(produtos, fresh: bool = False, on_result=None, include_history: bool = False,
+                                   max_steps: int = None, timeout: float = None, max_tokens: int = None,
+                                   lean: bool = None, por_fornecedor: bool = None):
     """
     Busca múltiplos produtos em paralelo.
     
     Args:
         produtos: Lista de dicionários com 'codigo', 'marca' e 'quantidade'
+        fresh: Ignora o cache de resultados quando True
+        include_history: Inclui o histórico dos agentes em cada resultado
+        max_steps, timeout, max_tokens: Limites de cada produto (ver search_product)
+        lean: Modo enxuto dos agentes (ver search_product)
+        por_fornecedor: Percorre o lote fornecedor por fornecedor
+            (search_multiple_by_supplier); padrão: BATCH_MODE. Ignorado com
+            SEARCH_QUEUE_ENABLED, em que cada produto vai para a fila
+        on_result: Callback opcional on_result(indice, resultado) chamado assim
+            que cada produto termina
         
     Returns:
-        Lista de resultados para cada produto
+        Dicionário com 'resultados' (um por produto) e 'fila', o estado do
+        agendador de agentes quando o lote chegou
     """
-    if not produtos:
-        raise ValueError("Lista de produtos vazia")
+    por_fornecedor = BATCH_SUPPLIER_MAJOR if por_fornecedor is None else por_fornecedor
+    if por_fornecedor and not SEARCH_QUEUE_ENABLED:
+        return await search_multiple_by_supplier(
+            produtos, fresh=fresh, on_result=on_result, include_history=include_history,
+            max_steps=max_steps, timeout=timeout, max_tokens=max_tokens, lean=lean,
+        )
 
-    tasks = []
-    for i, produto in enumerate(produtos):
+    validate_produtos(produtos)
+
+    # Estado da fila de agentes antes deste lote (ativos, aguardando, limite)
+    fila = agent_scheduler.stats()
+    logger.info(f"Lote de {len(produtos)} produtos recebido. Agendador: {fila}")
+
+    async def search_item(i, produto):
         codigo = produto.get('codigo')
         marca = produto.get('marca')
-        
-        # Improved validation
-        if not codigo:
-            raise ValueError(f"Produto {i+1}: código é obrigatório. Recebido: {produto}")
-            
         quantidade = produto.get('quantidade', 1)
         logger.debug(f"Processando produto {i+1}: codigo={codigo}, marca={marca}, quantidade={quantidade}")
-        tasks.append(search_product(codigo, marca))
-    
-    # Executa todas as buscas em paralelo
-    results = await asyncio.gather(*tasks)
-    
-    # Formata os resultados incluindo a quantidade
-    formatted_results = []
-    for i, result in enumerate(results):
-        try:
-            quantidade = produtos[i].get('quantidade', 1)
-            # Add raw result directly without JSON parsing
-            formatted_results.append({
-                "raw_result": str(result),
-                "codigo": produtos[i].get('codigo'),
-                "marca": produtos[i].get('marca', ""),
-                "quantidade": quantidade
-            })
-        except Exception as e:
-            logger.error(f"Erro ao formatar resultado {i}: {str(e)}")
-            formatted_results.append({
-                'error': f'Erro ao processar produto {produtos[i].get("codigo")}: {str(e)}',
-                'raw_result': str(result)
-            })
+        result = await get_product(
+            codigo, marca, fresh=fresh, include_history=include_history,
+            max_steps=max_steps, timeout=timeout, max_tokens=max_tokens, lean=lean,
+        )
+        formatted = format_result(produto, result)
+        if on_result:
+            on_result(i, formatted)
+        return formatted
+
+    # Executa todas as buscas em paralelo, respeitando o limite de agentes
+    formatted_results = await asyncio.gather(
+        *[search_item(i, produto) for i, produto in enumerate(produtos)]
+    )
     
-    return formatted_results
+    return {"resultados": list(formatted_results), "fila": fila}
+
+async def run_job(job_id: str, produtos, **options):
+    """Executa um job assíncrono de /produtos gravando cada resultado no job_store."""
+    job_store.set_status(job_id, RUNNING)
+    try:
+        results = await search_multiple_products(
+            produtos,
+            **options,
+            on_result=lambda i, resultado: job_store.set_product_result(job_id, i, resultado),
+        )
+        job_store.set_status(job_id, DONE, {"fila": results["fila"]})
+        logger.info(f"Job {job_id} concluído")
+    except Exception as e:
+        logger.error(f"Erro no job {job_id}: {str(e)}")
+        job_store.set_status(job_id, FAILED, {"error": str(e)})
+
+def encode_event(formato: str, evento: str, payload):
+    """Serializa um evento do streaming de /produtos como linha NDJSON ou evento SSE."""
+    data = json.dumps(payload, ensure_ascii=False)
+    if formato == "sse":
+        return f"event: {evento}\ndata: {data}\n\n"
+    return data + "\n"
+
+def stream_results(produtos, formato: str, **options):
+    """
+    Gera o resultado de cada produto assim que sua busca termina.
+
+    formato 'ndjson' emite uma linha JSON por produto; 'sse' emite eventos
+    Server-Sent Events 'resultado'. Ao final é emitido um evento 'fim'.
+    options são repassadas a search_multiple_products (fresh, include_history...).
+    """
+    resultados = queue.Queue()
+    fim = object()
+
+    future = asyncio.run_coroutine_threadsafe(
+        search_multiple_products(
+            produtos,
+            **options,
+            on_result=lambda i, resultado: resultados.put({"indice": i, **resultado}),
+        ),
+        get_event_loop(),
+    )
+    future.add_done_callback(lambda _: resultados.put(fim))
+
+    try:
+        while True:
+            item = resultados.get()
+            if item is fim:
+                break
+            yield encode_event(formato, "resultado", item)
+
+        if future.exception() is not None:
+            logger.error(f"Erro no streaming de /produtos: {future.exception()}")
+            yield encode_event(formato, "erro", {"error": "Erro interno do servidor", "details": str(future.exception())})
+        else:
+            yield encode_event(formato, "fim", {"fim": True, "total": len(produtos), "fila": future.result()["fila"]})
+    finally:
+        # Cliente desconectou antes do fim: cancela as buscas pendentes
+        if not future.done():
+            future.cancel()
+
+async def iter_results(produtos, formato: str, **options):
+    """Versão assíncrona de stream_results, rodando no event loop de quem consome (servidor ASGI)."""
+    resultados = asyncio.Queue()
+    task = asyncio.create_task(search_multiple_products(
+        produtos,
+        **options,
+        on_result=lambda i, resultado: resultados.put_nowait({"indice": i, **resultado}),
+    ))
+    task.add_done_callback(lambda _: resultados.put_nowait(None))
+
+    try:
+        while (item := await resultados.get()) is not None:
+            yield encode_event(formato, "resultado", item)
+
+        if task.exception() is not None:
+            logger.error(f"Erro no streaming de /produtos: {task.exception()}")
+            yield encode_event(formato, "erro", {"error": "Erro interno do servidor", "details": str(task.exception())})
+        else:
+            yield encode_event(formato, "fim", {"fim": True, "total": len(produtos), "fila": task.result()["fila"]})
+    finally:
+        if not task.done():
+            task.cancel()
+
+def _positive_arg(args, name, tipo):
+    value = args.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        number = tipo(value)
+    except ValueError:
+        number = 0
+    if number <= 0:
+        raise ValueError(f"Parâmetro '{name}' deve ser um número positivo")
+    return number
+
+def request_options(args):
+    """
+    Opções de busca comuns às rotas, lidas da query string: ?fresh=1, ?history=1,
+    ?lean=1|0 e os limites ?max_steps=, ?timeout= (segundos) e ?max_tokens=.
+    Levanta ValueError se um limite for inválido.
+    """
+    return {
+        "fresh": is_truthy(args.get('fresh')),
+        "include_history": is_truthy(args.get('history')),
+        "max_steps": _positive_arg(args, 'max_steps', int),
+        "timeout": _positive_arg(args, 'timeout', float),
+        "max_tokens": _positive_arg(args, 'max_tokens', int),
+        "lean": is_truthy(args.get('lean')) if args.get('lean') is not None else None,
+    }
+
+def parse_produtos_payload(data):
+    """Extrai a lista de produtos do corpo de POST /produtos, levantando ValueError se inválido."""
+    if not data:
+        raise ValueError("Dados JSON ausentes")
+    if not isinstance(data, dict):
+        raise ValueError("Dados devem ser um objeto JSON")
+    if 'query' not in data:
+        raise ValueError("Campo 'query' não encontrado")
+    if not isinstance(data['query'], dict):
+        raise ValueError("Campo 'query' deve ser um objeto")
+    if 'produtos' not in data['query']:
+        raise ValueError("Campo 'produtos' não encontrado em 'query'")
+
+    produtos = data['query']['produtos']
+    if not isinstance(produtos, list):
+        raise ValueError("Campo 'produtos' deve ser uma lista")
+    if not produtos:
+        raise ValueError("Lista de produtos está vazia")
+    return produtos
+
+def parse_stream_format(args):
+    """Formato de ?stream= ('ndjson', 'sse' ou '' sem streaming), levantando ValueError se inválido."""
+    stream = (args.get('stream') or "").strip().lower()
+    if stream and stream not in ("ndjson", "sse"):
+        raise ValueError("Parâmetro 'stream' deve ser 'ndjson' ou 'sse'")
+    return stream
+
+def parse_batch_mode(args):
+    """?modo=produto|fornecedor de /produtos: True para fornecedor, None sem o parâmetro (vale BATCH_MODE)."""
+    modo = (args.get('modo') or "").strip().lower()
+    if not modo:
+        return None
+    if modo not in ("produto", "fornecedor"):
+        raise ValueError("Parâmetro 'modo' deve ser 'produto' ou 'fornecedor'")
+    return modo == "fornecedor"
+
+def catalog_lookup(args):
+    """
+    Consulta de /catalog: ?codigo= (variantes normalizadas) ou ?q= (texto livre),
+    com ?marca= e ?limite= opcionais. Levanta ValueError se faltar a consulta.
+    """
+    codigo = (args.get('codigo') or "").strip()
+    texto = (args.get('q') or "").strip()
+    if not codigo and not texto:
+        raise ValueError("Parâmetro 'codigo' ou 'q' é obrigatório")
+    limite = _positive_arg(args, 'limite', int) or 20
+    candidatos = catalog.lookup(codigo or None, args.get('marca'), texto or None, limite)
+    return {
+        "codigo": codigo,
+        "marca": args.get('marca') or "",
+        "candidatos": candidatos,
+        "total": len(candidatos),
+    }
+
+STREAM_MIMETYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
 
 @app.route('/search', methods=['GET'])
 def handle_search():
-    """Rota GET para integração com n8n: /search?codigo=6205&marca=SKF"""
+    """Rota GET para integração com n8n: /search?codigo=6205&marca=SKF[&fresh=1][&history=1][&timeout=60]"""
     try:
         codigo = request.args.get('codigo')
         marca = request.args.get('marca')
 
         if not codigo:
             return jsonify({"error": "Parâmetro 'codigo' é obrigatório"}), 400
+        try:
+            options = request_options(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        logger.info(f"GET /search - codigo={codigo}, marca={marca}")
-        result = asyncio.run(search_product(codigo, marca))
+        logger.info(f"GET /search - codigo={codigo}, marca={marca}, fresh={options['fresh']}")
+        result = run_async(get_product(codigo, marca, **options))
         return jsonify(result)
 
     except Exception as e:
@@ -397,36 +1334,50 @@ def handle_request():
     try:
         data = request.get_json()
         logger.debug(f"Dados recebidos: {data}")
-        
-        # Improved validation with more specific error messages
-        if not data:
-            return jsonify({"error": "Dados JSON ausentes"}), 400
-            
-        if not isinstance(data, dict):
-            return jsonify({"error": "Dados devem ser um objeto JSON"}), 400
-            
-        if 'query' not in data:
-            return jsonify({"error": "Campo 'query' não encontrado"}), 400
-            
-        if not isinstance(data['query'], dict):
-            return jsonify({"error": "Campo 'query' deve ser um objeto"}), 400
-            
-        if 'produtos' not in data['query']:
-            return jsonify({"error": "Campo 'produtos' não encontrado em 'query'"}), 400
-            
-        produtos = data['query']['produtos']
-        
-        if not isinstance(produtos, list):
-            return jsonify({"error": "Campo 'produtos' deve ser uma lista"}), 400
-            
-        if not produtos:
-            return jsonify({"error": "Lista de produtos está vazia"}), 400
+
+        try:
+            produtos = parse_produtos_payload(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        try:
+            options = request_options(request.args)
+            options["por_fornecedor"] = parse_batch_mode(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
         # Log validation success
         logger.info(f"Validação bem sucedida. Processando {len(produtos)} produtos")
-        
-        results = asyncio.run(search_multiple_products(produtos))
-        return jsonify({"resultados": results})
+
+        if is_truthy(request.args.get('async')):
+            try:
+                validate_produtos(produtos)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            # Responde na hora; o cliente acompanha o progresso em /jobs/<id>
+            job_id = job_store.create(produtos)
+            asyncio.run_coroutine_threadsafe(run_job(job_id, produtos, **options), get_event_loop())
+            logger.info(f"Job {job_id} criado com {len(produtos)} produtos")
+            return jsonify({
+                "job_id": job_id,
+                "status": "pending",
+                "status_url": f"/jobs/{job_id}"
+            }), 202
+
+        try:
+            stream = parse_stream_format(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if stream:
+            try:
+                validate_produtos(produtos)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return Response(stream_results(produtos, stream, **options), mimetype=STREAM_MIMETYPES[stream])
+
+        results = run_async(search_multiple_products(produtos, **options))
+        return jsonify(results)
             
     except json.JSONDecodeError as e:
         logger.error(f"Erro ao decodificar JSON: {str(e)}")
@@ -438,5 +1389,38 @@ def handle_request():
             "details": str(e)
         }), 500
 
+@app.route('/catalog', methods=['GET'])
+def handle_catalog():
+    """Produtos já extraídos, do catálogo local: /catalog?codigo=6205-2RS[&marca=SKF][&limite=20]"""
+    try:
+        return jsonify(catalog_lookup(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erro na rota /catalog: {str(e)}")
+        return jsonify({"error": "Erro interno do servidor", "details": str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def handle_metrics():
+    """Métricas no formato do Prometheus."""
+    body, content_type = metricas.render()
+    return Response(body, content_type=content_type)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def handle_job(job_id):
+    """Status de um job criado por POST /produtos?async=1, com resultados parciais."""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job '{job_id}' não encontrado"}), 404
+    return jsonify(job)
+
 if __name__ == '__main__':
+    # Pré-inicia os navegadores antes de aceitar requisições (com a fila, eles ficam nos workers)
+    inicio = time.monotonic()
+    job_store.interrupt_unfinished()
+    if not SEARCH_QUEUE_ENABLED:
+        run_async(get_browser_pool())
+    if CACHE_WARMING_ENABLED:
+        asyncio.run_coroutine_threadsafe(cache_warmer.run(), get_event_loop())
+    logger.info(f"Inicialização concluída em {time.monotonic() - inicio:.1f}s")
     app.run(host='0.0.0.0', port=8085, use_reloader=False)
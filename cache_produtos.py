@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_key(codigo: str, marca: str = None):
+    """Normaliza (codigo, marca) para uso como chave de cache."""
+    codigo_norm = " ".join((codigo or "").split()).upper()
+    marca_norm = " ".join((marca or "").split()).upper()
+    return codigo_norm, marca_norm
+
+
+class ProductCache:
+    """
+    Cache em disco (SQLite) dos resultados de search_product.
+
+    Cada entrada expira após `ttl` segundos. Quando o número de entradas
+    passa de `max_entries`, as menos acessadas recentemente (LRU) são removidas.
+    """
+
+    def __init__(self, path: str, ttl: int = 6 * 3600, max_entries: int = 5000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        diretorio = os.path.dirname(os.path.abspath(path))
+        os.makedirs(diretorio, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS produtos (
+                codigo TEXT NOT NULL,
+                marca TEXT NOT NULL,
+                resultado TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                acessado_em REAL NOT NULL,
+                PRIMARY KEY (codigo, marca)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_produtos_acessado ON produtos (acessado_em)"
+        )
+        self._conn.commit()
+
+    def get(self, codigo: str, marca: str = None):
+        """Retorna o resultado em cache ou None se ausente/expirado."""
+        chave = normalize_key(codigo, marca)
+        agora = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT resultado, criado_em FROM produtos WHERE codigo = ? AND marca = ?",
+                chave,
+            ).fetchone()
+            if row is None:
+                return None
+
+            resultado, criado_em = row
+            if agora - criado_em > self.ttl:
+                self._conn.execute(
+                    "DELETE FROM produtos WHERE codigo = ? AND marca = ?", chave
+                )
+                self._conn.commit()
+                return None
+
+            self._conn.execute(
+                "UPDATE produtos SET acessado_em = ? WHERE codigo = ? AND marca = ?",
+                (agora, *chave),
+            )
+            self._conn.commit()
+
+        entrada = json.loads(resultado)
+        entrada["cache_age"] = round(agora - criado_em, 1)
+        return entrada
+
+    def age(self, codigo: str, marca: str = None):
+        """Idade em segundos da entrada válida, sem contar como acesso; None se ausente/expirada."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT criado_em FROM produtos WHERE codigo = ? AND marca = ?",
+                normalize_key(codigo, marca),
+            ).fetchone()
+        if row is None or time.time() - row[0] > self.ttl:
+            return None
+        return time.time() - row[0]
+
+    def set(self, codigo: str, marca: str, resultado: dict):
+        """Grava o resultado e aplica o limite de tamanho (LRU)."""
+        chave = normalize_key(codigo, marca)
+        agora = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO produtos (codigo, marca, resultado, criado_em, acessado_em)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (*chave, json.dumps(resultado, ensure_ascii=False), agora, agora),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COUNT(*) FROM produtos").fetchone()[0]
+        excesso = total - self.max_entries
+        if excesso > 0:
+            logger.debug(f"Cache cheio ({total} entradas), removendo {excesso} (LRU)")
+            self._conn.execute(
+                """
+                DELETE FROM produtos WHERE rowid IN (
+                    SELECT rowid FROM produtos ORDER BY acessado_em ASC LIMIT ?
+                )
+                """,
+                (excesso,),
+            )
+        self._conn.execute(
+            "DELETE FROM produtos WHERE criado_em < ?", (time.time() - self.ttl,)
+        )
+
+
+class MissCache:
+    """
+    Cache negativo: fornecedores que não vendem (ou não têm preço para) um código.
+
+    Guarda só (codigo, fornecedor), sem a marca: um site sem o código exato não
+    passa a tê-lo com outra marca. As entradas expiram após `ttl` segundos,
+    normalmente bem menos que o cache de produtos, já que estoque e preço mudam.
+    """
+
+    def __init__(self, path: str, ttl: int = 3600):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        diretorio = os.path.dirname(os.path.abspath(path))
+        os.makedirs(diretorio, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ausencias (
+                codigo TEXT NOT NULL,
+                fornecedor TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                PRIMARY KEY (codigo, fornecedor)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, codigo: str):
+        """Fornecedores com ausência ainda válida para o código."""
+        codigo_norm, _ = normalize_key(codigo)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT fornecedor FROM ausencias WHERE codigo = ? AND criado_em >= ?",
+                (codigo_norm, time.time() - self.ttl),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def add(self, codigo: str, fornecedor: str):
+        codigo_norm, _ = normalize_key(codigo)
+        agora = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ausencias (codigo, fornecedor, criado_em) VALUES (?, ?, ?)",
+                (codigo_norm, fornecedor, agora),
+            )
+            self._conn.execute("DELETE FROM ausencias WHERE criado_em < ?", (agora - self.ttl,))
+            self._conn.commit()
+
+    def discard(self, codigo: str, fornecedor: str):
+        codigo_norm, _ = normalize_key(codigo)
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM ausencias WHERE codigo = ? AND fornecedor = ?", (codigo_norm, fornecedor)
+            )
+            self._conn.commit()
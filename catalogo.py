@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from cache_produtos import normalize_key
+
+logger = logging.getLogger(__name__)
+
+EXATO = "exato"
+SERIE = "serie"
+TEXTO = "texto"
+
+
+def compact_code(codigo: str):
+    """Código sem espaços e separadores: 6205 2RS1/C3 -> 62052RS1C3."""
+    return re.sub(r"[^A-Z0-9]", "", (codigo or "").upper())
+
+
+def base_code(codigo: str):
+    """
+    Designação básica do código, sem sufixos de vedação, folga etc.
+
+    6205-2RS -> 6205, 6205 2RS1/C3 -> 6205, NU 2205 ECP -> NU2205, UCP205-16 -> UCP205.
+    """
+    match = re.search(r"[A-Z]*[\s-]?\d+", (codigo or "").upper())
+    return compact_code(match.group(0)) if match else compact_code(codigo)
+
+
+def _fts_query(texto: str):
+    # Cada termo vira um prefixo entre aspas: a sintaxe do FTS5 não vaza da entrada do usuário
+    termos = re.findall(r"\w+", texto or "")
+    return " AND ".join(f'"{termo}"*' for termo in termos)
+
+
+def _common_prefix(a: str, b: str):
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class ProductCatalog:
+    """
+    Índice local (SQLite + FTS5) de todo produto extraído dos fornecedores.
+
+    Guarda o último produto visto por (fornecedor, código, marca), com preço,
+    estoque, URL e especificações, mesmo sem preço válido. `lookup` resolve um
+    código pelas variantes normalizadas (6205, 6205-2RS e 6205 2RS1/C3 chegam
+    aos mesmos candidatos) e, sem candidatos, pela busca textual em nome, part
+    number e especificações. Cada candidato traz a idade do preço em segundos.
+    """
+
+    def __init__(self, path: str, max_age: int = 30 * 24 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+        diretorio = os.path.dirname(os.path.abspath(path))
+        os.makedirs(diretorio, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS catalogo (
+                id INTEGER PRIMARY KEY,
+                fornecedor TEXT NOT NULL,
+                codigo TEXT NOT NULL,
+                base TEXT NOT NULL,
+                marca TEXT NOT NULL,
+                part_number TEXT NOT NULL,
+                preco TEXT NOT NULL,
+                estoque TEXT NOT NULL,
+                url TEXT NOT NULL,
+                produto TEXT NOT NULL,
+                atualizado_em REAL NOT NULL,
+                UNIQUE (fornecedor, codigo, marca)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_catalogo_base ON catalogo (base)")
+        self._conn.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS catalogo_fts USING fts5(
+                codigos, nome, marca, fornecedor, especificacoes
+            )
+            """
+        )
+        self._conn.commit()
+
+    def add(self, fornecedor: str, codigo: str, marca: str, produto: dict):
+        """Grava (ou atualiza) o produto extraído de `fornecedor` na busca por `codigo`."""
+        part_number = produto.get("part_number") or codigo
+        codigo_norm = compact_code(part_number)
+        _, marca_norm = normalize_key(codigo, marca)
+        especificacoes = produto.get("specifications") or {}
+        agora = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                """
+                INSERT INTO catalogo (fornecedor, codigo, base, marca, part_number, preco, estoque, url, produto, atualizado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (fornecedor, codigo, marca) DO UPDATE SET
+                    base = excluded.base, part_number = excluded.part_number, preco = excluded.preco,
+                    estoque = excluded.estoque, url = excluded.url, produto = excluded.produto,
+                    atualizado_em = excluded.atualizado_em
+                RETURNING id
+                """,
+                (fornecedor, codigo_norm, base_code(part_number), marca_norm, part_number,
+                 produto.get("price") or "", produto.get("stock_status") or "", produto.get("direct_url") or "",
+                 json.dumps(produto, ensure_ascii=False), agora),
+            ).fetchone()
+            self._conn.execute("DELETE FROM catalogo_fts WHERE rowid = ?", row)
+            self._conn.execute(
+                "INSERT INTO catalogo_fts (rowid, codigos, nome, marca, fornecedor, especificacoes) VALUES (?, ?, ?, ?, ?, ?)",
+                (row[0], " ".join(dict.fromkeys((part_number, codigo, codigo_norm))), produto.get("full_product_name") or "",
+                 marca_norm, fornecedor, " ".join(str(v) for v in especificacoes.values() if v)),
+            )
+            self._conn.commit()
+
+    def _rows(self, where: str, params, marca_norm: str, limite: int):
+        if marca_norm:
+            where += " AND marca IN (?, '')"
+            params = (*params, marca_norm)
+        return self._conn.execute(
+            f"""
+            SELECT id, fornecedor, codigo, marca, part_number, preco, estoque, url, produto, atualizado_em
+            FROM catalogo WHERE atualizado_em >= ? AND {where}
+            ORDER BY atualizado_em DESC LIMIT ?
+            """,
+            (time.time() - self.max_age, *params, limite),
+        ).fetchall()
+
+    def lookup(self, codigo: str = None, marca: str = None, texto: str = None, limite: int = 20):
+        """
+        Candidatos para o código (ou texto livre), do mais ao menos parecido.
+
+        'correspondencia' indica como o candidato foi achado: 'exato' (mesmo
+        código normalizado), 'serie' (mesma designação básica) ou 'texto' (FTS).
+        """
+        _, marca_norm = normalize_key(codigo, marca)
+        codigo_norm = compact_code(codigo)
+        candidatos = []
+        with self._lock:
+            if codigo_norm:
+                for row in self._rows("base = ?", (base_code(codigo),), marca_norm, limite * 5):
+                    tipo = EXATO if row[2] == codigo_norm else SERIE
+                    candidatos.append((tipo, -_common_prefix(row[2], codigo_norm), row))
+            consulta = _fts_query(texto or codigo)
+            if not candidatos and consulta:
+                ids = self._conn.execute(
+                    "SELECT rowid FROM catalogo_fts WHERE catalogo_fts MATCH ? ORDER BY rank LIMIT ?",
+                    (consulta, limite * 5),
+                ).fetchall()
+                ordem = {rowid: i for i, (rowid,) in enumerate(ids)}
+                if ordem:
+                    marcadores = ", ".join("?" * len(ordem))
+                    for row in self._rows(f"id IN ({marcadores})", tuple(ordem), marca_norm, limite * 5):
+                        candidatos.append((TEXTO, ordem[row[0]], row))
+
+        prioridade = {EXATO: 0, SERIE: 1, TEXTO: 2}
+        candidatos.sort(key=lambda c: (prioridade[c[0]], c[1]))
+        agora = time.time()
+        return [
+            {
+                "fornecedor": fornecedor,
+                "codigo": part_number,
+                "marca": marca_row,
+                "price": preco,
+                "stock_status": estoque,
+                "direct_url": url,
+                "produto": json.loads(produto),
+                "atualizado_em": atualizado_em,
+                "idade_preco": round(agora - atualizado_em, 1),
+                "correspondencia": tipo,
+            }
+            for tipo, _, (_, fornecedor, _, marca_row, part_number, preco, estoque, url, produto, atualizado_em)
+            in candidatos[:limite]
+        ]
@@ -0,0 +1,206 @@
+import asyncio
+import contextvars
+import logging
+import os
+from collections import deque
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+# Agentes pedidos neste contexto (ex.: aquecimento do cache) são de segundo
+# plano: só são admitidos quando nenhum pedido interativo está esperando
+SEGUNDO_PLANO = contextvars.ContextVar("segundo_plano", default=False)
+
+
+def available_memory_mb():
+    """Memória disponível no sistema (MemAvailable de /proc/meminfo), em MB."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def process_tree_rss_mb(pid: int = None):
+    """RSS somado do processo e de todos os descendentes (ex.: Chromium), em MB."""
+    pid = pid or os.getpid()
+    children = {}
+    rss = {}
+    try:
+        entries = [e for e in os.listdir("/proc") if e.isdigit()]
+    except OSError:
+        return None
+
+    for entry in entries:
+        try:
+            with open(f"/proc/{entry}/status") as f:
+                ppid, vmrss = None, 0
+                for line in f:
+                    if line.startswith("PPid:"):
+                        ppid = int(line.split()[1])
+                    elif line.startswith("VmRSS:"):
+                        vmrss = int(line.split()[1])
+        except (OSError, ValueError):
+            continue
+        rss[int(entry)] = vmrss
+        children.setdefault(ppid, []).append(int(entry))
+
+    total = 0
+    pendentes = [pid]
+    while pendentes:
+        atual = pendentes.pop()
+        total += rss.get(atual, 0)
+        pendentes.extend(children.get(atual, []))
+    return total / 1024
+
+
+class AdmissionScheduler:
+    """
+    Controla quantos agentes rodam ao mesmo tempo.
+
+    Pedidos acima de `max_concurrent` esperam em fila FIFO. Opcionalmente, um novo
+    agente só é admitido se houver `min_available_mb` de memória livre e o RSS do
+    processo (incluindo navegadores filhos) estiver abaixo de `max_rss_mb`. Com
+    nenhum agente ativo, o próximo da fila é sempre admitido para não travar.
+    Pedidos de segundo plano (SEGUNDO_PLANO) têm fila própria, atendida só com a
+    fila interativa vazia; 'fila_segundo_plano' em stats() os conta à parte.
+    `on_change(stats)`, se definido, é chamado quando ativos ou fila mudam.
+    """
+
+    def __init__(self, max_concurrent: int = 4, min_available_mb: float = None,
+                 max_rss_mb: float = None, poll_interval: float = 1.0):
+        if max_concurrent < 1:
+            raise ValueError(f"max_concurrent deve ser >= 1. Recebido: {max_concurrent}")
+        self.max_concurrent = max_concurrent
+        self.min_available_mb = min_available_mb
+        self.max_rss_mb = max_rss_mb
+        self.poll_interval = poll_interval
+        self._active = 0
+        self._waiters = deque()
+        self._background = deque()
+        self._recheck = None
+        self.on_change = None
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change(self.stats())
+
+    def _memory_ok(self):
+        if self.min_available_mb is not None:
+            disponivel = available_memory_mb()
+            if disponivel is not None and disponivel < self.min_available_mb:
+                return False
+        if self.max_rss_mb is not None:
+            rss = process_tree_rss_mb()
+            if rss is not None and rss > self.max_rss_mb:
+                return False
+        return True
+
+    def _can_admit(self):
+        if self._active >= self.max_concurrent:
+            return False
+        return self._active == 0 or self._memory_ok()
+
+    def _wake(self):
+        self._recheck = None
+        for fila in (self._waiters, self._background):
+            while fila and fila[0].done():
+                fila.popleft()
+        while (self._waiters or self._background) and self._can_admit():
+            waiter = (self._waiters or self._background).popleft()
+            if not waiter.done():
+                self._active += 1
+                waiter.set_result(None)
+
+        # Fila bloqueada apenas por memória: reavalia periodicamente
+        esperando = self._waiters or self._background
+        if esperando and self._active < self.max_concurrent and self._recheck is None:
+            self._recheck = asyncio.get_running_loop().call_later(self.poll_interval, self._wake)
+        self._changed()
+
+    async def acquire(self):
+        if not self._waiters and not self._background and self._can_admit():
+            self._active += 1
+            self._changed()
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        fila = self._background if SEGUNDO_PLANO.get() else self._waiters
+        fila.append(waiter)
+        logger.debug(f"Agente aguardando admissão (fila={len(fila)}, ativos={self._active})")
+        self._wake()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Foi admitido no mesmo instante em que foi cancelado: devolve a vaga
+                self.release()
+            else:
+                self._changed()
+            raise
+
+    def release(self):
+        self._active -= 1
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Reserva uma vaga de agente durante o bloco `async with`."""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        return {
+            "ativos": self._active,
+            "fila": sum(1 for w in (*self._waiters, *self._background) if not w.done()),
+            "fila_segundo_plano": sum(1 for w in self._background if not w.done()),
+            "max_concorrentes": self.max_concurrent,
+        }
+
+
+class SingleFlight:
+    """
+    Compartilha uma única execução entre chamadas concorrentes com a mesma chave.
+
+    Enquanto a busca de uma chave está rodando, novas chamadas com a mesma chave
+    aguardam o mesmo resultado em vez de iniciar outra. A execução só é cancelada
+    se todos que a aguardam forem cancelados.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+
+    async def do(self, key, coro_factory):
+        """Retorna (resultado, compartilhado), onde compartilhado indica que outra chamada já rodava."""
+        entry = self._inflight.get(key)
+        shared = entry is not None
+        if entry is None:
+            task = asyncio.ensure_future(coro_factory())
+            entry = {"task": task, "waiters": 0}
+            self._inflight[key] = entry
+            task.add_done_callback(lambda _: self._forget(key, entry))
+        else:
+            logger.debug(f"Reaproveitando busca em andamento para {key}")
+
+        entry["waiters"] += 1
+        try:
+            return await asyncio.shield(entry["task"]), shared
+        except asyncio.CancelledError:
+            if not entry["task"].done() and entry["waiters"] == 1:
+                entry["task"].cancel()
+            raise
+        finally:
+            entry["waiters"] -= 1
+
+    def _forget(self, key, entry):
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
+
+    def __len__(self):
+        return len(self._inflight)
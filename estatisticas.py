@@ -0,0 +1,127 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from cache_produtos import normalize_key
+
+logger = logging.getLogger(__name__)
+
+# Chave coringa: agrega todas as marcas ou todas as séries
+TODAS = "*"
+
+
+def code_series(codigo: str):
+    """
+    Série do código: prefixo de letras mais os dois primeiros dígitos.
+
+    6205-2RS -> 62, NU2205 -> NU22, UCP205 -> UCP20. Códigos sem esse formato
+    usam os três primeiros caracteres alfanuméricos.
+    """
+    codigo_norm, _ = normalize_key(codigo)
+    match = re.match(r"[A-Z]*\d{1,2}", codigo_norm)
+    if match:
+        return match.group(0)
+    return re.sub(r"[^A-Z0-9]", "", codigo_norm)[:3]
+
+
+class SupplierStats:
+    """
+    Histórico de sucesso (preço válido encontrado) por fornecedor, marca e série.
+
+    Cada busca concluída em um fornecedor é contada em três chaves: (marca, série),
+    (marca, *) e (*, série). `plan` usa a chave mais específica com pelo menos
+    `min_tentativas` registros para ordenar os fornecedores em ondas:
+
+    1. fornecedores com taxa de acerto >= `min_taxa`, do maior para o menor;
+    2. fornecedores sem histórico suficiente, na ordem configurada;
+    3. fornecedores com taxa abaixo de `min_taxa`, na ordem configurada.
+
+    Sem histórico, há uma única onda com a ordem configurada.
+    """
+
+    def __init__(self, path: str, min_tentativas: int = 5, min_taxa: float = 0.1):
+        self.path = path
+        self.min_tentativas = min_tentativas
+        self.min_taxa = min_taxa
+        self._lock = threading.Lock()
+
+        diretorio = os.path.dirname(os.path.abspath(path))
+        os.makedirs(diretorio, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fornecedor_stats (
+                fornecedor TEXT NOT NULL,
+                marca TEXT NOT NULL,
+                serie TEXT NOT NULL,
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                acertos INTEGER NOT NULL DEFAULT 0,
+                atualizado_em REAL NOT NULL,
+                PRIMARY KEY (fornecedor, marca, serie)
+            )
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _keys(codigo: str, marca: str = None):
+        _, marca_norm = normalize_key(codigo, marca)
+        serie = code_series(codigo)
+        return [(marca_norm, serie), (marca_norm, TODAS), (TODAS, serie)]
+
+    def record(self, fornecedor: str, codigo: str, marca: str, acerto: bool):
+        """Registra o resultado de uma busca concluída em `fornecedor`."""
+        agora = time.time()
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO fornecedor_stats (fornecedor, marca, serie, tentativas, acertos, atualizado_em)
+                VALUES (?, ?, ?, 1, ?, ?)
+                ON CONFLICT (fornecedor, marca, serie) DO UPDATE SET
+                    tentativas = tentativas + 1,
+                    acertos = acertos + excluded.acertos,
+                    atualizado_em = excluded.atualizado_em
+                """,
+                [(fornecedor, m, s, int(acerto), agora) for m, s in self._keys(codigo, marca)],
+            )
+            self._conn.commit()
+
+    def hit_rates(self, codigo: str, marca: str = None):
+        """Taxa de acerto por fornecedor na chave mais específica com histórico suficiente."""
+        keys = self._keys(codigo, marca)
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT fornecedor, marca, serie, tentativas, acertos FROM fornecedor_stats
+                WHERE {" OR ".join(["(marca = ? AND serie = ?)"] * len(keys))}
+                """,
+                [valor for key in keys for valor in key],
+            ).fetchall()
+
+        por_chave = {(fornecedor, (m, s)): (tentativas, acertos) for fornecedor, m, s, tentativas, acertos in rows}
+        taxas = {}
+        for fornecedor in {row[0] for row in rows}:
+            for key in keys:
+                tentativas, acertos = por_chave.get((fornecedor, key), (0, 0))
+                if tentativas >= self.min_tentativas:
+                    taxas[fornecedor] = acertos / tentativas
+                    break
+        return taxas
+
+    def plan(self, fornecedores, codigo: str, marca: str = None):
+        """Divide `fornecedores` (já na ordem configurada) em ondas de busca."""
+        taxas = self.hit_rates(codigo, marca)
+        promissores = sorted(
+            (f for f in fornecedores if taxas.get(f.nome, -1) >= self.min_taxa),
+            key=lambda f: -taxas[f.nome],
+        )
+        desconhecidos = [f for f in fornecedores if f.nome not in taxas]
+        fracos = [f for f in fornecedores if 0 <= taxas.get(f.nome, -1) < self.min_taxa]
+        ondas = [onda for onda in (promissores, desconhecidos, fracos) if onda]
+        logger.debug(f"Ondas para {codigo} ({marca}): {[[f.nome for f in onda] for onda in ondas]}")
+        return ondas
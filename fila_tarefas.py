@@ -0,0 +1,177 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINALIZADOS = (DONE, FAILED, CANCELLED)
+
+
+class TaskQueue:
+    """
+    Fila de buscas de produto em SQLite, consumida por processos worker.py.
+
+    Uma tarefa reivindicada por um worker fica invisível aos demais por
+    `visibility_timeout` segundos; o worker a renova (`extend`) enquanto a busca
+    roda. Se ele morrer, a tarefa volta a ficar visível e outro worker a assume.
+    Falhas são repetidas até `max_tentativas`; depois a tarefa termina como
+    'failed' com o último erro como resultado. Vários processos (ou contêineres
+    com o mesmo volume data/) podem usar o mesmo arquivo.
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = 600, max_tentativas: int = 3,
+                 retry_delay: float = 5, ttl: int = 24 * 3600):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_tentativas = max_tentativas
+        self.retry_delay = retry_delay
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        diretorio = os.path.dirname(os.path.abspath(path))
+        os.makedirs(diretorio, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tarefas (
+                id TEXT PRIMARY KEY,
+                codigo TEXT NOT NULL,
+                marca TEXT,
+                opcoes TEXT NOT NULL,
+                status TEXT NOT NULL,
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                visivel_em REAL NOT NULL,
+                worker TEXT,
+                resultado TEXT,
+                criado_em REAL NOT NULL,
+                atualizado_em REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tarefas_status ON tarefas (status, visivel_em)"
+        )
+        self._conn.commit()
+
+    def submit(self, codigo: str, marca: str = None, opcoes: dict = None):
+        """Enfileira a busca de um produto e retorna o id da tarefa."""
+        task_id = uuid.uuid4().hex
+        agora = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO tarefas (id, codigo, marca, opcoes, status, visivel_em, criado_em, atualizado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (task_id, codigo, marca, json.dumps(opcoes or {}), PENDING, agora, agora, agora),
+            )
+            self._conn.execute(
+                "DELETE FROM tarefas WHERE status IN (?, ?, ?) AND atualizado_em < ?",
+                (DONE, FAILED, CANCELLED, agora - self.ttl),
+            )
+            self._conn.commit()
+        return task_id
+
+    def claim(self, worker: str):
+        """Reivindica a tarefa visível mais antiga; retorna {'id', 'codigo', 'marca', 'opcoes', 'tentativas'} ou None."""
+        agora = time.time()
+        with self._lock:
+            # Tarefas que esgotaram as tentativas com o worker morto não voltam para a fila
+            self._conn.execute(
+                """
+                UPDATE tarefas SET status = ?, atualizado_em = ?,
+                    resultado = COALESCE(resultado, ?)
+                WHERE status = ? AND visivel_em <= ? AND tentativas >= ?
+                """,
+                (FAILED, agora, json.dumps({"error": "Tempo de processamento esgotado nos workers"}),
+                 RUNNING, agora, self.max_tentativas),
+            )
+            row = self._conn.execute(
+                """
+                UPDATE tarefas SET status = ?, tentativas = tentativas + 1, visivel_em = ?,
+                    worker = ?, atualizado_em = ?
+                WHERE id = (
+                    SELECT id FROM tarefas WHERE status IN (?, ?) AND visivel_em <= ?
+                    ORDER BY criado_em LIMIT 1
+                )
+                RETURNING id, codigo, marca, opcoes, tentativas
+                """,
+                (RUNNING, agora + self.visibility_timeout, worker, agora, PENDING, RUNNING, agora),
+            ).fetchone()
+            self._conn.commit()
+        if row is None:
+            return None
+        task_id, codigo, marca, opcoes, tentativas = row
+        return {"id": task_id, "codigo": codigo, "marca": marca, "opcoes": json.loads(opcoes), "tentativas": tentativas}
+
+    def extend(self, task_id: str, worker: str):
+        """Renova a invisibilidade de uma tarefa em andamento; False se ela não é mais deste worker."""
+        agora = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tarefas SET visivel_em = ?, atualizado_em = ? WHERE id = ? AND worker = ? AND status = ?",
+                (agora + self.visibility_timeout, agora, task_id, worker, RUNNING),
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def complete(self, task_id: str, worker: str, resultado: dict):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tarefas SET status = ?, resultado = ?, atualizado_em = ? WHERE id = ? AND worker = ? AND status = ?",
+                (DONE, json.dumps(resultado, ensure_ascii=False), time.time(), task_id, worker, RUNNING),
+            )
+            self._conn.commit()
+
+    def fail(self, task_id: str, worker: str, resultado: dict):
+        """Devolve a tarefa à fila após `retry_delay`, ou a encerra como 'failed' na última tentativa."""
+        agora = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE tarefas SET
+                    status = CASE WHEN tentativas >= ? THEN ? ELSE ? END,
+                    visivel_em = ?, resultado = ?, atualizado_em = ?
+                WHERE id = ? AND worker = ? AND status = ?
+                """,
+                (self.max_tentativas, FAILED, PENDING, agora + self.retry_delay,
+                 json.dumps(resultado, ensure_ascii=False), agora, task_id, worker, RUNNING),
+            )
+            self._conn.commit()
+
+    def cancel(self, task_id: str):
+        """Cancela uma tarefa que ainda não terminou (o chamador desistiu de esperar)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tarefas SET status = ?, atualizado_em = ? WHERE id = ? AND status IN (?, ?)",
+                (CANCELLED, time.time(), task_id, PENDING, RUNNING),
+            )
+            self._conn.commit()
+
+    def get(self, task_id: str):
+        """Retorna (status, resultado) da tarefa, ou None se ela não existe."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, resultado FROM tarefas WHERE id = ?", (task_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, resultado = row
+        return status, json.loads(resultado) if resultado else None
+
+    def stats(self):
+        """Quantidade de tarefas por status ('pending', 'running', ...)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM tarefas GROUP BY status").fetchall()
+        return dict(rows)
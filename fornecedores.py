@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Fornecedor:
+    """
+    Um site de fornecedor pesquisado pelo serviço.
+
+    `url_busca` é um template com {codigo} para sites cuja busca é acessível por
+    URL; quando ausente, o agente abre `url_inicial` e usa o campo de pesquisa.
+    `seletor_resultados` (CSS) e `timeout_pronto` (segundos) configuram a ação
+    aguardar_pagina_pronta: a página está pronta assim que o seletor aparece (num
+    documento aberto depois da última ação, ou inserido depois dela), por
+    isso ele deve cobrir a lista de resultados, a busca sem resultados e a página
+    do produto. Sem seletor (ou se ele não aparecer), a página é dada como pronta
+    quando o DOM e a rede ficam estáveis. `dominios_permitidos` e `tipos_permitidos` são
+    exceções ao bloqueio de recursos (bloqueio_recursos.py) para sites que quebram.
+    """
+
+    nome: str
+    url_inicial: str
+    prioridade: int
+    url_busca: Optional[str] = None
+    notas: str = ""
+    seletor_resultados: Optional[str] = None
+    timeout_pronto: float = float(os.getenv("PAGE_READY_TIMEOUT", "15"))
+    dominios_permitidos: tuple = ()
+    tipos_permitidos: tuple = ()
+
+    def search_url(self, codigo: str):
+        if not self.url_busca:
+            return None
+        return self.url_busca.format(codigo=quote(codigo, safe=""))
+
+
+# Ordem de prioridade: o primeiro fornecedor com preço válido vence
+# Seletores: itens da busca, aviso de busca vazia e preço da página do produto
+FORNECEDORES_PADRAO = [
+    Fornecedor(
+        "Motion",
+        "https://www.motion.com/",
+        1,
+        seletor_resultados="a[href*='/products/sku/'], [class*='no-results'], [itemprop='price']",
+    ),
+    Fornecedor(
+        "Abecom",
+        "https://www.loja.abecom.com.br/",
+        2,
+        url_busca="https://www.loja.abecom.com.br/loja/busca.php?loja=835310&palavra_busca={codigo}",
+        seletor_resultados="a[href*='IdProd='], [itemprop='price']",
+    ),
+    Fornecedor(
+        "Quality",
+        "https://www.qualitybearingsonline.com/",
+        3,
+        notas="Preços em libras (£).",
+        seletor_resultados=".product-item, .search.results .message, .product-info-price",
+    ),
+    Fornecedor(
+        "Misumi",
+        "https://us.misumi-ec.com/",
+        4,
+        notas="Aceite o aviso de cookies antes de pesquisar.",
+        seletor_resultados="a[href*='/vona2/detail/'], [itemprop='price']",
+    ),
+    Fornecedor(
+        "Rhia",
+        "https://shop.rhia.de/de/",
+        5,
+        notas="Site em alemão: 'Preis' é o preço, 'Suche' a busca.",
+        seletor_resultados=".product-box, .cms-element-product-listing .alert, .product-detail-price",
+    ),
+    Fornecedor(
+        "Samflex Estrela",
+        "https://rodavigo.net/pt",
+        6,
+        seletor_resultados=".product-miniature, .page-not-found, .product-prices",
+    ),
+    Fornecedor(
+        "Misumi UK",
+        "https://uk.misumi-ec.com/",
+        7,
+        notas="Aceite o aviso de cookies antes de pesquisar.",
+        seletor_resultados="a[href*='/vona2/detail/'], [itemprop='price']",
+    ),
+]
+
+
+def load_fornecedores(path: str = None):
+    """
+    Carrega o registro de fornecedores, ordenado por prioridade.
+
+    Se `path` (ou FORNECEDORES_FILE) apontar para um JSON com uma lista de objetos
+    com os campos de Fornecedor, ele substitui o registro padrão.
+    """
+    path = path or os.getenv("FORNECEDORES_FILE")
+    fornecedores = FORNECEDORES_PADRAO
+    if path:
+        with open(path, encoding="utf-8") as f:
+            fornecedores = [Fornecedor(**item) for item in json.load(f)]
+        logger.info(f"Registro de fornecedores carregado de {path}: {[f.nome for f in fornecedores]}")
+    return sorted(fornecedores, key=lambda f: f.prioridade)
+
+
+def count_tokens(text: str):
+    """Conta tokens com o tokenizer do gpt-4o (tiktoken) ou estima ~4 caracteres por token."""
+    try:
+        import tiktoken
+    except ImportError:
+        return len(text) // 4 + 1
+    return len(tiktoken.encoding_for_model("gpt-4o").encode(text))
+
+
+def build_prompt(fornecedor: Fornecedor, codigo: str, marca: str = None, token_budget: int = None):
+    """
+    Gera a tarefa mínima do agente para pesquisar `codigo` em um único fornecedor.
+
+    Os campos a extrair não são listados aqui: o agente os recebe pelo schema de
+    saída (modelos.RespostaProduto). Se o prompt passar de `token_budget`, as
+    notas do fornecedor são removidas.
+    """
+    marca_text = marca if marca else "não especificada"
+    url = fornecedor.search_url(codigo)
+    if url:
+        abrir = f"Abra {url} (já é a página de resultados da busca por {codigo})."
+    else:
+        abrir = f"Abra {fornecedor.url_inicial} e pesquise {codigo} no campo de busca."
+
+    partes = [
+        f"Pesquise o produto {codigo} (marca: {marca_text}) somente no site {fornecedor.nome}.",
+        f"1. {abrir}",
+        "2. Após pesquisar ou abrir uma página, use aguardar_pagina_pronta (nunca espere tempo fixo).",
+        f"3. Escolha apenas o produto com código exatamente {codigo}; entre vários, prefira a marca {marca_text}.",
+        "4. Abra a página do produto e extraia nome, part number, preço, estoque, URL e especificações técnicas.",
+        f'5. Finalize. Preço "", indisponível ou sob consulta: use price "". Sem código exato: produto null. fornecedor: "{fornecedor.nome}".',
+    ]
+    notas = f"Notas: {fornecedor.notas}" if fornecedor.notas else ""
+
+    prompt = "\n".join(partes + ([notas] if notas else []))
+    tokens = count_tokens(prompt)
+    if token_budget and tokens > token_budget and notas:
+        prompt = "\n".join(partes)
+        tokens = count_tokens(prompt)
+    if token_budget and tokens > token_budget:
+        logger.warning(f"Prompt de {fornecedor.nome} com {tokens} tokens excede o orçamento de {token_budget}")
+
+    logger.info(f"Prompt de {fornecedor.nome} para {codigo}: {tokens} tokens")
+    return prompt
@@ -0,0 +1,218 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Estados de um job e de cada produto dentro dele
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+FAILED = "failed"
+INTERRUPTED = "interrupted"
+
+
+def _process_start(pid: int):
+    """
+    Início do processo em ticks desde o boot (/proc/<pid>/stat), ou None se ele
+    não existe. Sem /proc, "?" para processos vivos (o início fica desconhecido).
+    """
+    if not os.path.isdir("/proc"):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return None
+        except PermissionError:
+            pass
+        return "?"
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[19]
+    except (FileNotFoundError, ProcessLookupError):
+        return None
+
+
+def _owner():
+    # O início do processo distingue um pid reaproveitado (ex.: contêiner reiniciado)
+    return f"{socket.gethostname()}:{os.getpid()}:{_process_start(os.getpid())}"
+
+
+def _owner_alive(dono: str):
+    """False se o dono é um processo deste host que já terminou; donos de outros hosts contam como vivos."""
+    if not dono:
+        return False
+    host, pid, inicio = (dono.split(":") + [None, None])[:3]
+    if host != socket.gethostname():
+        return True
+    return _process_start(int(pid)) == inicio
+
+
+class JobStore:
+    """
+    Armazena em SQLite o estado dos jobs assíncronos de /produtos.
+
+    Cada job guarda a lista de produtos com status e resultado individuais, de
+    modo que resultados parciais possam ser consultados enquanto o job roda, e o
+    processo (host:pid) que o executa.
+    """
+
+    def __init__(self, path: str, ttl: int = 7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        diretorio = os.path.dirname(os.path.abspath(path))
+        os.makedirs(diretorio, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                atualizado_em REAL NOT NULL,
+                extra TEXT,
+                dono TEXT
+            );
+            CREATE TABLE IF NOT EXISTS job_produtos (
+                job_id TEXT NOT NULL,
+                indice INTEGER NOT NULL,
+                codigo TEXT,
+                marca TEXT,
+                quantidade TEXT,
+                status TEXT NOT NULL,
+                resultado TEXT,
+                PRIMARY KEY (job_id, indice)
+            );
+            """
+        )
+        # Bancos criados antes da coluna dono
+        colunas = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "dono" not in colunas:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN dono TEXT")
+        self._conn.commit()
+
+
+    def interrupt_unfinished(self):
+        """
+        Marca como interrompidos os jobs não terminados cujo processo dono morreu.
+
+        Chamado por cada processo do servidor ao iniciar, e não no construtor,
+        porque os processos worker.py também importam o serviço enquanto a API
+        roda. Jobs de outros workers ainda vivos continuam como estão.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, dono FROM jobs WHERE status IN (?, ?)", (PENDING, RUNNING)
+            ).fetchall()
+            orfaos = [(INTERRUPTED, job_id) for job_id, dono in rows if not _owner_alive(dono)]
+            self._conn.executemany("UPDATE jobs SET status = ? WHERE id = ?", orfaos)
+            self._conn.commit()
+        if orfaos:
+            logger.info(f"{len(orfaos)} jobs interrompidos de processos que pararam")
+
+    def create(self, produtos):
+        """Cria um job para a lista de produtos e retorna seu id."""
+        job_id = uuid.uuid4().hex
+        agora = time.time()
+        with self._lock:
+            self._purge(agora)
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, criado_em, atualizado_em, dono) VALUES (?, ?, ?, ?, ?)",
+                (job_id, PENDING, agora, agora, _owner()),
+            )
+            self._conn.executemany(
+                """
+                INSERT INTO job_produtos (job_id, indice, codigo, marca, quantidade, status)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        job_id,
+                        i,
+                        produto.get("codigo"),
+                        produto.get("marca"),
+                        json.dumps(produto.get("quantidade", 1)),
+                        PENDING,
+                    )
+                    for i, produto in enumerate(produtos)
+                ],
+            )
+            self._conn.commit()
+        return job_id
+
+    def set_status(self, job_id: str, status: str, extra: dict = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, atualizado_em = ?, extra = COALESCE(?, extra) WHERE id = ?",
+                (status, time.time(), json.dumps(extra, ensure_ascii=False) if extra else None, job_id),
+            )
+            self._conn.commit()
+
+    def set_product_result(self, job_id: str, indice: int, resultado: dict):
+        """Grava o resultado de um produto do job assim que ele termina."""
+        status = ERROR if "error" in resultado else DONE
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_produtos SET status = ?, resultado = ? WHERE job_id = ? AND indice = ?",
+                (status, json.dumps(resultado, ensure_ascii=False), job_id, indice),
+            )
+            self._conn.execute(
+                "UPDATE jobs SET atualizado_em = ? WHERE id = ?", (time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str):
+        """Retorna o job com o status e o resultado (parcial) de cada produto, ou None."""
+        with self._lock:
+            job = self._conn.execute(
+                "SELECT status, criado_em, atualizado_em, extra FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+            if job is None:
+                return None
+            rows = self._conn.execute(
+                """
+                SELECT codigo, marca, quantidade, status, resultado FROM job_produtos
+                WHERE job_id = ? ORDER BY indice
+                """,
+                (job_id,),
+            ).fetchall()
+
+        status, criado_em, atualizado_em, extra = job
+        produtos = [
+            {
+                "codigo": codigo,
+                "marca": marca,
+                "quantidade": json.loads(quantidade),
+                "status": produto_status,
+                "resultado": json.loads(resultado) if resultado else None,
+            }
+            for codigo, marca, quantidade, produto_status, resultado in rows
+        ]
+        return {
+            "job_id": job_id,
+            "status": status,
+            "criado_em": criado_em,
+            "atualizado_em": atualizado_em,
+            "total": len(produtos),
+            "concluidos": sum(1 for p in produtos if p["status"] in (DONE, ERROR)),
+            "produtos": produtos,
+            **(json.loads(extra) if extra else {}),
+        }
+
+    def _purge(self, agora: float):
+        limite = agora - self.ttl
+        self._conn.execute(
+            "DELETE FROM job_produtos WHERE job_id IN (SELECT id FROM jobs WHERE atualizado_em < ?)",
+            (limite,),
+        )
+        self._conn.execute("DELETE FROM jobs WHERE atualizado_em < ?", (limite,))
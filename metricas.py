@@ -0,0 +1,116 @@
+"""
+Métricas Prometheus do serviço.
+
+Com vários processos (workers do servidor ASGI, worker.py no mesmo host),
+PROMETHEUS_MULTIPROC_DIR deve apontar para um diretório vazio antes do import do
+prometheus_client: cada processo grava suas métricas ali e /metrics soma as de
+todos. Processos sem esse diretório compartilhado expõem as suas com serve().
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+    start_http_server,
+)
+
+# Buscas levam de milissegundos (cache) a vários minutos (agentes)
+_BUCKETS_BUSCA = (0.05, 0.25, 1, 2.5, 5, 10, 20, 30, 60, 90, 120, 180, 300, 600)
+
+SEARCH_DURATION = Histogram(
+    "rpm_search_duration_seconds",
+    "Tempo total de get_product, por resultado do cache",
+    ["cache"],
+    buckets=_BUCKETS_BUSCA,
+)
+SUPPLIER_DURATION = Histogram(
+    "rpm_supplier_search_duration_seconds",
+    "Tempo de busca em um fornecedor",
+    ["fornecedor", "origem", "resultado"],
+    buckets=_BUCKETS_BUSCA,
+)
+AGENT_STEPS = Histogram(
+    "rpm_agent_steps",
+    "Passos executados por agente",
+    ["fornecedor"],
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+LLM_DURATION = Histogram(
+    "rpm_llm_call_duration_seconds",
+    "Latência de cada chamada ao LLM",
+    ["model"],
+    buckets=(0.25, 0.5, 1, 2, 3, 5, 8, 13, 21, 34, 60),
+)
+LLM_TOKENS = Histogram(
+    "rpm_llm_tokens",
+    "Tokens por chamada ao LLM",
+    ["model", "tipo"],
+    buckets=(100, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+)
+BROWSER_LAUNCH_DURATION = Histogram(
+    "rpm_browser_launch_duration_seconds",
+    "Tempo para iniciar um navegador do pool",
+    buckets=(0.25, 0.5, 1, 2, 3, 5, 8, 13, 21),
+)
+ACTIVE_AGENTS = Gauge("rpm_active_agents", "Agentes rodando agora", multiprocess_mode="livesum")
+QUEUE_DEPTH = Gauge("rpm_agent_queue_depth", "Agentes aguardando admissão", multiprocess_mode="livesum")
+CACHE_REQUESTS = Counter(
+    "rpm_cache_requests_total",
+    "Consultas ao cache de produtos por resultado (hit, miss, bypass)",
+    ["resultado"],
+)
+PRICE_FOUND = Counter(
+    "rpm_supplier_price_found_total",
+    "Buscas em fornecedor que encontraram preço válido",
+    ["fornecedor", "origem"],
+)
+
+
+class InstrumentedLLM:
+    """Envolve o LLM do browser-use medindo latência e tokens de cada chamada."""
+
+    def __init__(self, llm):
+        self._llm = llm
+
+    def __getattr__(self, name):
+        return getattr(self._llm, name)
+
+    async def ainvoke(self, messages, output_format=None):
+        model = str(getattr(self._llm, "model", "desconhecido"))
+        inicio = time.monotonic()
+        try:
+            return_value = await self._llm.ainvoke(messages, output_format)
+        finally:
+            LLM_DURATION.labels(model).observe(time.monotonic() - inicio)
+
+        usage = getattr(return_value, "usage", None)
+        if usage is not None:
+            LLM_TOKENS.labels(model, "prompt").observe(getattr(usage, "prompt_tokens", 0) or 0)
+            LLM_TOKENS.labels(model, "completion").observe(getattr(usage, "completion_tokens", 0) or 0)
+        return return_value
+
+
+def observe_scheduler(stats):
+    """Atualiza os gauges do agendador de agentes (AdmissionScheduler.on_change)."""
+    ACTIVE_AGENTS.set(stats["ativos"])
+    QUEUE_DEPTH.set(stats["fila"])
+
+
+def mark_process_dead(pid: int = None):
+    """Descarta os gauges de um processo que terminou (modo multiprocesso)."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+def serve(port: int):
+    """Expõe /metrics deste processo em `port`, numa thread (processos sem servidor HTTP, como worker.py)."""
+    start_http_server(port)
+
+
+def render():
+    """Retorna (corpo, content-type) no formato de exposição do Prometheus, somando os processos."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,102 @@
+import json
+import logging
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, model_validator
+
+logger = logging.getLogger(__name__)
+
+
+class _Modelo(BaseModel):
+    # O LLM às vezes devolve preço como número ou campos como null
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _drop_nulls(cls, data):
+        if isinstance(data, dict):
+            return {k: v for k, v in data.items() if v is not None}
+        return data
+
+
+class Especificacoes(_Modelo):
+    """Especificações técnicas do rolamento; campos não encontrados ficam como ""."""
+
+    bore_type: str = ""
+    bore_diameter: str = ""
+    outside_diameter: str = ""
+    overall_width: str = ""
+    closure_type: str = ""
+    snap_ring_included: str = ""
+    bearing_material: str = ""
+    cage_material: str = ""
+    cage_type: str = ""
+    description: str = ""
+    element_material: str = ""
+    fillet_radius: str = ""
+    finish_coating: str = ""
+    inner_ring_width: str = ""
+    internal_clearance: str = ""
+    manufacturer_catalog_number: str = ""
+    manufacturer_upc_number: str = ""
+    max_rpm: str = ""
+    operating_temperature_range: str = ""
+    precision_rating: str = ""
+    radial_dynamic_load_capacity: str = ""
+    radial_static_load_capacity: str = ""
+    seal_type: str = ""
+    series: str = ""
+    weight: str = ""
+    product_type: str = ""
+
+
+class Produto(_Modelo):
+    full_product_name: str = ""
+    part_number: str = ""
+    price: str = ""
+    stock_status: str = ""
+    direct_url: str = ""
+    specifications: Especificacoes = Field(default_factory=Especificacoes)
+    fornecedor: str = ""
+
+
+class RespostaProduto(_Modelo):
+    """Saída estruturada do agente: o produto encontrado, ou null se não houver código exato."""
+
+    produto: Optional[Produto] = None
+
+
+def extract_json(text):
+    """Extrai o primeiro objeto JSON de um texto retornado pelo agente."""
+    if not text:
+        return None
+    inicio = text.find("{")
+    fim = text.rfind("}")
+    if inicio == -1 or fim <= inicio:
+        return None
+    try:
+        return json.loads(text[inicio:fim + 1])
+    except json.JSONDecodeError:
+        return None
+
+
+def parse_produto(data):
+    """
+    Valida a saída do agente (texto ou dict) no schema de Produto.
+
+    Aceita tanto {"produto": {...}} quanto o produto direto. Retorna o produto
+    como dict ou None quando não há produto válido.
+    """
+    if isinstance(data, str):
+        data = extract_json(data)
+    if not isinstance(data, dict):
+        return None
+    if "produto" in data:
+        data = data["produto"]
+    if not isinstance(data, dict):
+        return None
+    try:
+        return Produto.model_validate(data).model_dump()
+    except ValidationError as e:
+        logger.warning(f"Saída do agente fora do schema de produto: {e}")
+        return None
@@ -0,0 +1,69 @@
+import time
+
+
+class TokenBudgetExceeded(Exception):
+    """O orçamento de tokens da busca acabou antes da chamada ao LLM."""
+
+
+class Orcamento:
+    """
+    Limites de uma busca de produto: passos por agente, prazo e tokens.
+
+    O prazo (`timeout`, em segundos) e os tokens valem para a busca inteira,
+    somando todos os fornecedores; `max_steps` vale para cada agente.
+    """
+
+    def __init__(self, max_steps: int = None, timeout: float = None, max_tokens: int = None):
+        self.max_steps = max_steps
+        self.max_tokens = max_tokens
+        self.limite = time.monotonic() + timeout if timeout else None
+        self.tokens_usados = 0
+
+    def restante(self):
+        """Segundos até o prazo, ou None sem prazo."""
+        if self.limite is None:
+            return None
+        return max(0.0, self.limite - time.monotonic())
+
+    def tokens_esgotados(self):
+        return self.max_tokens is not None and self.tokens_usados >= self.max_tokens
+
+
+class BudgetedLLM:
+    """
+    Envolve o LLM de um agente: conta os tokens no orçamento da busca, recusa
+    chamadas depois que ele acaba e guarda o tamanho do prompt de cada chamada.
+    """
+
+    def __init__(self, llm, orcamento: Orcamento):
+        self._llm = llm
+        self._orcamento = orcamento
+        self.prompt_tokens = []
+        self.completion_tokens = 0
+
+    def __getattr__(self, name):
+        return getattr(self._llm, name)
+
+    async def ainvoke(self, messages, output_format=None):
+        if self._orcamento.tokens_esgotados():
+            raise TokenBudgetExceeded(
+                f"Orçamento de {self._orcamento.max_tokens} tokens esgotado ({self._orcamento.tokens_usados} usados)"
+            )
+        return_value = await self._llm.ainvoke(messages, output_format)
+        usage = getattr(return_value, "usage", None)
+        if usage is not None:
+            prompt = getattr(usage, "prompt_tokens", 0) or 0
+            completion = getattr(usage, "completion_tokens", 0) or 0
+            self.prompt_tokens.append(prompt)
+            self.completion_tokens += completion
+            self._orcamento.tokens_usados += prompt + completion
+        return return_value
+
+    def usage(self):
+        """Resumo do uso: chamadas, tokens de prompt por chamada (passo) e totais."""
+        return {
+            "chamadas": len(self.prompt_tokens),
+            "prompt_tokens_por_passo": list(self.prompt_tokens),
+            "prompt_tokens": sum(self.prompt_tokens),
+            "completion_tokens": self.completion_tokens,
+        }
@@ -0,0 +1,337 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from urllib.parse import quote, quote_plus
+
+from browser_use.llm.messages import UserMessage
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import async_playwright
+
+from acoes_navegador import ready_expression
+from adaptadores import matches_code
+from modelos import RespostaProduto, parse_produto
+
+logger = logging.getLogger(__name__)
+
+# Marcador do código pesquisado nos passos gravados
+PARAMETRO = "{codigo}"
+
+# Ações do browser-use que só leem a página: o replay extrai o texto no final
+_ACOES_IGNORADAS = {
+    "done", "scroll", "scroll_to_text", "find_text", "extract", "extract_structured_data",
+    "extract_content", "read_file", "write_file", "replace_file_str",
+}
+
+
+class PlaybookError(Exception):
+    """Um passo do playbook falhou no replay; o chamador recorre ao Agent."""
+
+
+def _parametrize(texto: str, codigo: str):
+    for variante in {codigo, quote(codigo, safe=""), quote_plus(codigo)}:
+        texto = re.sub(re.escape(variante), PARAMETRO, texto, flags=re.IGNORECASE)
+    return texto
+
+
+def _attributes(elemento):
+    return (getattr(elemento, "attributes", None) or {}) if elemento is not None else {}
+
+
+def _refers_to(elemento, codigo: str):
+    return any(codigo.upper() in str(valor).upper() for valor in _attributes(elemento).values())
+
+
+def _selector(elemento):
+    """Seletor estável do elemento: id, atributos descritivos ou, por último, o XPath."""
+    if elemento is None:
+        return None
+    attrs = _attributes(elemento)
+    tag = (getattr(elemento, "node_name", None) or "").lower()
+    # Ids com sequências numéricas costumam ser gerados a cada carregamento
+    if attrs.get("id") and not re.search(r"\d{3,}", attrs["id"]):
+        return f"[id={json.dumps(attrs['id'], ensure_ascii=False)}]"
+    for attr in ("name", "data-testid", "aria-label", "placeholder"):
+        if attrs.get(attr):
+            return f"{tag}[{attr}={json.dumps(attrs[attr], ensure_ascii=False)}]"
+    x_path = getattr(elemento, "x_path", None)
+    if x_path:
+        return "xpath=" + (x_path if x_path.startswith("/") else "/" + x_path)
+    return None
+
+
+def record_playbook(history, codigo: str):
+    """
+    Converte o histórico de um agente bem-sucedido em passos reproduzíveis.
+
+    O código pesquisado vira {codigo} em URLs e textos digitados, e o clique
+    (ou a navegação) no resultado vira 'abrir_resultado', que no replay abre o
+    link com o código exato. Retorna None se alguma ação não tiver equivalente
+    ou se os passos não dependerem do código.
+    """
+    passos = []
+    for action in history.model_actions():
+        elemento = action.pop("interacted_element", None)
+        if not action:
+            continue
+        nome, params = next(iter(action.items()))
+        params = params or {}
+        pesquisou = any(PARAMETRO in json.dumps(p) for p in passos)
+
+        if nome in _ACOES_IGNORADAS:
+            continue
+        if nome in ("navigate", "go_to_url"):
+            url = _parametrize(params.get("url", ""), codigo)
+            # Depois da busca, uma URL com o código é a página do produto
+            passo = {"acao": "abrir_resultado"} if pesquisou and PARAMETRO in url else {"acao": "navegar", "url": url}
+        elif nome in ("input", "input_text"):
+            seletor = _selector(elemento)
+            if seletor is None:
+                return None
+            passo = {"acao": "preencher", "seletor": seletor, "texto": _parametrize(str(params.get("text", "")), codigo)}
+        elif nome in ("click", "click_element_by_index"):
+            if pesquisou and _refers_to(elemento, codigo):
+                passo = {"acao": "abrir_resultado"}
+            else:
+                seletor = _selector(elemento)
+                if seletor is None:
+                    return None
+                passo = {"acao": "clicar", "seletor": seletor}
+        elif nome == "send_keys":
+            passo = {"acao": "tecla", "tecla": params.get("keys", "")}
+        elif nome in ("aguardar_pagina_pronta", "wait"):
+            passo = {"acao": "aguardar", "seletor": params.get("seletor")}
+        elif nome == "go_back":
+            passo = {"acao": "voltar"}
+        else:
+            logger.debug(f"Ação {nome} sem equivalente no replay; playbook não gravado")
+            return None
+
+        if passo["acao"] == "aguardar" and passos and passos[-1]["acao"] == "aguardar":
+            continue
+        passos.append(passo)
+
+    if not any(PARAMETRO in json.dumps(p) for p in passos):
+        return None
+    return passos
+
+
+async def _wait_ready(page, seletor: str = None, timeout: float = 15.0, origem: float = None):
+    for tentativa in range(2):
+        try:
+            await page.wait_for_load_state("load")
+            return await page.evaluate(ready_expression(seletor, timeout, origem=origem))
+        except PlaywrightError as e:
+            # Uma navegação durante a espera destrói o contexto JS; tenta de novo na página nova
+            if tentativa:
+                raise
+            logger.debug(f"Espera de página interrompida no replay: {e}")
+
+
+async def _document_origin(page):
+    try:
+        return await page.evaluate("performance.timeOrigin")
+    except PlaywrightError:
+        # Navegação em andamento: o próximo documento é novo de qualquer forma
+        return None
+
+
+async def _run_step(page, passo, codigo: str, timeout: float, origem: float = None):
+    """
+    Executa um passo; retorna False quando a busca não mostra o código.
+
+    `origem` é o documento aberto antes da última ação (ready_expression).
+    """
+    acao = passo["acao"]
+    if acao == "navegar":
+        await page.goto(passo["url"].replace(PARAMETRO, quote(codigo, safe="")))
+    elif acao == "preencher":
+        await page.locator(passo["seletor"]).first.fill(passo["texto"].replace(PARAMETRO, codigo))
+    elif acao == "clicar":
+        await page.locator(passo["seletor"]).first.click()
+    elif acao == "tecla":
+        await page.keyboard.press(passo["tecla"])
+    elif acao == "aguardar":
+        await _wait_ready(page, passo.get("seletor"), timeout, origem)
+    elif acao == "voltar":
+        await page.go_back()
+    elif acao == "abrir_resultado":
+        await _wait_ready(page, timeout=timeout)
+        links = await page.eval_on_selector_all(
+            "a[href]", "els => els.map((e) => [e.innerText + ' ' + (e.title || ''), e.href])"
+        )
+        href = next((href for texto, href in links if matches_code(texto, codigo)), None)
+        if href is None:
+            # Alguns sites abrem o produto direto quando a busca é exata
+            return matches_code(await page.inner_text("body"), codigo)
+        await page.goto(href)
+    else:
+        raise PlaybookError(f"Ação desconhecida no playbook: {acao}")
+    return True
+
+
+def _route_handler(blocker):
+    async def handler(route):
+        if blocker.blocks(route.request.url, route.request.resource_type):
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+    return handler
+
+
+_playwright = None
+_playwright_lock = asyncio.Lock()
+
+
+async def get_playwright():
+    """Retorna o Playwright do processo, iniciando o driver na primeira chamada."""
+    global _playwright
+    async with _playwright_lock:
+        if _playwright is None:
+            _playwright = await async_playwright().start()
+    return _playwright
+
+
+async def stop_playwright():
+    """Encerra o driver do Playwright do processo, se foi iniciado."""
+    global _playwright
+    async with _playwright_lock:
+        if _playwright is not None:
+            await _playwright.stop()
+            _playwright = None
+
+
+async def replay_playbook(passos, browser_session, codigo: str, timeout: float = 15.0, blocker=None):
+    """
+    Reproduz os passos numa aba nova do navegador via Playwright (connect_over_cdp).
+
+    O driver do Playwright é um só por processo (get_playwright); cada replay
+    só abre e fecha a conexão CDP com o navegador da sessão.
+
+    Retorna (texto, url) da página final, ou None quando ela não mostra o
+    código exato (sem resultado ou playbook desatualizado: o chamador não
+    distingue e usa o Agent). Erros de um passo viram PlaybookError.
+    """
+    try:
+        playwright = await get_playwright()
+        browser = await playwright.chromium.connect_over_cdp(browser_session.cdp_url)
+        try:
+            context = browser.contexts[0] if browser.contexts else await browser.new_context()
+            page = await context.new_page()
+            page.set_default_timeout(timeout * 1000)
+            try:
+                if blocker is not None:
+                    await page.route("**/*", _route_handler(blocker))
+                origem = None
+                for passo in passos:
+                    if passo["acao"] != "aguardar":
+                        origem = await _document_origin(page)
+                    if not await _run_step(page, passo, codigo, timeout, origem):
+                        return None
+                await _wait_ready(page, timeout=timeout)
+                texto = await page.inner_text("body")
+                if not matches_code(texto, codigo):
+                    return None
+                return texto, page.url
+            finally:
+                await page.close()
+        finally:
+            # Num navegador conectado por CDP, close() só desconecta; a sessão continua aberta
+            await browser.close()
+    except PlaywrightError as e:
+        raise PlaybookError(str(e)) from e
+
+
+async def extract_produto(llm, texto: str, url: str, fornecedor: str, codigo: str,
+                          marca: str = None, max_chars: int = 15000):
+    """Extrai o produto do texto da página com uma única chamada ao LLM."""
+    marca_text = marca if marca else "não especificada"
+    prompt = (
+        f"Texto da página {url} do site {fornecedor}. Extraia o produto com código exatamente {codigo} "
+        f"(marca: {marca_text}): nome, part number, preço, estoque e especificações técnicas. "
+        f'Preço indisponível ou sob consulta: price "". Sem código exato: produto null. '
+        f'fornecedor: "{fornecedor}". direct_url: "{url}".\n\n{texto[:max_chars]}'
+    )
+    response = await llm.ainvoke([UserMessage(content=prompt)], output_format=RespostaProduto)
+    return parse_produto(response.completion.model_dump())
+
+
+class PlaybookStore:
+    """
+    Playbooks por fornecedor, um JSON por fornecedor em `diretorio`.
+
+    Um playbook é descartado depois de `max_falhas` replays seguidos com
+    PlaybookError; a próxima busca bem-sucedida do agente grava um novo.
+    O diretório pode ser compartilhado por vários processos: cada gravação é
+    atômica, e um playbook removido por outro processo é tratado como ausente.
+    """
+
+    def __init__(self, diretorio: str, max_falhas: int = 3):
+        self.diretorio = diretorio
+        self.max_falhas = max_falhas
+        self._lock = threading.Lock()
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _path(self, fornecedor: str):
+        nome = re.sub(r"[^a-z0-9]+", "_", fornecedor.lower()).strip("_")
+        return os.path.join(self.diretorio, f"{nome}.json")
+
+    def _read(self, fornecedor: str):
+        try:
+            with open(self._path(fornecedor), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Playbook de {fornecedor} ilegível: {e}")
+            return None
+
+    def _write(self, fornecedor: str, playbook: dict):
+        # Temporário com nome único: vários processos podem gravar o mesmo fornecedor
+        path = self._path(fornecedor)
+        fd, tmp = tempfile.mkstemp(dir=self.diretorio, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(playbook, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def get(self, fornecedor: str):
+        """Passos do playbook do fornecedor, ou None se não houver."""
+        with self._lock:
+            playbook = self._read(fornecedor)
+        return playbook["passos"] if playbook else None
+
+    def save(self, fornecedor: str, passos):
+        with self._lock:
+            self._write(fornecedor, {
+                "fornecedor": fornecedor,
+                "passos": passos,
+                "criado_em": time.time(),
+                "replays": 0,
+                "falhas_seguidas": 0,
+            })
+        logger.info(f"Playbook de {fornecedor} gravado com {len(passos)} passos")
+
+    def record(self, fornecedor: str, ok: bool):
+        """Contabiliza um replay; remove o playbook após falhas seguidas demais."""
+        with self._lock:
+            playbook = self._read(fornecedor)
+            if playbook is None:
+                return
+            playbook["replays"] += 1
+            playbook["falhas_seguidas"] = 0 if ok else playbook["falhas_seguidas"] + 1
+            if playbook["falhas_seguidas"] >= self.max_falhas:
+                logger.info(f"Playbook de {fornecedor} descartado após {playbook['falhas_seguidas']} falhas")
+                try:
+                    os.remove(self._path(fornecedor))
+                except FileNotFoundError:
+                    pass
+            else:
+                self._write(fornecedor, playbook)
@@ -0,0 +1,190 @@
+"""
+Servidor de produção (ASGI: Starlette + uvicorn) com as mesmas rotas do app Flask.
+
+Cada worker do uvicorn é um processo com um event loop de longa duração, no
+qual vivem o pool de navegadores, o agendador de agentes e as buscas em
+andamento; cache, catálogo, jobs, estatísticas e playbooks são compartilhados entre os
+workers pelos arquivos em data/. BROWSER_POOL_SIZE e MAX_CONCURRENT_AGENTS
+valem por worker: cada um pré-inicia seu pool de navegadores, então
+WEB_CONCURRENCY (padrão 1) deve ser dimensionado pela memória, não pelas CPUs.
+Com mais de um worker, /metrics soma todos eles (modo multiprocesso do
+prometheus_client em PROMETHEUS_MULTIPROC_DIR).
+
+Uso:
+    WEB_CONCURRENCY=2 python servidor_asgi.py
+"""
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import browser_use_rpm_do_brasil as servico
+import metricas
+
+logger = logging.getLogger(__name__)
+
+# Jobs de /produtos?async=1 em execução neste worker (evita que o GC os descarte)
+_jobs_em_execucao = set()
+
+
+def _erro_interno(rota, e):
+    logger.error(f"Erro na rota {rota}: {str(e)}")
+    return JSONResponse({"error": "Erro interno do servidor", "details": str(e)}, status_code=500)
+
+
+async def handle_search(request):
+    """GET /search?codigo=6205&marca=SKF[&fresh=1][&history=1][&timeout=60]"""
+    codigo = request.query_params.get('codigo')
+    marca = request.query_params.get('marca')
+    if not codigo:
+        return JSONResponse({"error": "Parâmetro 'codigo' é obrigatório"}, status_code=400)
+    try:
+        options = servico.request_options(request.query_params)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    logger.info(f"GET /search - codigo={codigo}, marca={marca}, fresh={options['fresh']}")
+    try:
+        return JSONResponse(await servico.get_product(codigo, marca, **options))
+    except Exception as e:
+        return _erro_interno("/search", e)
+
+
+async def handle_produtos(request):
+    """POST /produtos com {"query": {"produtos": [...]}}; aceita ?async=1, ?stream=ndjson|sse e ?modo=produto|fornecedor."""
+    try:
+        data = await request.json()
+    except json.JSONDecodeError as e:
+        return JSONResponse({"error": "JSON inválido", "details": str(e)}, status_code=400)
+
+    try:
+        produtos = servico.parse_produtos_payload(data)
+        stream = servico.parse_stream_format(request.query_params)
+        options = servico.request_options(request.query_params)
+        options["por_fornecedor"] = servico.parse_batch_mode(request.query_params)
+        if stream or servico.is_truthy(request.query_params.get('async')):
+            servico.validate_produtos(produtos)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    logger.info(f"Validação bem sucedida. Processando {len(produtos)} produtos")
+
+    if servico.is_truthy(request.query_params.get('async')):
+        job_id = servico.job_store.create(produtos)
+        task = asyncio.create_task(servico.run_job(job_id, produtos, **options))
+        _jobs_em_execucao.add(task)
+        task.add_done_callback(_jobs_em_execucao.discard)
+        logger.info(f"Job {job_id} criado com {len(produtos)} produtos")
+        return JSONResponse(
+            {"job_id": job_id, "status": "pending", "status_url": f"/jobs/{job_id}"},
+            status_code=202,
+        )
+
+    if stream:
+        return StreamingResponse(
+            servico.iter_results(produtos, stream, **options),
+            media_type=servico.STREAM_MIMETYPES[stream],
+        )
+
+    try:
+        return JSONResponse(await servico.search_multiple_products(produtos, **options))
+    except Exception as e:
+        return _erro_interno("/produtos", e)
+
+
+async def handle_job(request):
+    """Status de um job criado por POST /produtos?async=1, com resultados parciais."""
+    job_id = request.path_params["job_id"]
+    job = servico.job_store.get(job_id)
+    if job is None:
+        return JSONResponse({"error": f"Job '{job_id}' não encontrado"}, status_code=404)
+    return JSONResponse(job)
+
+
+async def handle_catalog(request):
+    """GET /catalog?codigo=6205-2RS[&marca=SKF][&limite=20]: produtos já extraídos, sem navegador."""
+    try:
+        return JSONResponse(servico.catalog_lookup(request.query_params))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        return _erro_interno("/catalog", e)
+
+
+async def handle_metrics(request):
+    """Métricas no formato do Prometheus, somadas entre os workers (metricas.render)."""
+    body, content_type = metricas.render()
+    return Response(body, headers={"Content-Type": content_type})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Pré-inicia os navegadores deste worker antes de aceitar requisições; com
+    # SEARCH_QUEUE_ENABLED as buscas rodam nos processos worker.py e a API não os usa
+    inicio = time.monotonic()
+    servico.job_store.interrupt_unfinished()
+    pool = None if servico.SEARCH_QUEUE_ENABLED else await servico.get_browser_pool()
+    # Todo worker tenta; só o líder registrado em DEMAND_DB_PATH aquece de fato
+    aquecimento = asyncio.create_task(servico.cache_warmer.run()) if servico.CACHE_WARMING_ENABLED else None
+    logger.info(f"Worker {os.getpid()} pronto em {time.monotonic() - inicio:.1f}s")
+    try:
+        yield
+    finally:
+        for task in list(_jobs_em_execucao):
+            task.cancel()
+        if aquecimento is not None:
+            aquecimento.cancel()
+        if pool is not None:
+            await pool.close()
+        await servico.stop_playwright()
+        metricas.mark_process_dead()
+
+
+app = Starlette(
+    routes=[
+        Route("/search", handle_search, methods=["GET"]),
+        Route("/produtos", handle_produtos, methods=["POST"]),
+        Route("/jobs/{job_id}", handle_job, methods=["GET"]),
+        Route("/catalog", handle_catalog, methods=["GET"]),
+        Route("/metrics", handle_metrics, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+def _prepare_multiprocess_metrics():
+    """Diretório vazio de métricas compartilhado pelos workers, herdado por eles via ambiente."""
+    diretorio = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if diretorio:
+        shutil.rmtree(diretorio, ignore_errors=True)
+        os.makedirs(diretorio)
+    else:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="rpm_metricas_")
+
+
+def main():
+    import uvicorn
+
+    # Cada worker sobe BROWSER_POOL_SIZE navegadores: os.cpu_count() num
+    # contêiner vê as CPUs do host e multiplicaria os Chromiums na inicialização
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    if workers > 1:
+        _prepare_multiprocess_metrics()
+    uvicorn.run(
+        "servidor_asgi:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8085")),
+        workers=workers,
+        log_level=os.getenv("LOG_LEVEL", "info").lower(),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import os
+import tempfile
+
+# Bancos e playbooks do serviço num diretório temporário, antes de importá-lo
+_TMP = tempfile.mkdtemp(prefix="rpm_testes_")
+for _variavel, _arquivo in [
+    ("CACHE_DB_PATH", "cache.sqlite3"),
+    ("JOBS_DB_PATH", "jobs.sqlite3"),
+    ("TASK_QUEUE_DB_PATH", "fila.sqlite3"),
+    ("SUPPLIER_STATS_DB_PATH", "fornecedor_stats.sqlite3"),
+    ("CATALOG_DB_PATH", "catalogo.sqlite3"),
+    ("DEMAND_DB_PATH", "demanda.sqlite3"),
+    ("PLAYBOOKS_DIR", "playbooks"),
+]:
+    os.environ.setdefault(_variavel, os.path.join(_TMP, _arquivo))
+os.environ.setdefault("OPENAI_API_KEY", "teste")
@@ -0,0 +1,38 @@
+from adaptadores import AbecomAdapter
+
+BUSCA = "https://www.loja.abecom.com.br/loja/busca.php?loja=835310&palavra_busca=6205"
+
+
+def _item(id_prod, nome, depois=""):
+    return (
+        f'<div class="produto"><a href="/loja/produto.php?loja=835310&IdProd={id_prod}" title="{nome}">'
+        f'{nome}</a>{depois}</div>'
+    )
+
+
+def test_preco_do_vizinho_nao_vale_para_o_codigo():
+    pagina = _item(1, "Rolamento 6205 SKF", "<span>Consulte</span>") + _item(
+        2, "Rolamento 6205-2RS SKF", "<span>R$ 45,90</span>"
+    )
+    assert AbecomAdapter().parse(pagina, BUSCA, "6205") is None
+
+
+def test_esgotado_do_vizinho_nao_descarta_o_codigo():
+    pagina = _item(1, "Rolamento 6205 SKF", "<span>R$ 30,00</span>") + _item(
+        2, "Rolamento 6305 SKF", "<span>R$ 45,90</span> Esgotado"
+    )
+    produto = AbecomAdapter().parse(pagina, BUSCA, "6205")
+    assert produto["price"] == "R$ 30,00"
+    assert produto["stock_status"] == ""
+
+
+def test_segundo_link_do_mesmo_produto_traz_o_preco():
+    # Imagem e nome apontam para o mesmo produto; o preço vem depois do segundo link
+    pagina = (
+        '<div class="produto"><a href="/loja/produto.php?loja=835310&IdProd=1" title="Rolamento 6205 SKF">'
+        '<img src="6205.jpg"></a><h3><a href="/loja/produto.php?loja=835310&IdProd=1">Rolamento 6205 SKF</a></h3>'
+        '<span>R$ 30,00</span></div>'
+    )
+    produto = AbecomAdapter().parse(pagina, BUSCA, "6205")
+    assert produto["price"] == "R$ 30,00"
+    assert produto["direct_url"].endswith("IdProd=1")
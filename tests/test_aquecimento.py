@@ -0,0 +1,112 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import aquecimento
+from aquecimento import CacheWarmer, DemandTracker, in_windows, parse_windows
+
+DIA = 24 * 3600
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = [time.time()]
+    monkeypatch.setattr(aquecimento, "time", SimpleNamespace(time=lambda: agora[0], localtime=time.localtime))
+    return agora
+
+
+@pytest.fixture
+def demanda(tmp_path, relogio):
+    return DemandTracker(str(tmp_path / "demanda.sqlite3"), meia_vida=DIA)
+
+
+def test_mais_pedidos_primeiro(demanda):
+    for codigo, pedidos in (("6205", 3), ("6305", 5), ("6206", 1)):
+        for _ in range(pedidos):
+            demanda.record(codigo, "SKF")
+
+    assert demanda.due(limite=10, min_pontuacao=2, renovar_apos=3600) == [
+        ("6305", "SKF", 5.0), ("6205", "SKF", 3.0),
+    ]
+    assert [codigo for codigo, _, _ in demanda.due(limite=1, min_pontuacao=1, renovar_apos=3600)] == ["6305"]
+
+
+def test_pedidos_antigos_perdem_peso_pela_meia_vida(demanda, relogio):
+    for _ in range(4):
+        demanda.record("6205")
+    relogio[0] += DIA
+    for _ in range(3):
+        demanda.record("6305")
+
+    # 4 pedidos de um dia atrás valem 2 agora; 3 pedidos recentes passam na frente
+    assert demanda.due(limite=10, min_pontuacao=1, renovar_apos=3600) == [("6305", None, 3.0), ("6205", None, 2.0)]
+    relogio[0] += 2 * DIA
+    assert demanda.due(limite=10, min_pontuacao=1, renovar_apos=3600) == []
+
+
+def test_aquecido_recentemente_fica_de_fora(demanda, relogio):
+    for _ in range(2):
+        demanda.record("6205")
+    demanda.mark_warmed("6205")
+    assert demanda.due(limite=10, min_pontuacao=1, renovar_apos=3600) == []
+    relogio[0] += 3600
+    assert [codigo for codigo, _, _ in demanda.due(limite=10, min_pontuacao=1, renovar_apos=3600)] == ["6205"]
+
+
+def test_janelas_de_horario():
+    janelas = parse_windows("22:00-05:00, 12:30-13:30")
+    assert janelas == [(22 * 60, 5 * 60), (12 * 60 + 30, 13 * 60 + 30)]
+
+    def as_(hora, minuto):
+        return time.mktime((2026, 1, 15, hora, minuto, 0, 0, 0, -1))
+
+    assert in_windows(janelas, as_(23, 0))
+    assert in_windows(janelas, as_(4, 59))
+    assert in_windows(janelas, as_(12, 30))
+    assert not in_windows(janelas, as_(5, 0))
+    assert not in_windows(janelas, as_(13, 30))
+    assert in_windows(parse_windows(""), as_(9, 0))
+    with pytest.raises(ValueError):
+        parse_windows("1h-5h")
+
+
+def test_so_o_lider_aquece(demanda, relogio):
+    for _ in range(2):
+        demanda.record("6205", "SKF")
+    aquecidos = {}
+
+    def aquecedor(dono):
+        async def refresh(codigo, marca):
+            aquecidos.setdefault(dono, []).append(codigo)
+
+        warmer = CacheWarmer(demanda, refresh, idade=lambda codigo, marca: None, renovar_apos=0,
+                             min_pontuacao=1, intervalo=300)
+        warmer.dono = dono
+        return warmer
+
+    a, b = aquecedor("host-a:1"), aquecedor("host-b:2")
+    assert asyncio.run(a.run_once()) == 1
+    assert asyncio.run(b.run_once()) == 0
+    assert aquecidos == {"host-a:1": ["6205"]}
+
+    # A liderança expira se o líder para de renová-la (2 intervalos)
+    relogio[0] += 601
+    assert asyncio.run(b.run_once()) == 1
+    assert asyncio.run(a.run_once()) == 0
+    assert aquecidos == {"host-a:1": ["6205"], "host-b:2": ["6205"]}
+
+
+def test_nao_aquece_com_pedidos_interativos_na_fila(demanda):
+    for _ in range(2):
+        demanda.record("6205")
+    aquecidos = []
+
+    async def refresh(codigo, marca):
+        aquecidos.append(codigo)
+
+    warmer = CacheWarmer(demanda, refresh, idade=lambda codigo, marca: None, renovar_apos=0,
+                         min_pontuacao=1, ocupado=lambda: True)
+    assert asyncio.run(warmer.run_once()) == 0
+    assert aquecidos == []
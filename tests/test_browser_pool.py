@@ -0,0 +1,56 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("browser_use")
+
+import browser_pool  # noqa: E402
+from browser_pool import BrowserPool  # noqa: E402
+from browser_use.browser.profile import BrowserProfile  # noqa: E402
+
+
+class NavegadorFalso:
+    def __init__(self, browser_profile=None):
+        async def get_version():
+            return {}
+        self.cdp_client = SimpleNamespace(send=SimpleNamespace(Browser=SimpleNamespace(getVersion=get_version)))
+        self.encerrado = False
+
+    async def start(self):
+        pass
+
+    async def kill(self):
+        self.encerrado = True
+
+
+def test_limpeza_falha_com_outro_emprestimo_esperando(monkeypatch):
+    monkeypatch.setattr(browser_pool, "BrowserSession", NavegadorFalso)
+
+    async def cenario():
+        pool = BrowserPool(BrowserProfile(), size=1)
+        await pool.start()
+        falhas = [False]
+
+        async def reset(session):
+            return falhas.pop() if falhas else True
+
+        pool._reset = reset
+
+        async def segundo():
+            async with pool.lease() as session:
+                return session
+
+        async with pool.lease() as primeiro:
+            espera = asyncio.create_task(segundo())
+            await asyncio.sleep(0.01)
+            assert not espera.done()
+
+        # A limpeza do primeiro falhou: ele é descartado e outro navegador atende a espera
+        outro = await asyncio.wait_for(espera, timeout=2)
+        assert primeiro.encerrado
+        assert outro is not primeiro
+        assert pool.stats() == {"size": 1, "idle": 1, "running": 1, "launches": 2}
+        await pool.close()
+
+    asyncio.run(cenario())
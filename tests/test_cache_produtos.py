@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import cache_produtos
+from cache_produtos import ProductCache
+
+PRODUTO = {"produto": {"part_number": "6205", "price": "R$ 30,00"}, "fornecedor": "Abecom"}
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(cache_produtos, "time", SimpleNamespace(time=lambda: agora[0]))
+    return agora
+
+
+def test_entrada_expira_apos_o_ttl(tmp_path, relogio):
+    cache = ProductCache(str(tmp_path / "cache.sqlite3"), ttl=60)
+    cache.set("6205", "SKF", PRODUTO)
+
+    relogio[0] += 59
+    assert cache.get(" 6205 ", "skf") == {**PRODUTO, "cache_age": 59.0}
+    assert cache.age("6205", "SKF") == 59
+
+    relogio[0] += 2
+    assert cache.age("6205", "SKF") is None
+    assert cache.get("6205", "SKF") is None
+
+
+def test_remove_a_entrada_menos_acessada(tmp_path, relogio):
+    cache = ProductCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.set("6205", None, PRODUTO)
+    relogio[0] += 1
+    cache.set("6305", None, PRODUTO)
+    relogio[0] += 1
+    # Acessar 6205 o torna o mais recente; 6305 sai quando 6206 entra
+    assert cache.get("6205") is not None
+    relogio[0] += 1
+    cache.set("6206", None, PRODUTO)
+
+    assert cache.get("6305") is None
+    assert cache.get("6205") is not None
+    assert cache.get("6206") is not None
+
+
+def test_age_nao_conta_como_acesso(tmp_path, relogio):
+    cache = ProductCache(str(tmp_path / "cache.sqlite3"), max_entries=1)
+    cache.set("6205", None, PRODUTO)
+    relogio[0] += 1
+    cache.age("6205")
+    cache.set("6305", None, PRODUTO)
+    assert cache.get("6205") is None
+
+
+def test_get_product_usa_o_cache_valido_e_fresh_o_ignora(monkeypatch, tmp_path):
+    servico = pytest.importorskip("browser_use_rpm_do_brasil")
+    monkeypatch.setattr(servico, "SEARCH_QUEUE_ENABLED", False)
+    monkeypatch.setattr(servico, "product_cache", ProductCache(str(tmp_path / "cache.sqlite3")))
+    buscas = []
+
+    async def search_product(codigo, marca=None, **opcoes):
+        buscas.append(opcoes["fresh"])
+        return {**PRODUTO, "preco": len(buscas)}
+
+    monkeypatch.setattr(servico, "search_product", search_product)
+
+    primeira = asyncio.run(servico.get_product("6205", "SKF"))
+    repetida = asyncio.run(servico.get_product("6205", "SKF"))
+    renovada = asyncio.run(servico.get_product("6205", "SKF", fresh=True))
+    depois = asyncio.run(servico.get_product("6205", "SKF"))
+
+    assert (primeira["cache"], primeira["preco"]) == ("miss", 1)
+    assert (repetida["cache"], repetida["preco"]) == ("hit", 1)
+    assert (renovada["cache"], renovada["preco"]) == ("bypass", 2)
+    # O resultado da busca fresh substitui a entrada antiga
+    assert (depois["cache"], depois["preco"]) == ("hit", 2)
+    assert buscas == [False, True]
@@ -0,0 +1,95 @@
+import asyncio
+
+from concorrencia import SEGUNDO_PLANO, AdmissionScheduler, SingleFlight
+
+
+async def _pedir(scheduler, nome, admitidos, segundo_plano=False):
+    SEGUNDO_PLANO.set(segundo_plano)
+    await scheduler.acquire()
+    admitidos.append(nome)
+
+
+def test_interativo_passa_a_frente_do_segundo_plano():
+    async def cenario():
+        scheduler = AdmissionScheduler(max_concurrent=1)
+        await scheduler.acquire()
+        admitidos = []
+        aquecimento = asyncio.create_task(_pedir(scheduler, "aquecimento", admitidos, segundo_plano=True))
+        await asyncio.sleep(0)
+        interativo = asyncio.create_task(_pedir(scheduler, "interativo", admitidos))
+        await asyncio.sleep(0)
+        assert scheduler.stats()["fila"] == 2
+        assert scheduler.stats()["fila_segundo_plano"] == 1
+
+        scheduler.release()
+        await interativo
+        assert admitidos == ["interativo"]
+        scheduler.release()
+        await aquecimento
+        assert admitidos == ["interativo", "aquecimento"]
+        assert scheduler.stats()["fila"] == 0
+
+    asyncio.run(cenario())
+
+
+def test_chamadas_concorrentes_compartilham_uma_execucao():
+    async def cenario():
+        voo = SingleFlight()
+        execucoes = []
+
+        async def buscar():
+            execucoes.append(1)
+            await asyncio.sleep(0.01)
+            return {"price": "R$ 10,00"}
+
+        resultados = await asyncio.gather(*(voo.do("6205", buscar) for _ in range(3)))
+        assert execucoes == [1]
+        assert [compartilhado for _, compartilhado in resultados] == [False, True, True]
+        assert all(resultado == {"price": "R$ 10,00"} for resultado, _ in resultados)
+        assert len(voo) == 0
+
+    asyncio.run(cenario())
+
+
+def test_cancelar_um_chamador_nao_cancela_os_demais():
+    async def cenario():
+        voo = SingleFlight()
+        liberar = asyncio.Event()
+
+        async def buscar():
+            await liberar.wait()
+            return "ok"
+
+        primeiro = asyncio.create_task(voo.do("6205", buscar))
+        segundo = asyncio.create_task(voo.do("6205", buscar))
+        await asyncio.sleep(0)
+        primeiro.cancel()
+        await asyncio.sleep(0)
+        liberar.set()
+        assert await segundo == ("ok", True)
+        assert primeiro.cancelled()
+
+    asyncio.run(cenario())
+
+
+def test_execucao_cancelada_quando_todos_desistem():
+    async def cenario():
+        voo = SingleFlight()
+        cancelada = asyncio.Event()
+
+        async def buscar():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelada.set()
+                raise
+
+        chamadas = [asyncio.create_task(voo.do("6205", buscar)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for chamada in chamadas:
+            chamada.cancel()
+        await asyncio.wait_for(cancelada.wait(), timeout=1)
+        await asyncio.sleep(0)
+        assert len(voo) == 0
+
+    asyncio.run(cenario())
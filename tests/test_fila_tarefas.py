@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+
+import pytest
+
+import fila_tarefas
+from fila_tarefas import CANCELLED, DONE, FAILED, PENDING, RUNNING, TaskQueue
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(fila_tarefas, "time", SimpleNamespace(time=lambda: agora[0]))
+    return agora
+
+
+@pytest.fixture
+def fila(tmp_path, relogio):
+    return TaskQueue(str(tmp_path / "fila.sqlite3"), visibility_timeout=60, max_tentativas=2, retry_delay=5)
+
+
+def test_reivindica_a_mais_antiga_uma_vez(fila, relogio):
+    primeira = fila.submit("6205", "SKF", {"lean": True})
+    relogio[0] += 1
+    fila.submit("6305")
+
+    tarefa = fila.claim("w1")
+    assert tarefa == {"id": primeira, "codigo": "6205", "marca": "SKF", "opcoes": {"lean": True}, "tentativas": 1}
+    assert fila.claim("w2")["codigo"] == "6305"
+    assert fila.claim("w3") is None
+
+    fila.complete(primeira, "w1", {"produto": None})
+    assert fila.get(primeira) == (DONE, {"produto": None})
+
+
+def test_tarefa_de_worker_morto_volta_apos_a_invisibilidade(fila, relogio):
+    task_id = fila.submit("6205")
+    assert fila.claim("w1")["tentativas"] == 1
+
+    relogio[0] += 30
+    assert fila.extend(task_id, "w1")
+    relogio[0] += 59
+    assert fila.claim("w2") is None
+
+    # w1 parou de renovar: outro worker reassume e w1 perde a tarefa
+    relogio[0] += 2
+    assert fila.claim("w2")["tentativas"] == 2
+    assert not fila.extend(task_id, "w1")
+    fila.complete(task_id, "w1", {"produto": "atrasado"})
+    assert fila.get(task_id) == (RUNNING, None)
+
+
+def test_falhas_repetem_ate_o_limite_de_tentativas(fila, relogio):
+    task_id = fila.submit("6205")
+    fila.claim("w1")
+    fila.fail(task_id, "w1", {"error": "timeout"})
+    assert fila.get(task_id) == (PENDING, {"error": "timeout"})
+    assert fila.claim("w1") is None
+
+    relogio[0] += 5
+    fila.claim("w1")
+    fila.fail(task_id, "w1", {"error": "timeout de novo"})
+    assert fila.get(task_id) == (FAILED, {"error": "timeout de novo"})
+    relogio[0] += 5
+    assert fila.claim("w1") is None
+
+
+def test_worker_morto_na_ultima_tentativa_encerra_como_falha(fila, relogio):
+    task_id = fila.submit("6205")
+    fila.claim("w1")
+    relogio[0] += 61
+    fila.claim("w2")
+    relogio[0] += 61
+    assert fila.claim("w3") is None
+    status, resultado = fila.get(task_id)
+    assert status == FAILED
+    assert "error" in resultado
+
+
+def test_cancelada_nao_e_reivindicada_nem_concluida(fila):
+    pendente = fila.submit("6205")
+    fila.cancel(pendente)
+    assert fila.claim("w1") is None
+
+    rodando = fila.submit("6305")
+    fila.claim("w1")
+    fila.cancel(rodando)
+    assert not fila.extend(rodando, "w1")
+    fila.complete(rodando, "w1", {"produto": None})
+    assert fila.get(rodando) == (CANCELLED, None)
+    assert fila.get("desconhecida") is None
+    assert fila.stats() == {CANCELLED: 2}
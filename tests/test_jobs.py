@@ -0,0 +1,31 @@
+import socket
+import subprocess
+import sys
+
+from jobs import INTERRUPTED, PENDING, RUNNING, JobStore
+
+
+def _pid_encerrado():
+    processo = subprocess.Popen([sys.executable, "-c", "pass"])
+    processo.wait()
+    return processo.pid
+
+
+def test_reinicio_so_interrompe_jobs_de_processos_que_pararam(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    vivo = store.create([{"codigo": "6205"}])
+    store.set_status(vivo, RUNNING)
+    morto = store.create([{"codigo": "6305"}])
+    store._conn.execute(
+        "UPDATE jobs SET dono = ? WHERE id = ?", (f"{socket.gethostname()}:{_pid_encerrado()}:1", morto)
+    )
+    outro_host = store.create([{"codigo": "6206"}])
+    store._conn.execute("UPDATE jobs SET dono = ? WHERE id = ?", ("outro-host:1:1", outro_host))
+    store._conn.commit()
+
+    # Outro worker do servidor reiniciando com o mesmo arquivo
+    JobStore(str(tmp_path / "jobs.sqlite3")).interrupt_unfinished()
+
+    assert store.get(vivo)["status"] == RUNNING
+    assert store.get(morto)["status"] == INTERRUPTED
+    assert store.get(outro_host)["status"] == PENDING
@@ -0,0 +1,78 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+pytest.importorskip("browser_use")
+pytest.importorskip("flask")
+
+import browser_use_rpm_do_brasil as servico  # noqa: E402
+from cache_produtos import MissCache, ProductCache  # noqa: E402
+from concorrencia import AdmissionScheduler  # noqa: E402
+from fornecedores import FORNECEDORES_PADRAO  # noqa: E402
+
+
+@pytest.fixture
+def lote(monkeypatch, tmp_path):
+    """Serviço com os 7 fornecedores padrão, 4 vagas de agente e buscas simuladas."""
+    scheduler = AdmissionScheduler(max_concurrent=4)
+    monkeypatch.setattr(servico, "agent_scheduler", scheduler)
+    monkeypatch.setattr(servico, "FORNECEDORES", FORNECEDORES_PADRAO)
+    monkeypatch.setattr(servico, "SUPPLIER_MAJOR_SESSIONS", 1)
+    monkeypatch.setattr(servico, "SEARCH_QUEUE_ENABLED", False)
+    monkeypatch.setattr(servico, "product_cache", ProductCache(str(tmp_path / "cache.sqlite3")))
+    monkeypatch.setattr(servico, "miss_cache", MissCache(str(tmp_path / "cache.sqlite3")))
+
+    @asynccontextmanager
+    async def supplier_session(browser_session=None):
+        async with scheduler.slot():
+            yield object()
+
+    precos, atrasos = {}, {}
+
+    async def search_supplier(fornecedor, codigo, marca=None, include_history=False,
+                              orcamento=None, lean=False, browser_session=None):
+        assert browser_session is not None
+        await asyncio.sleep(atrasos.get((codigo, fornecedor.nome), 0.01))
+        preco = precos.get((codigo, fornecedor.nome))
+        produto = {"part_number": codigo, "price": preco} if preco else None
+        return {"produto": produto, "origem": "agente"}
+
+    monkeypatch.setattr(servico, "supplier_session", supplier_session)
+    monkeypatch.setattr(servico, "search_supplier", search_supplier)
+    return scheduler, precos, atrasos
+
+
+def test_fornecedor_seguinte_nao_retem_vagas_do_anterior(lote):
+    # B está no cache negativo dos três primeiros fornecedores e chega aos
+    # seguintes enquanto A ainda está no primeiro: esses fornecedores não podem
+    # ficar com todas as vagas esperando A chegar
+    scheduler, precos, atrasos = lote
+    for nome in ("Motion", "Abecom", "Quality"):
+        servico.miss_cache.add("B", nome)
+    atrasos[("A", "Motion")] = 0.3
+    precos[("A", "Misumi UK")] = "R$ 10,00"
+
+    resultado = asyncio.run(asyncio.wait_for(
+        servico.search_multiple_by_supplier([{"codigo": "B"}, {"codigo": "A"}]),
+        timeout=10,
+    ))
+
+    b, a = resultado["resultados"]
+    assert b["produto"] is None
+    assert a["fornecedor"] == "Misumi UK"
+    assert a["fornecedores_consultados"] == [f.nome for f in FORNECEDORES_PADRAO]
+    assert scheduler.stats()["ativos"] == 0
+
+
+def test_vaga_devolvida_quando_a_fila_do_fornecedor_esvazia(lote):
+    scheduler, _, _ = lote
+    produtos = [{"codigo": f"62{i:02d}"} for i in range(10)]
+
+    resultado = asyncio.run(asyncio.wait_for(
+        servico.search_multiple_by_supplier(produtos),
+        timeout=10,
+    ))
+
+    assert [r["produto"] for r in resultado["resultados"]] == [None] * len(produtos)
+    assert scheduler.stats() == {"ativos": 0, "fila": 0, "fila_segundo_plano": 0, "max_concorrentes": 4}
@@ -0,0 +1,137 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from orcamento import BudgetedLLM, Orcamento, TokenBudgetExceeded
+
+
+class LLMFalso:
+    model = "falso"
+
+    def __init__(self, tokens_por_chamada: int):
+        self.tokens_por_chamada = tokens_por_chamada
+        self.chamadas = 0
+
+    async def ainvoke(self, messages, output_format=None):
+        self.chamadas += 1
+        return SimpleNamespace(usage=SimpleNamespace(prompt_tokens=self.tokens_por_chamada, completion_tokens=0))
+
+
+def test_llm_recusa_chamadas_depois_do_orcamento():
+    async def cenario():
+        orcamento = Orcamento(max_tokens=1000)
+        llm = BudgetedLLM(LLMFalso(600), orcamento)
+        await llm.ainvoke([])
+        await llm.ainvoke([])
+        with pytest.raises(TokenBudgetExceeded):
+            await llm.ainvoke([])
+        assert orcamento.tokens_usados == 1200
+        assert llm.usage() == {
+            "chamadas": 2, "prompt_tokens_por_passo": [600, 600], "prompt_tokens": 1200, "completion_tokens": 0,
+        }
+
+    asyncio.run(cenario())
+
+
+@pytest.fixture
+def servico(monkeypatch, tmp_path):
+    pytest.importorskip("browser_use")
+    pytest.importorskip("flask")
+    import browser_use_rpm_do_brasil as servico
+    from cache_produtos import MissCache
+    from estatisticas import SupplierStats
+    from fornecedores import FORNECEDORES_PADRAO
+
+    # Motion e Quality não têm adaptador HTTP: a busca vai direto ao agente
+    motion, quality = FORNECEDORES_PADRAO[0], FORNECEDORES_PADRAO[2]
+    monkeypatch.setattr(servico, "FORNECEDORES", [motion, quality])
+    monkeypatch.setattr(servico, "ADAPTIVE_ORDERING_ENABLED", False)
+    monkeypatch.setattr(servico, "PLAYBOOKS_ENABLED", False)
+    monkeypatch.setattr(servico, "RESOURCE_BLOCKING_ENABLED", False)
+    monkeypatch.setattr(servico, "miss_cache", MissCache(str(tmp_path / "cache.sqlite3")))
+    monkeypatch.setattr(servico, "supplier_stats", SupplierStats(str(tmp_path / "stats.sqlite3")))
+
+    @asynccontextmanager
+    async def supplier_session(browser_session=None):
+        yield SimpleNamespace(id="falsa")
+
+    monkeypatch.setattr(servico, "supplier_session", supplier_session)
+    return servico
+
+
+class HistoricoFalso:
+    def __init__(self, passos: int):
+        self.passos = passos
+
+    def number_of_steps(self):
+        return self.passos
+
+    def is_done(self):
+        return False
+
+    def final_result(self):
+        return None
+
+    def errors(self):
+        return [None] * self.passos
+
+
+class AgenteFalso:
+    """Agente que chama o LLM a cada passo até ser parado (agent.stop) ou chegar a max_steps."""
+
+    def __init__(self, browser_session, llm, **opcoes):
+        self.browser_session = browser_session
+        self.llm = llm
+        self.parado = False
+
+    def stop(self):
+        self.parado = True
+
+    async def run(self, max_steps, on_step_start):
+        passos = 0
+        while passos < max_steps:
+            await on_step_start(self)
+            if self.parado:
+                break
+            await self.llm.ainvoke([])
+            passos += 1
+            await asyncio.sleep(0)
+        return HistoricoFalso(passos)
+
+
+def test_orcamento_de_tokens_para_os_agentes_e_devolve_resultado_parcial(monkeypatch, servico):
+    llm = LLMFalso(600)
+    monkeypatch.setattr(servico, "llm", llm)
+    monkeypatch.setattr(servico, "Agent", AgenteFalso)
+
+    resultado = asyncio.run(asyncio.wait_for(
+        servico.search_product("6205", "SKF", max_steps=20, max_tokens=1000), timeout=5
+    ))
+
+    assert "error" not in resultado
+    assert resultado["produto"] is None
+    assert resultado["truncated"] == "token_budget"
+    assert [r["fornecedor"] for r in resultado["resultados_parciais"]] == ["Motion", "Quality"]
+    # Um passo de cada agente esgota o orçamento; o passo seguinte os encerra
+    assert llm.chamadas == 2
+    # Busca interrompida não é ausência confirmada
+    assert servico.miss_cache.get("6205") == set()
+
+
+def test_prazo_esgotado_devolve_o_preco_de_um_fornecedor_seguinte(monkeypatch, servico):
+    async def search_supplier(fornecedor, codigo, marca=None, include_history=False,
+                              orcamento=None, lean=False, browser_session=None):
+        if fornecedor.nome == "Motion":
+            await asyncio.sleep(10)
+        produto = {"part_number": codigo, "price": "£ 9.00", "fornecedor": fornecedor.nome}
+        return {"fornecedor": fornecedor.nome, "produto": produto, "origem": "agente"}
+
+    monkeypatch.setattr(servico, "search_supplier", search_supplier)
+
+    resultado = asyncio.run(asyncio.wait_for(servico.search_product("6205", "SKF", timeout=0.2), timeout=5))
+
+    assert resultado["truncated"] == "deadline"
+    assert resultado["fornecedor"] == "Quality"
+    assert resultado["produto"]["price"] == "£ 9.00"
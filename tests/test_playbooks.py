@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+
+pytest.importorskip("browser_use")
+
+from playbooks import PlaybookStore  # noqa: E402
+
+PASSOS = [{"acao": "navegar", "url": "https://www.motion.com/search?q={codigo}"}]
+
+
+def test_processos_gravando_o_mesmo_fornecedor(tmp_path):
+    # Cada instância tem seu próprio lock, como processos distintos no mesmo diretório
+    lojas = [PlaybookStore(str(tmp_path), max_falhas=3) for _ in range(4)]
+    erros = []
+
+    def gravar(loja):
+        try:
+            for i in range(50):
+                loja.save("Motion", PASSOS)
+                loja.record("Motion", ok=bool(i % 2))
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=gravar, args=(loja,)) for loja in lojas]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert erros == []
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_playbook_removido_por_outro_processo(tmp_path):
+    a, b = PlaybookStore(str(tmp_path), max_falhas=1), PlaybookStore(str(tmp_path), max_falhas=1)
+    a.save("Motion", PASSOS)
+    b.record("Motion", ok=False)
+    a.record("Motion", ok=False)
+    assert a.get("Motion") is None
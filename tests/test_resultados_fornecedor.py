@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("browser_use")
+pytest.importorskip("flask")
+
+import browser_use_rpm_do_brasil as servico  # noqa: E402
+from cache_produtos import MissCache  # noqa: E402
+from estatisticas import SupplierStats  # noqa: E402
+from fornecedores import FORNECEDORES_PADRAO  # noqa: E402
+from playbooks import PlaybookStore  # noqa: E402
+
+MOTION = FORNECEDORES_PADRAO[0]
+
+
+@pytest.fixture
+def miss_cache(monkeypatch, tmp_path):
+    cache = MissCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(servico, "miss_cache", cache)
+    return cache
+
+
+def test_busca_concluida_sem_preco_entra_no_cache_negativo(miss_cache):
+    servico.record_supplier_outcome(MOTION, "6205", "SKF", {"produto": None, "origem": "agente"})
+    assert miss_cache.get("6205") == {"Motion"}
+
+
+def test_agente_que_falhou_nao_entra_no_cache_negativo(miss_cache):
+    resultado = {"produto": None, "origem": "agente", "falha": "RateLimitError: 429"}
+    servico.record_supplier_outcome(MOTION, "6205", "SKF", resultado)
+    assert miss_cache.get("6205") == set()
+
+
+def test_agente_que_falhou_nao_conta_no_historico_de_acertos(monkeypatch, tmp_path, miss_cache):
+    stats = SupplierStats(str(tmp_path / "stats.sqlite3"))
+    monkeypatch.setattr(servico, "supplier_stats", stats)
+    falha = {"produto": None, "origem": "agente", "falha": "browser crashed"}
+    for _ in range(10):
+        servico.record_supplier_outcome(MOTION, "6205", "SKF", falha)
+    assert stats.hit_rates("6205", "SKF") == {}
+
+
+def test_replay_sem_o_codigo_conta_como_falha_do_playbook(monkeypatch, tmp_path):
+    store = PlaybookStore(str(tmp_path / "playbooks"), max_falhas=2)
+    store.save("Motion", [{"acao": "navegar", "url": "https://www.motion.com/search?q={codigo}"}])
+    monkeypatch.setattr(servico, "playbook_store", store)
+
+    async def replay_playbook(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(servico, "replay_playbook", replay_playbook)
+    for _ in range(2):
+        resultado = asyncio.run(
+            servico.search_supplier_playbook(store.get("Motion"), object(), MOTION, "6205")
+        )
+        # Sem resultado do playbook o chamador usa o Agent; nada vai para o cache negativo
+        assert resultado is None
+    assert store.get("Motion") is None
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("browser_use")
+pytest.importorskip("flask")
+
+import browser_use_rpm_do_brasil as servico  # noqa: E402
+from cache_produtos import MissCache  # noqa: E402
+from estatisticas import SupplierStats  # noqa: E402
+from fornecedores import FORNECEDORES_PADRAO  # noqa: E402
+
+MOTION, ABECOM, QUALITY = FORNECEDORES_PADRAO[:3]
+
+
+@pytest.fixture
+def fornecedores(monkeypatch, tmp_path):
+    """Motion, Abecom e Quality com buscas simuladas: (atraso, preço) por fornecedor."""
+    monkeypatch.setattr(servico, "FORNECEDORES", [MOTION, ABECOM, QUALITY])
+    monkeypatch.setattr(servico, "ADAPTIVE_ORDERING_ENABLED", False)
+    monkeypatch.setattr(servico, "miss_cache", MissCache(str(tmp_path / "cache.sqlite3")))
+    monkeypatch.setattr(servico, "supplier_stats", SupplierStats(str(tmp_path / "stats.sqlite3")))
+
+    comportamento, cancelados = {}, []
+
+    async def search_supplier(fornecedor, codigo, marca=None, include_history=False,
+                              orcamento=None, lean=False, browser_session=None):
+        atraso, preco = comportamento[fornecedor.nome]
+        try:
+            await asyncio.sleep(atraso)
+        except asyncio.CancelledError:
+            cancelados.append(fornecedor.nome)
+            raise
+        produto = {"part_number": codigo, "price": preco, "fornecedor": fornecedor.nome} if preco else None
+        return {"fornecedor": fornecedor.nome, "produto": produto, "origem": "agente"}
+
+    monkeypatch.setattr(servico, "search_supplier", search_supplier)
+    return comportamento, cancelados
+
+
+def test_fornecedor_prioritario_vence_mesmo_terminando_depois(fornecedores):
+    comportamento, cancelados = fornecedores
+    comportamento.update({
+        "Motion": (0.1, "$ 12.00"),
+        "Abecom": (0.01, "R$ 30,00"),
+        "Quality": (10, "£ 9.00"),
+    })
+
+    resultado = asyncio.run(asyncio.wait_for(servico.search_product("6205", "SKF"), timeout=5))
+
+    assert resultado["fornecedor"] == "Motion"
+    assert resultado["produto"]["price"] == "$ 12.00"
+    assert resultado["fornecedores_consultados"] == ["Motion", "Abecom", "Quality"]
+    # Quality ainda rodava quando Motion decidiu o resultado
+    assert cancelados == ["Quality"]
+
+
+def test_sem_preco_no_primeiro_usa_o_seguinte(fornecedores):
+    comportamento, cancelados = fornecedores
+    comportamento.update({
+        "Motion": (0.01, None),
+        "Abecom": (0.05, "R$ 30,00"),
+        "Quality": (10, "£ 9.00"),
+    })
+
+    resultado = asyncio.run(asyncio.wait_for(servico.search_product("6205", "SKF"), timeout=5))
+
+    assert resultado["fornecedor"] == "Abecom"
+    assert cancelados == ["Quality"]
+    # Só Motion terminou sem preço: vai para o cache negativo
+    assert servico.miss_cache.get("6205") == {"Motion"}
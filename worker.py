@@ -0,0 +1,96 @@
+"""
+Worker da fila de buscas (fila_tarefas.py): reivindica tarefas e executa search_product.
+
+A API, com SEARCH_QUEUE_ENABLED=1, só enfileira as buscas e agrega os
+resultados; a vazão cresce subindo mais processos ou contêineres deste worker
+apontando para o mesmo TASK_QUEUE_DB_PATH. Cada processo tem seu próprio pool
+de navegadores e agendador de agentes (BROWSER_POOL_SIZE, MAX_CONCURRENT_AGENTS).
+
+As métricas de fornecedores, agentes, LLM e navegadores são registradas aqui.
+Com PROMETHEUS_MULTIPROC_DIR apontando para o mesmo diretório da API (mesmo
+host), o /metrics da API soma as deste processo; sem ele, o worker expõe o seu
+próprio /metrics em WORKER_METRICS_PORT (padrão 9101; 0 desliga).
+
+Uso:
+    WORKER_CONCURRENCY=4 python worker.py
+"""
+import asyncio
+import logging
+import os
+import signal
+import socket
+
+import browser_use_rpm_do_brasil as servico
+import metricas
+
+logger = logging.getLogger(__name__)
+
+# Tarefas processadas ao mesmo tempo por este processo
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))
+# Porta do /metrics deste processo quando não há PROMETHEUS_MULTIPROC_DIR compartilhado com a API
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9101"))
+
+
+async def process(tarefa, worker_id: str):
+    """Executa uma tarefa renovando sua invisibilidade na fila enquanto a busca roda."""
+    fila = servico.task_queue
+    busca = asyncio.create_task(servico.search_product(tarefa["codigo"], tarefa["marca"], **tarefa["opcoes"]))
+    while True:
+        done, _ = await asyncio.wait({busca}, timeout=fila.visibility_timeout / 3)
+        if done:
+            break
+        if not fila.extend(tarefa["id"], worker_id):
+            # Cancelada pela API ou reassumida por outro worker
+            logger.info(f"Tarefa {tarefa['id']} não pertence mais a {worker_id}, interrompendo")
+            busca.cancel()
+            await asyncio.gather(busca, return_exceptions=True)
+            return
+
+    resultado = busca.result()
+    if "error" in resultado:
+        logger.warning(f"Tarefa {tarefa['id']} falhou (tentativa {tarefa['tentativas']}): {resultado['error']}")
+        fila.fail(tarefa["id"], worker_id, resultado)
+    else:
+        fila.complete(tarefa["id"], worker_id, resultado)
+
+
+async def consume(worker_id: str, parar: asyncio.Event):
+    while not parar.is_set():
+        tarefa = servico.task_queue.claim(worker_id)
+        if tarefa is None:
+            try:
+                await asyncio.wait_for(parar.wait(), timeout=servico.QUEUE_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        logger.info(f"{worker_id} processando {tarefa['codigo']} (tarefa {tarefa['id']})")
+        try:
+            await process(tarefa, worker_id)
+        except Exception as e:
+            logger.error(f"Erro inesperado na tarefa {tarefa['id']}: {str(e)}")
+            servico.task_queue.fail(tarefa["id"], worker_id, {"error": str(e), "codigo": tarefa["codigo"]})
+
+
+async def main():
+    # SIGTERM/SIGINT: termina as tarefas em andamento e sai; as não reivindicadas ficam na fila
+    parar = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, parar.set)
+
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR") and WORKER_METRICS_PORT:
+        metricas.serve(WORKER_METRICS_PORT)
+    pool = await servico.get_browser_pool()
+    prefixo = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Worker {prefixo} consumindo a fila com {WORKER_CONCURRENCY} tarefas simultâneas")
+    try:
+        await asyncio.gather(*(consume(f"{prefixo}:{i}", parar) for i in range(WORKER_CONCURRENCY)))
+    finally:
+        await pool.close()
+        await servico.stop_playwright()
+        metricas.mark_process_dead()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())